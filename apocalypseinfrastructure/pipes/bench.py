@@ -0,0 +1,175 @@
+"""
+Benchmark suite for the pipes engine.
+
+Measures, with warmup and repetitions:
+- renderer2.render_pipe per geometry shape/variant
+- renderer.render_pipe_sheet per pipe set
+- a full generate.main() run (uncached, into a temp dir)
+- PNG encode time of exporter.encode_png
+
+Results are written as JSON. When a baseline is given, any benchmark
+whose median exceeds the baseline median by more than the tolerance is
+reported and the run exits non-zero.
+
+Usage:
+    python bench.py [--warmup N] [--repeat N] [--filter TEXT]
+                    [--output results.json]
+                    [--baseline baseline.json] [--tolerance 0.25]
+"""
+
+from contextlib import redirect_stdout
+from pathlib import Path
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import generate
+from engine import renderer, renderer2
+from engine.exporter import encode_png
+from engine.renderer import RenderJob
+
+
+def measure(fn, warmup: int, repeat: int) -> dict:
+    """
+    Time fn() repeat times after warmup untimed calls.
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+
+    return {
+        "repeat": repeat,
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "max": max(samples),
+    }
+
+
+# ============================================================
+# Benchmarks
+# ============================================================
+
+def geometry_segments(geometry, shape: str, variant: str):
+    return [renderer2.PipeSegment(start, end) for start, end in geometry.pipes[shape][variant]]
+
+
+def collect_benchmarks(tmp_dir: Path):
+    """
+    Yield (name, fn) for every benchmark.
+    """
+    pipe_sets, lighting, geometry = generate.load_configs()
+
+    for name, pipe_set in pipe_sets.items():
+        color = pipe_set.colors.body[:3]
+        for shape, variants in geometry.pipes.items():
+            for variant in variants:
+                segments = geometry_segments(geometry, shape, variant)
+                yield (
+                    f"render_pipe/{name}/{shape}_{variant.lower()}",
+                    lambda s=segments, c=color: renderer2.render_pipe(s, c),
+                )
+
+    for name, pipe_set in pipe_sets.items():
+        yield (
+            f"render_pipe_sheet/{name}",
+            lambda p=pipe_set: renderer.render_pipe_sheet(p),
+        )
+
+    first = next(iter(pipe_sets))
+    sprite = renderer.render(RenderJob(first, "floor", "cross", "NESW"), geometry, pipe_sets)
+    sheet = renderer.render_pipe_sheet(pipe_sets[first])
+    yield "png_encode/sprite", lambda: encode_png(sprite)
+    yield "png_encode/sheet", lambda: encode_png(sheet)
+
+    def full_run():
+        with redirect_stdout(io.StringIO()):
+            generate.main(["--no-cache", "--out", str(tmp_dir / "generated")])
+
+    yield "generate/main", full_run
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """
+    Return a list of (name, baseline_median, median) regressions.
+    """
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if stats["median"] > base["median"] * (1.0 + tolerance):
+            regressions.append((name, base["median"], stats["median"]))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipes engine")
+    parser.add_argument("--warmup", type=int, default=2, metavar="N")
+    parser.add_argument("--repeat", type=int, default=10, metavar="N")
+    parser.add_argument("--filter", default="", metavar="TEXT", help="only run benchmarks containing TEXT")
+    parser.add_argument("--output", type=Path, metavar="FILE", help="write JSON results to FILE")
+    parser.add_argument("--baseline", type=Path, metavar="FILE", help="compare against stored results")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed median slowdown vs baseline as a fraction (default 0.25)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fn in collect_benchmarks(Path(tmp)):
+            if args.filter not in name:
+                continue
+            stats = measure(fn, args.warmup, args.repeat)
+            results[name] = stats
+            print(f"{name:<48} median {stats['median'] * 1000:9.2f} ms  min {stats['min'] * 1000:9.2f} ms")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "warmup": args.warmup,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"✓ wrote {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for name, base, now in regressions:
+            print(
+                f"✗ {name}: {base * 1000:.2f} ms -> {now * 1000:.2f} ms "
+                f"(+{(now / base - 1.0) * 100:.0f}%)",
+                file=sys.stderr,
+            )
+        if regressions:
+            print(f"{len(regressions)} benchmarks regressed beyond {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✓ no regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
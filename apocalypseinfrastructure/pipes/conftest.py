@@ -0,0 +1,26 @@
+"""
+Shared pytest fixtures. Living next to engine/ also puts this directory
+on sys.path, so tests import the engine the way generate.py does.
+"""
+
+import pytest
+import yaml
+
+from engine.config import load_configs
+from generate import CONFIG_DIR
+
+
+@pytest.fixture(scope="session")
+def configs():
+    """
+    (pipe_sets, lighting, geometry) from the shipped config/.
+    """
+    return load_configs(CONFIG_DIR)
+
+
+@pytest.fixture
+def raw_lighting():
+    """
+    config/lighting.yaml as plain data, to build variants from.
+    """
+    return yaml.safe_load((CONFIG_DIR / "lighting.yaml").read_text(encoding="utf-8"))
@@ -0,0 +1,76 @@
+"""
+Texture atlas packing.
+
+Trimmed sprites are packed into square pages of at most max_size
+pixels using a shelf packer:
+- sprites are placed tallest first (ties broken by width, then input order)
+- each shelf is filled left to right until the next sprite does not fit
+- a new page is started when the next shelf does not fit
+
+The result is deterministic for a given list of sizes.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class Placement:
+    page: int
+    x: int
+    y: int
+
+
+def pack_shelves(
+    sizes: Sequence[Tuple[int, int]],
+    max_size: int,
+    padding: int = 1,
+) -> Tuple[List[Optional[Placement]], List[Tuple[int, int]]]:
+    """
+    Pack (w, h) rectangles into pages.
+
+    Returns (placements, page_extents):
+    - placements[i] is None for empty (0-area) rectangles
+    - page_extents[p] is the used (w, h) of page p
+    """
+    order = sorted(
+        range(len(sizes)),
+        key=lambda i: (-sizes[i][1], -sizes[i][0], i),
+    )
+
+    placements: List[Optional[Placement]] = [None] * len(sizes)
+    page_extents: List[Tuple[int, int]] = []
+
+    page = 0
+    x = y = shelf_h = 0
+    used_w = used_h = 0
+
+    for i in order:
+        w, h = sizes[i]
+        if w <= 0 or h <= 0:
+            continue
+        if w > max_size or h > max_size:
+            raise ValueError(f"Sprite of size {w}x{h} exceeds atlas page size {max_size}")
+
+        # Next shelf
+        if x + w > max_size:
+            y += shelf_h
+            x = shelf_h = 0
+
+        # Next page
+        if y + h > max_size:
+            page_extents.append((used_w, used_h))
+            page += 1
+            x = y = shelf_h = 0
+            used_w = used_h = 0
+
+        placements[i] = Placement(page, x, y)
+        used_w = max(used_w, x + w)
+        used_h = max(used_h, y + h)
+        x += w + padding
+        shelf_h = max(shelf_h, h + padding)
+
+    if used_w and used_h:
+        page_extents.append((used_w, used_h))
+
+    return placements, page_extents
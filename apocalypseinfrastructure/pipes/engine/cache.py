@@ -0,0 +1,108 @@
+"""
+Content-addressed render cache.
+
+Each RenderJob is keyed by everything that can change its pixels:
+- the job fields
+- the resolved pipe-set entry
+- the shape/variant geometry segments
+- the lighting block for the job's surface, the highlights block and
+  the global light and shadow directions
+- the output scales (they set the internal raster resolution)
+- the renderer version stamp
+- the PNG encoder settings (they change the stored bytes, not pixels)
+
+A hit is linked (or copied) into place instead of re-rendering; each
+output scale is stored as its own artifact under the same key.
+"""
+
+from dataclasses import asdict
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+
+from engine.config import Geometry, Lighting
+from engine.renderer import RENDERER_VERSION, RenderJob
+
+
+def job_cache_key(
+    job: RenderJob,
+    geometry: Geometry,
+    pipe_sets: dict,
+    lighting: Lighting,
+    scales=(1,),
+    encoding: dict | None = None,
+) -> str:
+    """
+    Stable hex digest of all render inputs for a job.
+    """
+    surface_lighting = lighting.surfaces.get(job.surface)
+    payload = {
+        "renderer": RENDERER_VERSION,
+        "job": asdict(job),
+        "pipe_set": asdict(pipe_sets[job.pipe_set]),
+        "segments": geometry.pipes.get(job.shape, {}).get(job.variant),
+        "lighting": None if surface_lighting is None else asdict(surface_lighting),
+        "highlights": asdict(lighting.highlights),
+        "light_direction": lighting.light_direction,
+        "shadow_direction": lighting.shadow_direction,
+        "scales": sorted(scales),
+        "encoding": encoding,
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _place(src: Path, dest: Path) -> None:
+    """
+    Hardlink src to dest (copy across filesystems), replacing dest atomically.
+    """
+    if dest.exists() and os.path.samefile(src, dest):
+        # Already linked; rename() between two links to one inode is a no-op
+        return
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+class RenderCache:
+    """
+    Directory of rendered sprites named by cache key.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def artifact_path(self, key: str, scale: int = 1) -> Path:
+        suffix = "" if scale == 1 else f"@{scale}x"
+        return self.root / key[:2] / f"{key}{suffix}.png"
+
+    def fetch(self, key: str, dests: dict) -> bool:
+        """
+        Place the cached artifact of every scale at dests[scale].
+        Returns False (placing nothing) unless all scales are cached.
+        """
+        artifacts = {scale: self.artifact_path(key, scale) for scale in dests}
+        if not all(a.exists() for a in artifacts.values()):
+            return False
+        for scale, dest in dests.items():
+            _place(artifacts[scale], dest)
+        return True
+
+    def store(self, key: str, srcs: dict) -> None:
+        """
+        Record freshly rendered sprites ({scale: path}) under their key.
+        """
+        for scale, src in srcs.items():
+            _place(src, self.artifact_path(key, scale))
@@ -0,0 +1,410 @@
+"""
+Typed config objects.
+
+pipe_sets.yaml, lighting.yaml and geometry.yaml are parsed once into
+frozen, slotted dataclasses holding plain numeric tuples and read-only
+mappings, so the renderer reads attributes instead of indexing nested
+dicts, and every config error is raised up front by the parse_*
+functions as a ValueError naming the file and field. Coordinates stay
+tuples here; engine.geometry compiles them into the per-scale NumPy
+arrays the hot loops index.
+
+load_configs keeps the validated objects in a pickled cache next to the
+render cache. Each YAML file is stamped with its mtime, size and
+sha256: matching stamps skip reading the files at all, and a touched
+but identical file is re-hashed instead of re-parsed.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Tuple
+import hashlib
+import os
+import pickle
+
+import yaml
+
+from engine.surfaces import SURFACES
+from engine.trace import span
+
+
+# Bump whenever the classes below change shape; stale pickles are ignored
+CONFIG_CACHE_VERSION = 4
+
+CONFIG_FILES = ("pipe_sets.yaml", "lighting.yaml", "geometry.yaml")
+
+# libyaml is several times faster when PyYAML was built with it
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+class FrozenDict(dict):
+    """
+    A dict that refuses mutation. Config objects are shared by every job
+    and with the pickled config cache, so none of them may be changed
+    in place. Unlike types.MappingProxyType it pickles (as a plain dict).
+    """
+
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+Color = Tuple[int, int, int, int]
+Vec2 = Tuple[float, float]
+Vec3 = Tuple[float, float, float]
+
+
+# ============================================================
+# Pipe sets
+# ============================================================
+
+@dataclass(frozen=True, slots=True)
+class PipeColors:
+    body: Color
+    highlight: Color
+    shadow: Color
+
+
+@dataclass(frozen=True, slots=True)
+class Rust:
+    enabled: bool
+    amount: float = 0.3  # fraction of the body covered
+    seed: int = 0
+    color: Color = (120, 72, 38, 255)
+
+
+@dataclass(frozen=True, slots=True)
+class Seams:
+    enabled: bool
+    spacing: int
+    width: int
+
+
+@dataclass(frozen=True, slots=True)
+class PipeSet:
+    name: str
+    description: str
+    thickness: int
+    colors: PipeColors
+    rust: Rust
+    seams: Seams
+    # surface -> (dx, dy)
+    offsets: FrozenDict
+
+
+# ============================================================
+# Lighting
+# ============================================================
+
+@dataclass(frozen=True, slots=True)
+class SurfaceLighting:
+    shadow_offset: Vec2
+    shadow_alpha: int
+    underside_darkening: float
+    shadow_blur: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class Highlights:
+    enabled: bool
+    thickness: int
+    intensity: float
+
+
+@dataclass(frozen=True, slots=True)
+class Lighting:
+    light_direction: Vec2
+    shadow_direction: Vec2
+    # surface -> SurfaceLighting
+    surfaces: FrozenDict
+    highlights: Highlights
+
+
+# ============================================================
+# Geometry
+# ============================================================
+
+# (start, end) in logical surface units
+Segment = Tuple[Vec3, Vec3]
+
+
+@dataclass(frozen=True, slots=True)
+class Geometry:
+    tile: Tuple[int, int]
+    anchor: Tuple[int, int]
+    # shape -> variant -> segments, in file order
+    pipes: FrozenDict
+
+
+# ============================================================
+# Parsing / validation
+# ============================================================
+
+def _mapping(raw, where: str) -> dict:
+    """
+    raw as a nested block; where names the file and block.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError(f"{where} must be a mapping, got {raw!r}")
+    return raw
+
+
+def _require(raw, key: str, where: str):
+    """
+    raw[key] for a required field; where names the file and block.
+    """
+    if key not in _mapping(raw, where):
+        raise ValueError(f"{where} missing '{key}'")
+    return raw[key]
+
+
+def _int(value, where: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value):
+        raise ValueError(f"{where} must be an integer, got {value!r}")
+    return int(value)
+
+
+def _float(value, where: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{where} must be a number, got {value!r}")
+    return float(value)
+
+
+def _vector(value, size: int, where: str) -> tuple:
+    if not isinstance(value, (list, tuple)) or len(value) != size:
+        raise ValueError(f"{where} must be a list of {size} numbers, got {value!r}")
+    for v in value:
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            raise ValueError(f"{where} must be a list of {size} numbers, got {value!r}")
+    return tuple(value)
+
+
+def _direction(value, where: str) -> Vec2:
+    direction = _vector(value, 2, where)
+    if not any(direction):
+        raise ValueError(f"{where} must not be zero, got {value!r}")
+    return direction
+
+
+def _color(value, where: str) -> Color:
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        value = [*value, 255]
+    color = _vector(value, 4, where)
+    if not all(isinstance(c, int) and 0 <= c <= 255 for c in color):
+        raise ValueError(f"{where} must be RGB(A) integers 0-255, got {value!r}")
+    return color
+
+
+def _rust(raw: dict, name: str) -> Rust:
+    default = Rust(enabled=False)
+    where = f"pipe_sets.yaml: {name}.rust"
+    raw = _mapping(raw, where)
+    amount = _float(raw.get("amount", default.amount), f"{where}.amount")
+    if not 0.0 <= amount <= 1.0:
+        raise ValueError(f"{where}.amount must be between 0 and 1, got {amount}")
+    return Rust(
+        enabled=bool(raw.get("enabled", False)),
+        amount=amount,
+        seed=_int(raw.get("seed", default.seed), f"{where}.seed"),
+        color=_color(raw.get("color", default.color), f"{where}.color"),
+    )
+
+
+def parse_pipe_sets(raw: dict, surfaces=SURFACES) -> Dict[str, PipeSet]:
+    pipe_sets = {}
+    for name, ps in _mapping(raw or {}, "pipe_sets.yaml").items():
+        where = f"pipe_sets.yaml: {name}"
+        offsets = _require(ps, "offsets", where)
+        for surface in surfaces:
+            _require(offsets, surface, f"{where}.offsets")
+
+        thickness = _int(_require(ps, "thickness", where), f"{where}.thickness")
+        if thickness < 1:
+            raise ValueError(f"{where}.thickness must be at least 1, got {thickness}")
+        colors = _mapping(ps.get("colors", {}), f"{where}.colors")
+        seams = _mapping(ps.get("seams", {}), f"{where}.seams")
+        for key in ("spacing", "width"):
+            if _int(seams.get(key, 0), f"{where}.seams.{key}") < 0:
+                raise ValueError(f"{where}.seams.{key} must not be negative, got {seams[key]!r}")
+
+        pipe_sets[name] = PipeSet(
+            name=name,
+            description=ps.get("description", ""),
+            thickness=thickness,
+            colors=PipeColors(
+                **{
+                    key: _color(_require(colors, key, f"{where}.colors"), f"{where}.colors.{key}")
+                    for key in ("body", "highlight", "shadow")
+                }
+            ),
+            rust=_rust(ps.get("rust", {}), name),
+            seams=Seams(
+                enabled=bool(seams.get("enabled", False)),
+                spacing=_int(seams.get("spacing", 0), f"{where}.seams.spacing"),
+                width=_int(seams.get("width", 0), f"{where}.seams.width"),
+            ),
+            offsets=FrozenDict(
+                (surface, _vector(offset, 2, f"{where}.offsets.{surface}"))
+                for surface, offset in offsets.items()
+            ),
+        )
+    return pipe_sets
+
+
+def parse_lighting(raw: dict, surfaces=SURFACES) -> Lighting:
+    raw = _mapping(raw or {}, "lighting.yaml")
+    glob = _mapping(raw.get("global", {}), "lighting.yaml: global")
+
+    surface_lighting = {}
+    for surface in surfaces:
+        where = f"lighting.yaml: surfaces.{surface}"
+        block = _require(raw.get("surfaces", {}), surface, "lighting.yaml: surfaces")
+        surface_lighting[surface] = SurfaceLighting(
+            shadow_offset=_vector(_require(block, "shadow_offset", where), 2, f"{where}.shadow_offset"),
+            shadow_alpha=_int(_require(block, "shadow_alpha", where), f"{where}.shadow_alpha"),
+            underside_darkening=_float(
+                _require(block, "underside_darkening", where), f"{where}.underside_darkening"
+            ),
+            shadow_blur=_int(block.get("shadow_blur", 0), f"{where}.shadow_blur"),
+        )
+
+    highlights = _mapping(raw.get("highlights", {}), "lighting.yaml: highlights")
+    return Lighting(
+        light_direction=_direction(
+            glob.get("light_direction", (1, -1)), "lighting.yaml: global.light_direction"
+        ),
+        shadow_direction=_direction(
+            glob.get("shadow_direction", (-1, 1)), "lighting.yaml: global.shadow_direction"
+        ),
+        surfaces=FrozenDict(surface_lighting),
+        highlights=Highlights(
+            enabled=bool(highlights.get("enabled", False)),
+            thickness=_int(highlights.get("thickness", 0), "lighting.yaml: highlights.thickness"),
+            intensity=_float(highlights.get("intensity", 0.0), "lighting.yaml: highlights.intensity"),
+        ),
+    )
+
+
+def parse_geometry(raw: dict) -> Geometry:
+    pipes = {}
+    raw = raw or {}
+    for shape, data in _mapping(_require(raw, "pipes", "geometry.yaml"), "geometry.yaml: pipes").items():
+        where = f"geometry.yaml: pipes.{shape}"
+        if not _mapping(_require(data, "segments", where), f"{where}.segments"):
+            raise ValueError(f"{where} has no segments defined")
+        pipes[shape] = FrozenDict(
+            (
+                variant,
+                tuple(
+                    (
+                        _vector(_require(s, "start", f"{where}.{variant}"), 3, f"{where}.{variant}.start"),
+                        _vector(_require(s, "end", f"{where}.{variant}"), 3, f"{where}.{variant}.end"),
+                    )
+                    for s in segments
+                ),
+            )
+            for variant, segments in data["segments"].items()
+        )
+
+    tile = _mapping(raw.get("tile", {}), "geometry.yaml: tile")
+    anchor = _mapping(raw.get("anchor", {}), "geometry.yaml: anchor")
+    return Geometry(
+        tile=(
+            _int(tile.get("width", 128), "geometry.yaml: tile.width"),
+            _int(tile.get("height", 256), "geometry.yaml: tile.height"),
+        ),
+        anchor=(
+            _int(anchor.get("x", 0), "geometry.yaml: anchor.x"),
+            _int(anchor.get("y", 0), "geometry.yaml: anchor.y"),
+        ),
+        pipes=FrozenDict(pipes),
+    )
+
+
+def parse_configs(texts: Dict[str, bytes]):
+    """
+    Parse and validate the raw YAML of CONFIG_FILES.
+    Returns (pipe_sets, lighting, geometry).
+    """
+    raw = {}
+    for name in CONFIG_FILES:
+        with span("yaml_load", file=name):
+            raw[name] = yaml.load(texts[name], Loader=_YamlLoader)
+    with span("validate"):
+        return (
+            parse_pipe_sets(raw["pipe_sets.yaml"]),
+            parse_lighting(raw["lighting.yaml"]),
+            parse_geometry(raw["geometry.yaml"]),
+        )
+
+
+# ============================================================
+# Binary cache
+# ============================================================
+
+def _read_cache(cache_file: Path):
+    try:
+        with open(cache_file, "rb") as f:
+            entry = pickle.load(f)
+    except Exception:
+        # Missing, truncated or written by an incompatible version
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != CONFIG_CACHE_VERSION:
+        return None
+    return entry
+
+
+def _write_cache(cache_file: Path, entry: dict) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_name(f".{cache_file.name}.tmp")
+    try:
+        with open(tmp_file, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+
+def load_configs(config_dir: Path, cache_file: Path | None = None):
+    """
+    Load and validate all YAML configs, through the binary cache if given.
+    Returns (pipe_sets, lighting, geometry).
+    """
+    paths = {name: Path(config_dir) / name for name in CONFIG_FILES}
+    stamps = {}
+    for name, path in paths.items():
+        st = path.stat()
+        stamps[name] = (st.st_mtime_ns, st.st_size)
+
+    with span("config_cache_read"):
+        entry = _read_cache(cache_file) if cache_file is not None else None
+    if entry is not None and entry["stamps"] == stamps:
+        return entry["configs"]
+
+    with span("config_read"):
+        texts = {name: path.read_bytes() for name, path in paths.items()}
+        hashes = {name: hashlib.sha256(text).hexdigest() for name, text in texts.items()}
+
+    if entry is not None and entry["hashes"] == hashes:
+        configs = entry["configs"]
+    else:
+        configs = parse_configs(texts)
+
+    if cache_file is not None:
+        _write_cache(
+            cache_file,
+            {
+                "version": CONFIG_CACHE_VERSION,
+                "stamps": stamps,
+                "hashes": hashes,
+                "configs": configs,
+            },
+        )
+    return configs
@@ -1,66 +1,371 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
 from pathlib import Path
+import io
+import json
+import os
 
-from engine.renderer import RenderJob, render
+from PIL import Image
+
+from engine.atlas import pack_shelves
+from engine.config import Geometry, Lighting
+from engine.renderer import (
+    CELL_H,
+    CELL_W,
+    FLOOR_CX,
+    FLOOR_CY,
+    RenderJob,
+    render,
+    render_many_scales,
+    render_scales,
+)
+from engine.trace import span
 
 # --- Classification output root ---
 CLASSIFICATION_OUT_DIR = Path("pipes/generated") / "classification"
 
-SHEET_OUT_FILE = Path("pipes/generated") / "pipe_sheet.png"
+SHEET_FILENAME = "pipe_sheet.png"
+
+ATLAS_DIRNAME = "atlas"
+ATLAS_MANIFEST = "atlas.json"
+
+# Pillow's default zlib level
+DEFAULT_PNG_LEVEL = 6
 
 
-def sprite_filename(job: RenderJob) -> str:
+def scale_suffix(scale: int) -> str:
+    """
+    Filename suffix for an output scale.
+    Example: "" for 1x, "@2x" for 2x
+    """
+    return "" if scale == 1 else f"@{scale}x"
+
+
+def sprite_filename(job: RenderJob, scale: int = 1) -> str:
     """
     Canonical filename for a sprite.
-    Example: straight_ew.png
+    Example: straight_ew.png, straight_ew@2x.png
     """
-    return f"{job.shape}_{job.variant.lower()}.png"
+    return f"{job.shape}_{job.variant.lower()}{scale_suffix(scale)}.png"
 
 
-def sprite_path(base_dir: Path, job: RenderJob) -> Path:
+def sprite_path(base_dir: Path, job: RenderJob, scale: int = 1) -> Path:
     """
     Canonical output path for a sprite.
     """
-    return base_dir / job.pipe_set / job.surface / sprite_filename(job)
+    return base_dir / job.pipe_set / job.surface / sprite_filename(job, scale)
+
+
+def encode_png(
+    img: Image.Image,
+    compress_level: int = DEFAULT_PNG_LEVEL,
+    optimize: bool = False,
+) -> bytes:
+    with span("png_encode", size=img.size):
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", compress_level=compress_level, optimize=optimize)
+        return buf.getvalue()
+
+
+def write_bytes(data: bytes, out_file: Path) -> bool:
+    """
+    Write a file atomically, unless it already holds exactly these bytes.
+
+    The data goes to a temp file next to the target and is renamed into
+    place, so a failed or interrupted job never leaves a partial file.
+    Skipping identical content keeps mtimes (and packaging diffs) stable.
+
+    Returns True if the file was written.
+    """
+    with span("file_write", file=out_file.name):
+        try:
+            if out_file.stat().st_size == len(data) and out_file.read_bytes() == data:
+                return False
+        except FileNotFoundError:
+            pass
+
+        out_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = out_file.with_name(f".{out_file.name}.tmp")
+        try:
+            tmp_file.write_bytes(data)
+            os.replace(tmp_file, out_file)
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
+        return True
+
+
+def write_png(
+    img: Image.Image,
+    out_file: Path,
+    compress_level: int = DEFAULT_PNG_LEVEL,
+    optimize: bool = False,
+) -> bool:
+    """
+    Encode and write a PNG (see write_bytes). Returns True if written.
+    """
+    return write_bytes(encode_png(img, compress_level, optimize), out_file)
+
+
+def write_json(data, out_file: Path) -> bool:
+    """
+    Write JSON (see write_bytes). Returns True if written.
+    """
+    return write_bytes((json.dumps(data, indent=2) + "\n").encode("utf-8"), out_file)
+
+
+class PngWriter:
+    """
+    Encodes and writes PNGs on a thread pool.
+
+    Pillow releases the GIL while deflating, so encoding overlaps with
+    rendering on the calling thread. Writes are queued with submit()
+    and collected with wait(), which re-raises a failed write.
+    """
+
+    def __init__(
+        self,
+        threads: int = 4,
+        compress_level: int = DEFAULT_PNG_LEVEL,
+        optimize: bool = False,
+    ):
+        self.compress_level = compress_level
+        self.optimize = optimize
+        self._pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="png")
+        self._pending: dict = {}
+
+    @property
+    def encoding(self) -> dict:
+        """
+        Encoder settings that change output bytes (part of cache keys).
+        """
+        return {"compress_level": self.compress_level, "optimize": self.optimize}
+
+    def submit(self, img: Image.Image, out_file: Path) -> Future:
+        """
+        Queue a write. A write already pending for the same path is
+        finished first (re-raising its error), so two writes never race
+        on one temp file and no failure goes unreported.
+        """
+        previous = self._pending.pop(out_file, None)
+        if previous is not None:
+            previous.result()
+        future = self._pool.submit(write_png, img, out_file, self.compress_level, self.optimize)
+        self._pending[out_file] = future
+        return future
+
+    def wait(self, out_files) -> dict:
+        """
+        Block until the given queued files are written.
+        Returns {path: written}; raises the first write error.
+        """
+        results = {}
+        error = None
+        for out_file in out_files:
+            try:
+                results[out_file] = self._pending.pop(out_file).result()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return results
+
+    def write(self, img: Image.Image, out_file: Path) -> bool:
+        self.submit(img, out_file)
+        return self.wait([out_file])[out_file]
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def sprite_key(job: RenderJob) -> str:
+    """
+    Manifest key for a sprite.
+    Example: steel_basic/floor/straight_ew
+    """
+    return f"{job.pipe_set}/{job.surface}/{job.shape}_{job.variant.lower()}"
 
 
 def export_sprite(
     job: RenderJob,
-    geometry: dict,
+    geometry: Geometry,
     pipe_sets: dict,
-    lighting: dict,  # reserved for later phases
+    lighting: Lighting,
     base_dir: Path,
-) -> None:
+    scales=(1,),
+    writer: PngWriter | None = None,
+) -> tuple:
     """
-    Export sprites.
+    Render a single job once and write every output scale to its
+    canonical sprite path. Returns ({scale: path}, {scale: Image}), the
+    images being the rendered sprites, so callers need not decode the
+    files they just wrote.
 
-    For this phase:
-    - ALWAYS produce a single pipe sheet exactly once.
-    - Ignore all other jobs.
+    With a writer, encoding is queued and this returns immediately;
+    call writer.wait() on the returned paths before using the files.
     """
+    images = render_scales(job, geometry, pipe_sets, scales, lighting)
+    return _write_scales(job, images, base_dir, writer), images
+
+
+def export_sprites(
+    jobs,
+    geometry: Geometry,
+    pipe_sets: dict,
+    lighting: Lighting,
+    base_dir: Path,
+    scales=(1,),
+    writer: PngWriter | None = None,
+) -> list:
+    """
+    Export many jobs like export_sprite, rendering the jobs of each
+    (pipe set, surface) as one batch (see renderer.render_many_scales)
+    and slicing the stacked sprites into files. Every batch renders
+    before anything is written. Returns [({scale: path}, {scale: Image})]
+    in job order.
+    """
+    groups = {}
+    for index, job in enumerate(jobs):
+        groups.setdefault((job.pipe_set, job.surface), []).append(index)
+
+    rendered = [
+        (indices, render_many_scales([jobs[i] for i in indices], geometry, pipe_sets, scales, lighting))
+        for indices in groups.values()
+    ]
+
+    out = [None] * len(jobs)
+    for indices, stacks in rendered:
+        for n, index in enumerate(indices):
+            images = {scale: Image.fromarray(stack[n]) for scale, stack in stacks.items()}
+            out[index] = _write_scales(jobs[index], images, base_dir, writer), images
+    return out
+
+
+def _write_scales(job: RenderJob, images: dict, base_dir: Path, writer: PngWriter | None) -> dict:
+    out_files = {}
+    for scale, img in images.items():
+        out_files[scale] = sprite_path(base_dir, job, scale)
+        if writer is None:
+            write_png(img, out_files[scale])
+        else:
+            writer.submit(img, out_files[scale])
+    return out_files
+
+
+def export_sheet(
+    pipe_set: str,
+    geometry: Geometry,
+    pipe_sets: dict,
+    base_dir: Path,
+    writer: PngWriter | None = None,
+) -> Path:
+    """
+    Export the labelled debug sheet for one pipe set.
+    """
+    img = render(
+        RenderJob(
+            pipe_set=pipe_set,
+            surface="floor",
+            shape="sheet",
+            variant="",
+        ),
+        geometry,
+        pipe_sets,
+    )
+    out_file = base_dir / SHEET_FILENAME
+    if writer is None:
+        write_png(img, out_file)
+    else:
+        writer.write(img, out_file)
+    return out_file
+
+
+def export_atlas(
+    sprites,
+    base_dir: Path,
+    max_size: int = 1024,
+    padding: int = 1,
+    scale: int = 1,
+    writer: PngWriter | None = None,
+) -> Path:
+    """
+    Pack rendered sprites into texture pages and write a manifest.
+
+    sprites is a sequence of (RenderJob, Image) pairs. Each sprite is
+    trimmed to its non-transparent bounds before packing. Per job, the
+    manifest records:
+    - page, x, y, w, h: the trimmed rect inside the page
+    - offset: top-left of the trimmed rect inside the original tile
+    - origin: the tile anchor (FLOOR_CX, FLOOR_CY) relative to the rect
+
+    Sprites of a non-1x scale go to their own atlas (atlas@2x/...) with
+    tile size and origins scaled to match. Fully transparent sprites are listed with page null.
+    """
+    with span("export_atlas", scale=scale, sprites=len(sprites)):
+        return _export_atlas(sprites, base_dir, max_size, padding, scale, writer)
+
+
+def _export_atlas(sprites, base_dir, max_size, padding, scale, writer):
+    trimmed = []
+    for job, img in sprites:
+        bbox = img.getbbox()
+        if bbox is None:
+            trimmed.append((job, None, (0, 0, 0, 0)))
+        else:
+            trimmed.append((job, img.crop(bbox), bbox))
 
-    # Guard: only render sheet once
-    if getattr(export_sprite, "_sheet_done", False):
-        return
+    sizes = [(r - l, b - t) for _, _, (l, t, r, b) in trimmed]
+    placements, extents = pack_shelves(sizes, max_size, padding)
 
-    try:
-        img = render(
-            RenderJob(
-                pipe_set=job.pipe_set,
-                surface="floor",
-                shape="sheet",
-                variant="",
-            ),
-            geometry,
-            pipe_sets,
-        )
-    except NotImplementedError:
-        print("· sheet renderer not available")
-        return
+    pages = [Image.new("RGBA", extent, (0, 0, 0, 0)) for extent in extents]
+    entries = []
+    for (job, crop, (left, top, _, _)), (w, h), placed in zip(trimmed, sizes, placements):
+        entry = {
+            "key": sprite_key(job),
+            "job": asdict(job),
+            "page": None,
+            "x": 0,
+            "y": 0,
+            "w": w,
+            "h": h,
+            "offset": [left, top],
+            "origin": [FLOOR_CX * scale - left, FLOOR_CY * scale - top],
+        }
+        if placed is not None:
+            pages[placed.page].paste(crop, (placed.x, placed.y))
+            entry.update(page=placed.page, x=placed.x, y=placed.y)
+        entries.append(entry)
 
-    out_file = Path("pipes/generated") / "pipe_sheet.png"
-    out_file.parent.mkdir(parents=True, exist_ok=True)
-    img.save(out_file)
+    out_dir = base_dir / f"{ATLAS_DIRNAME}{scale_suffix(scale)}"
+    page_files = [f"atlas_{index}.png" for index in range(len(pages))]
+    if writer is None:
+        for page, page_file in zip(pages, page_files):
+            write_png(page, out_dir / page_file)
+    else:
+        for page, page_file in zip(pages, page_files):
+            writer.submit(page, out_dir / page_file)
+        writer.wait([out_dir / page_file for page_file in page_files])
 
-    print(f"✓ wrote sheet {out_file}")
+    # Drop pages left over from a larger previous atlas
+    for stale in out_dir.glob("atlas_*.png"):
+        if stale.name not in page_files:
+            stale.unlink()
 
-    export_sprite._sheet_done = True
+    manifest_file = out_dir / ATLAS_MANIFEST
+    write_json(
+        {
+            "scale": scale,
+            "tile": [CELL_W * scale, CELL_H * scale],
+            "max_size": max_size,
+            "pages": page_files,
+            "sprites": entries,
+        },
+        manifest_file,
+    )
+    return manifest_file
@@ -0,0 +1,188 @@
+"""
+Compiled geometry.
+
+Turns every geometry.yaml shape/variant into pre-projected screen-space
+segments (samples, tangents, normals) for each surface. The result only
+depends on geometry.yaml, so one compilation is shared by every pipe set
+and lighting variant; projection cost scales with the number of shapes.
+
+Identical segments (the N/E/S/W arms shared by ends, elbows, tees and
+crosses) are projected once per surface, and their rasterized arm
+layers are cached (per pipe thickness and light direction) so multi-arm
+variants are composited, not redrawn. Composited variants are cached as
+indexed sprites per (thickness, material pattern, shadow, light), so
+every pipe set sharing those is a palette lookup. Both caches are
+bounded LRUs.
+
+Geometry is compiled for one raster scale (the internal resolution
+that every output resolution is downsampled from).
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from engine.config import Geometry
+from engine.material import MaterialPattern
+from engine.renderer2 import (
+    DEFAULT_LIGHT,
+    PIPE_RADIUS,
+    ArmLayer,
+    DropShadow,
+    IndexedSprite,
+    PipeSegment,
+    ProjectedSegment,
+    index_layers,
+    project_segment,
+    rasterize_layer,
+    shadow_indexed,
+)
+from engine.surfaces import SURFACES, to_iso
+
+
+# (surface, shape, variant)
+ShapeKey = Tuple[str, str, str]
+
+# Entries kept per CompiledGeometry: arm layers (per arm, thickness and
+# light) and indexed sprites (per shape, thickness, pattern, shadow and light)
+LAYER_CACHE_SIZE = 256
+INDEXED_CACHE_SIZE = 512
+
+# scale -> (geometry, compiled) for the most recently used geometry
+_compiled_cache: Dict[int, tuple] = {}
+
+
+class _LRU:
+    """
+    A mapping holding at most maxsize entries, least recently used
+    evicted first.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+def surface_segments(geometry: Geometry, surface: str, shape: str, variant: str) -> List[PipeSegment]:
+    """
+    Iso-space segments of one shape/variant placed on a surface.
+    """
+    return [
+        PipeSegment(to_iso(surface, start), to_iso(surface, end))
+        for start, end in geometry.pipes[shape][variant]
+    ]
+
+
+class CompiledGeometry:
+    """
+    Projected arms per surface and the arm list of every shape/variant.
+    """
+
+    def __init__(self, scale: int = 1):
+        self.scale = scale
+        self.arms: List[ProjectedSegment] = []
+        self.shapes: Dict[ShapeKey, Tuple[int, ...]] = {}
+        self._layers = _LRU(LAYER_CACHE_SIZE)
+        self._indexed = _LRU(INDEXED_CACHE_SIZE)
+
+    def segments(self, key: ShapeKey) -> Tuple[ProjectedSegment, ...]:
+        return tuple(self.arms[a] for a in self.shapes[key])
+
+    def layer(
+        self,
+        arm: int,
+        radius: float = PIPE_RADIUS,
+        light: Tuple[float, float] = DEFAULT_LIGHT,
+    ) -> ArmLayer:
+        """
+        Rasterized layer of one arm, rendered on first use.
+        """
+        layer = self._layers.get((arm, radius, light))
+        if layer is None:
+            layer = rasterize_layer(self.arms[arm], radius, light)
+            self._layers[(arm, radius, light)] = layer
+        return layer
+
+    def layers(
+        self,
+        key: ShapeKey,
+        radius: float = PIPE_RADIUS,
+        light: Tuple[float, float] = DEFAULT_LIGHT,
+    ) -> List[ArmLayer]:
+        return [self.layer(a, radius, light) for a in self.shapes[key]]
+
+    def indexed(
+        self,
+        key: ShapeKey,
+        thickness: int,
+        pattern: MaterialPattern | None = None,
+        shadow: DropShadow | None = None,
+        light: Tuple[float, float] = DEFAULT_LIGHT,
+    ) -> IndexedSprite:
+        """
+        Indexed sprite of one shape/variant, composited on first use.
+        The unshadowed sprite is cached too, so a shadow change only
+        recomputes the alpha plane.
+        """
+        cache_key = (key, thickness, pattern, shadow, light)
+        indexed = self._indexed.get(cache_key)
+        if indexed is None:
+            if shadow is None:
+                layers = self.layers(key, thickness / 2, light)
+                indexed = index_layers(layers, self.scale, pattern)
+            else:
+                indexed = shadow_indexed(self.indexed(key, thickness, pattern, None, light), shadow)
+            self._indexed[cache_key] = indexed
+        return indexed
+
+
+def compile_geometry(geometry: Geometry, scale: int = 1) -> CompiledGeometry:
+    """
+    Project every shape/variant onto every surface, sharing arms.
+    """
+    compiled = CompiledGeometry(scale)
+    arm_ids: Dict[PipeSegment, int] = {}
+
+    for surface in SURFACES:
+        for shape, variants in geometry.pipes.items():
+            for variant in variants:
+                ids = []
+                for seg in surface_segments(geometry, surface, shape, variant):
+                    arm = arm_ids.get(seg)
+                    if arm is None:
+                        arm = len(compiled.arms)
+                        compiled.arms.append(project_segment(seg, scale))
+                        arm_ids[seg] = arm
+                    ids.append(arm)
+                compiled.shapes[(surface, shape, variant)] = tuple(ids)
+
+    return compiled
+
+
+def compiled_geometry(geometry: Geometry, scale: int = 1) -> CompiledGeometry:
+    """
+    compile_geometry, memoized per scale for the current geometry.
+
+    Entries are matched on content, so a reloaded but unchanged
+    geometry.yaml reuses its compilation; any other geometry replaces
+    the entry for that scale.
+    """
+    entry = _compiled_cache.get(scale)
+    if entry is None or (entry[0] is not geometry and entry[0] != geometry):
+        entry = (geometry, compile_geometry(geometry, scale))
+        _compiled_cache[scale] = entry
+    return entry[1]
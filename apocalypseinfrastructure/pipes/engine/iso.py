@@ -1,4 +1,42 @@
 """
 Isometric coordinate transforms and helpers.
 Tile size: 128x256
+
+Iso space: +x runs screen down-right, +y runs screen down-left,
++z runs straight up. Every point is projected relative to the floor
+anchor of the tile. A raster scale of N projects into an N-times
+larger tile (N * 128 x N * 256) with the anchor scaled to match.
 """
+
+from typing import Tuple
+
+import numpy as np
+
+
+TILE_W = 128
+TILE_H = 256
+
+# Floor anchor (matches Zomboid-ish placement)
+FLOOR_CX = 63
+FLOOR_CY = TILE_H - 33
+
+
+def iso_project(p: Tuple[float, float, float], scale: int = 1) -> Tuple[int, int]:
+    """
+    Simple iso projection.
+    p = (x, y, z) in iso space
+    scale = raster resolution multiple of the 128x256 tile
+    """
+    x, y, z = p
+    sx = FLOOR_CX * scale + (x - y) * scale
+    sy = FLOOR_CY * scale + (x + y) * (0.5 * scale) - z * scale
+    return int(sx), int(sy)
+
+
+def iso_project_np(x, y, z, scale: int = 1):
+    """
+    Array version of iso_project.
+    """
+    sx = FLOOR_CX * scale + (x - y) * scale
+    sy = FLOOR_CY * scale + (x + y) * (0.5 * scale) - z * scale
+    return np.trunc(sx).astype(np.int64), np.trunc(sy).astype(np.int64)
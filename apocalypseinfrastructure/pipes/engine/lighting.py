@@ -1,4 +1,131 @@
 """
 Vanilla-perfect Project Zomboid lighting and shadow rules.
 No rotation or mirroring allowed.
+
+Rasterized arm layers only record a shade index per pixel: which side
+of the pipe the screen normal faces (lit / unlit) and how far the pixel
+is from the pipe edge (band). The lit side is the one facing
+global.light_direction, a screen-space vector (x right, y down) towards
+the light. Lighting is a lookup table from shade index to an (overlay
+color, alpha) modulation, built once per surface from lighting.yaml:
+
+- shadow_alpha sets how dark the unlit edge band is; inner unlit bands
+  fall off from it like the built-in band ramp
+- underside_darkening darkens the whole unlit side on top of that
+- highlights.thickness is how many 1px bands of the lit side, from the
+  edge inward, are highlighted
+- highlights.intensity sets the first inner lit band; the lit edge band
+  keeps the built-in edge/inner ratio and deeper bands fall off like
+  the unlit ones
+
+The table is turned into a palette for a pipe-set color (see
+renderer.pipe_set_palette) and applied to a whole indexed sprite with
+one array index (renderer2.paint_scales), so lighting cost does not
+depend on the number of segments.
+
+Each surface also casts a drop shadow: the sprite's alpha mask shifted
+along global.shadow_direction by the length of the surface's
+shadow_offset (1x screen pixels), blurred by the optional shadow_blur
+radius and composited under the body at shadow_alpha.
 """
+
+from functools import lru_cache
+from typing import Dict, Tuple
+import math
+
+from engine.config import Highlights, Lighting, SurfaceLighting
+from engine.renderer2 import (
+    BLACK,
+    DropShadow,
+    HILITE_EDGE_A,
+    HILITE_IN1_A,
+    HILITE_SHADES,
+    N_SHADES,
+    SHADOW_EDGE_A,
+    SHADOW_IN1_A,
+    SHADOW_IN2_A,
+    SHADOW_IN3_A,
+    SHADOW_SHADES,
+    WHITE,
+    ShadeLUT,
+)
+
+
+# Unlit bands relative to the edge band, outermost first
+SHADOW_FALLOFF = (
+    1.0,
+    SHADOW_IN1_A / SHADOW_EDGE_A,
+    SHADOW_IN2_A / SHADOW_EDGE_A,
+    SHADOW_IN3_A / SHADOW_EDGE_A,
+)
+
+# Lit bands relative to highlights.intensity, outermost first; bands
+# past the built-in two fall off like the unlit ones
+HILITE_FALLOFF = (
+    HILITE_EDGE_A / HILITE_IN1_A,
+    1.0,
+    SHADOW_IN2_A / SHADOW_IN1_A,
+    SHADOW_IN3_A / SHADOW_IN1_A,
+)
+
+
+def _unit(v) -> Tuple[float, float]:
+    length = math.hypot(v[0], v[1])
+    return (v[0] / length, v[1] / length)
+
+
+def light_vector(lighting: Lighting) -> Tuple[float, float]:
+    """
+    Unit screen-space direction towards the light (renderer2 light).
+    """
+    return _unit(lighting.light_direction)
+
+
+@lru_cache(maxsize=None)
+def surface_lut(surface_lighting: SurfaceLighting, highlights: Highlights) -> ShadeLUT:
+    """
+    Shade LUT (indexed by renderer2.SHADE_*) for one surface.
+    """
+    edge = surface_lighting.shadow_alpha / 255.0
+    under = surface_lighting.underside_darkening
+    intensity = highlights.intensity if highlights.enabled else 0.0
+
+    def unlit(falloff: float) -> float:
+        # Band shadow composited with the uniform underside darkening
+        return 1.0 - (1.0 - edge * falloff) * (1.0 - under)
+
+    lut = [(BLACK, 0.0)] * N_SHADES
+    for band, (shade, falloff) in enumerate(zip(HILITE_SHADES, HILITE_FALLOFF)):
+        lut[shade] = (WHITE, intensity * falloff if band < highlights.thickness else 0.0)
+    for shade, falloff in zip(SHADOW_SHADES, SHADOW_FALLOFF):
+        lut[shade] = (BLACK, unlit(falloff))
+    return tuple(lut)
+
+
+def surface_shadow(
+    surface_lighting: SurfaceLighting,
+    direction: Tuple[float, float] = (-1, 1),
+) -> DropShadow | None:
+    """
+    Drop shadow cast on one surface along the global shadow direction,
+    or None if it is invisible.
+    """
+    if surface_lighting.shadow_alpha <= 0:
+        return None
+    ux, uy = _unit(direction)
+    distance = math.hypot(*surface_lighting.shadow_offset)
+    return DropShadow(
+        offset=(round(ux * distance), round(uy * distance)),
+        alpha=surface_lighting.shadow_alpha,
+        blur=surface_lighting.shadow_blur,
+    )
+
+
+def surface_luts(lighting: Lighting) -> Dict[str, ShadeLUT]:
+    """
+    Shade LUT of every surface in lighting.yaml.
+    """
+    return {
+        surface: surface_lut(block, lighting.highlights)
+        for surface, block in lighting.surfaces.items()
+    }
@@ -0,0 +1,150 @@
+"""
+Material detail: seams and rust.
+
+Every body pixel of a composited sprite carries the arc length (in 1x
+screen pixels, measured from the hub along its arm) of the fragment
+that won it, computed once when the arm layer is rasterized. Detail
+is then a set of boolean masks over whole sprites:
+
+- seams: bands of `width` pixels every `spacing` pixels of arc length
+- rust: seeded value noise below the rust `amount`
+
+The masks only depend on the pattern (spacing, width, rust amount and
+seed), not on colors: they become material IDs, and the blended colors
+of every (material, shade) pair are palette rows. Detail-heavy pipe
+sets cost the same to render as plain ones.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+
+SEAM_A = 0.6   # seam blend toward the pipe set's shadow color
+RUST_A = 0.75  # rust blend toward the rust color
+RUST_CELL = 4  # rust noise lattice spacing in 1x pixels
+RUST_GRAIN = 0.3  # weight of per-pixel grain vs smooth lattice noise
+
+
+# Material IDs; combinations are bit-ORed (seam | rust)
+MAT_BODY = 0
+MAT_SEAM = 1
+MAT_RUST = 2
+MAT_COUNT = 4
+
+
+@dataclass(frozen=True)
+class MaterialPattern:
+    """
+    The color-independent part of a pipe set's detail: where seams and
+    rust go. Pipe sets sharing a pattern share material-ID images.
+    """
+    seam_spacing: int = 0  # 0 disables seams
+    seam_width: int = 0
+    rust_amount: float = 0.0  # 0 disables rust
+    rust_seed: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return (self.seam_spacing > 0 and self.seam_width > 0) or self.rust_amount > 0
+
+
+def pipe_set_pattern(pipe_set) -> MaterialPattern:
+    """
+    Material pattern of a config.PipeSet.
+    """
+    seams, rust = pipe_set.seams, pipe_set.rust
+    return MaterialPattern(
+        seam_spacing=seams.spacing if seams.enabled else 0,
+        seam_width=seams.width if seams.enabled else 0,
+        rust_amount=rust.amount if rust.enabled else 0.0,
+        rust_seed=rust.seed if rust.enabled else 0,
+    )
+
+
+def seam_mask(arc: "np.ndarray", spacing: int, width: int) -> "np.ndarray":
+    """
+    Seam bands every `spacing` pixels of arc length, skipping the hub.
+    """
+    return (arc >= spacing) & (np.mod(arc, spacing) < width)
+
+
+@lru_cache(maxsize=32)
+def rust_noise(seed: int, height: int, width: int, scale: int = 1) -> "np.ndarray":
+    """
+    Deterministic noise in [0, 1) for a (height, width) raster at scale.
+
+    Smooth lattice noise (bilinear, RUST_CELL 1x pixels per cell) mixed
+    with per-1x-pixel grain, so every scale sees the same pattern.
+    """
+    rng = np.random.default_rng(seed)
+    h1, w1 = -(-height // scale), -(-width // scale)
+    lattice = rng.random((h1 // RUST_CELL + 2, w1 // RUST_CELL + 2))
+    grain = rng.random((h1, w1))
+
+    y = (np.arange(height) + 0.5) / scale
+    x = (np.arange(width) + 0.5) / scale
+    fy, fx = y / RUST_CELL, x / RUST_CELL
+    iy, ix = fy.astype(np.int64), fx.astype(np.int64)
+    wy, wx = (fy - iy)[:, None], (fx - ix)[None, :]
+    smooth = (
+        lattice[iy][:, ix] * (1 - wy) * (1 - wx)
+        + lattice[iy][:, ix + 1] * (1 - wy) * wx
+        + lattice[iy + 1][:, ix] * wy * (1 - wx)
+        + lattice[iy + 1][:, ix + 1] * wy * wx
+    )
+    noise = smooth * (1 - RUST_GRAIN) + grain[y.astype(np.int64)][:, x.astype(np.int64)] * RUST_GRAIN
+    noise.flags.writeable = False
+    return noise
+
+
+def _blend(rgb: "np.ndarray", color, a: float) -> "np.ndarray":
+    # Same truncating blend as renderer2.alpha_blend_rgb
+    return (rgb * (1 - a) + np.asarray(color, dtype=np.float64) * a).astype(np.uint8)
+
+
+def material_ids(
+    body: "np.ndarray",
+    arc: "np.ndarray",
+    pattern: MaterialPattern,
+    shape: Tuple[int, int],
+    scale: int = 1,
+    box: Tuple[int, int, int, int] | None = None,
+) -> "np.ndarray":
+    """
+    Material ID of every pixel of a flat sprite (MAT_BODY off the body).
+    arc is the flat per-pixel arc length; shape is the (H, W) tile. With
+    a box (x0, y0, x1, y1), body and arc only cover that part of the tile.
+    """
+    mat = np.zeros(body.shape, dtype=np.uint8)
+    # Only body pixels can carry detail; evaluate the masks on those
+    idx = np.flatnonzero(body)
+    if pattern.seam_spacing > 0 and pattern.seam_width > 0:
+        seam = seam_mask(arc[idx], pattern.seam_spacing, pattern.seam_width)
+        mat[idx[seam]] |= MAT_SEAM
+    if pattern.rust_amount > 0:
+        noise = rust_noise(pattern.rust_seed, shape[0], shape[1], scale)
+        if box is not None:
+            noise = noise[box[1]:box[3], box[0]:box[2]]
+        noise = noise.reshape(-1)
+        mat[idx[noise[idx] < pattern.rust_amount]] |= MAT_RUST
+    return mat
+
+
+def material_rows(shades: "np.ndarray", seam_color, rust_color) -> "np.ndarray":
+    """
+    RGB of every (material, shade) pair, material-major, from the lit
+    (N, 3) shade colors: seams blend toward seam_color, rust is blended
+    over the (possibly seamed) color.
+    """
+    rows = []
+    for mat in range(MAT_COUNT):
+        rgb = shades
+        if mat & MAT_SEAM:
+            rgb = _blend(rgb, seam_color, SEAM_A)
+        if mat & MAT_RUST:
+            rgb = _blend(rgb, rust_color, RUST_A)
+        rows.append(rgb)
+    return np.concatenate(rows)
@@ -11,13 +11,26 @@ Clean line-based renderer:
 """
 
 from dataclasses import dataclass
+from functools import lru_cache
+import math
+
 from PIL import Image, ImageDraw, ImageFont
 
+from engine import renderer2
+from engine.config import Geometry, Lighting
+from engine.geometry import compiled_geometry
+from engine.lighting import light_vector, surface_lut, surface_shadow
+from engine.material import pipe_set_pattern
+from engine.trace import span
+
 
 # ============================================================
 # Config
 # ============================================================
 
+# Bump whenever rendered output changes; part of every render cache key
+RENDERER_VERSION = 9
+
 CELL_W = 128
 CELL_H = 256
 SHEET_COLS = 8
@@ -53,10 +66,144 @@ class RenderJob:
     variant: str
 
 
-def render(job: RenderJob, geometry: dict, pipe_sets: dict) -> Image.Image:
-    if job.shape != "sheet":
-        raise NotImplementedError("Only sheet rendering is supported")
-    return render_pipe_sheet(pipe_sets[job.pipe_set])
+def render(
+    job: RenderJob,
+    geometry: Geometry,
+    pipe_sets: dict,
+    lighting: Lighting | None = None,
+) -> Image.Image:
+    """
+    Render a job.
+
+    - shape "sheet": the labelled line-based debug sheet
+    - otherwise: the 1x shaded renderer2 sprite (see render_scales)
+    """
+    if job.shape == "sheet":
+        with span("render_pipe_sheet", pipe_set=job.pipe_set):
+            return render_pipe_sheet(pipe_sets[job.pipe_set])
+    return render_scales(job, geometry, pipe_sets, (1,), lighting)[1]
+
+
+def render_scales(
+    job: RenderJob,
+    geometry: Geometry,
+    pipe_sets: dict,
+    scales=(1,),
+    lighting: Lighting | None = None,
+) -> dict:
+    """
+    Render a job sprite at every requested output scale.
+
+    The shape is composited once per pipe thickness, material pattern
+    (seams, rust) and drop shadow from the cached arm layers of
+    geometry.yaml compiled at the internal scale (lcm of all output
+    scales), as a color-independent indexed sprite. The pipe set's
+    palette, lit with the job surface's shade LUT, colors it in one
+    lookup; each output scale is a box-filtered downsample of that.
+    Without lighting the built-in renderer2 bands and light direction
+    are used and no shadow is cast. Returns {scale: Image}.
+    """
+    with span("render", job=job_label(job)):
+        return _render_scales(job, geometry, pipe_sets, scales, lighting)
+
+
+def job_label(job: RenderJob) -> str:
+    return f"{job.pipe_set}/{job.surface}/{job.shape}_{job.variant}"
+
+
+def _render_scales(job, geometry, pipe_sets, scales, lighting):
+    pipe_set = pipe_sets[job.pipe_set]
+    internal = math.lcm(*scales)
+
+    lut, shadow, light = surface_style(job.surface, lighting)
+    with span("composite"):
+        indexed = compiled_geometry(geometry, internal).indexed(
+            (job.surface, job.shape, job.variant),
+            pipe_set.thickness,
+            pipe_set_pattern(pipe_set),
+            shadow,
+            light,
+        )
+    with span("paint"):
+        return renderer2.paint_scales(indexed, pipe_set_palette(pipe_set, lut), scales)
+
+
+def render_many(
+    jobs,
+    geometry: Geometry,
+    pipe_sets: dict,
+    lighting: Lighting | None = None,
+):
+    """
+    Render jobs sharing a pipe set and surface as one 1x batch.
+    Returns an (N, H, W, 4) uint8 array in job order.
+    """
+    return render_many_scales(jobs, geometry, pipe_sets, (1,), lighting)[1]
+
+
+def render_many_scales(
+    jobs,
+    geometry: Geometry,
+    pipe_sets: dict,
+    scales=(1,),
+    lighting: Lighting | None = None,
+) -> dict:
+    """
+    Batched render_scales for jobs sharing a pipe set and surface.
+
+    The jobs' indexed sprites are colored with the shared palette and
+    downsampled straight into one tile stack per scale, so per-call
+    overhead is paid once per batch instead of once per variant. Each
+    job still gets its own "render" trace span.
+    Returns {scale: (N, H, W, 4) uint8 array} in job order.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        raise ValueError("render_many needs at least one job")
+    pipe_set_name, surface = jobs[0].pipe_set, jobs[0].surface
+    if any(job.pipe_set != pipe_set_name or job.surface != surface for job in jobs):
+        raise ValueError("render_many needs jobs of one pipe set and surface")
+
+    pipe_set = pipe_sets[pipe_set_name]
+    compiled = compiled_geometry(geometry, math.lcm(*scales))
+    lut, shadow, light = surface_style(surface, lighting)
+    with span("render_many", pipe_set=pipe_set_name, surface=surface, jobs=len(jobs)):
+        pattern = pipe_set_pattern(pipe_set)
+        palette = pipe_set_palette(pipe_set, lut)
+        out = renderer2.tile_stacks(len(jobs), scales)
+        for i, job in enumerate(jobs):
+            with span("render", job=job_label(job)):
+                with span("composite"):
+                    indexed = compiled.indexed(
+                        (surface, job.shape, job.variant), pipe_set.thickness, pattern, shadow, light
+                    )
+                with span("paint"):
+                    renderer2.paint_into(out, i, indexed, palette)
+        return out
+
+
+def surface_style(surface: str, lighting: Lighting | None):
+    """
+    (shade LUT, drop shadow, light direction) of a surface; the built-in
+    bands and light and no shadow without lighting.
+    """
+    if lighting is None:
+        return renderer2.DEFAULT_SHADE_LUT, None, renderer2.DEFAULT_LIGHT
+    surface_lighting = lighting.surfaces[surface]
+    return (
+        surface_lut(surface_lighting, lighting.highlights),
+        surface_shadow(surface_lighting, lighting.shadow_direction),
+        light_vector(lighting),
+    )
+
+
+def pipe_set_palette(pipe_set, lut):
+    return renderer2.material_palette(
+        pipe_set.colors.body[:3],
+        lut,
+        pipe_set.colors.shadow[:3],
+        pipe_set.rust.color[:3],
+    )
 
 
 # ============================================================
@@ -71,49 +218,56 @@ def draw_line(draw: ImageDraw.ImageDraw, p1, p2, color, thickness):
 # Floor geometry
 # ============================================================
 
-def draw_floor_shape(draw, cx, cy, steps, thickness, color, shape, variant):
-    def arm(dx, dy):
-        x, y = cx, cy
-        for _ in range(steps):
-            nx, ny = x + dx, y + dy
-            draw_line(draw, (x, y), (nx, ny), color, thickness)
-            x, y = nx, ny
+FLOOR_ARMS = {"N": (2, -1), "E": (2, 1), "S": (-2, 1), "W": (-2, -1)}
 
+
+def floor_arms(shape, variant):
+    """
+    Arm directions (dx, dy) that make up a floor shape.
+    """
     if shape == "straight":
         if variant == "EW":
-            arm(2, 1)
-            arm(-2, -1)
-        else:
-            arm(-2, 1)
-            arm(2, -1)
+            return [(2, 1), (-2, -1)]
+        return [(-2, 1), (2, -1)]
 
-    elif shape == "end":
-        dirs = {"N": (2, -1), "E": (2, 1), "S": (-2, 1), "W": (-2, -1)}
-        arm(*dirs[variant])
+    if shape == "end":
+        return [FLOOR_ARMS[variant]]
 
-    elif shape == "elbow":
+    if shape == "elbow":
         elbows = {
             "NE": [(2, -1), (2, 1)],
             "ES": [(2, 1), (-2, 1)],
             "SW": [(-2, 1), (-2, -1)],
             "WN": [(-2, -1), (2, -1)],
         }
-        for dx, dy in elbows[variant]:
-            arm(dx, dy)
+        return elbows[variant]
 
-    elif shape == "tee":
+    if shape == "tee":
         tees = {
             "NEW": [(2, -1), (2, 1), (-2, -1)],
             "NES": [(2, 1), (-2, 1), (-2, -1)],
             "ESW": [(-2, 1), (-2, -1), (2, 1)],
             "NSW": [(2, -1), (-2, 1), (-2, -1)],
         }
-        for dx, dy in tees[variant]:
-            arm(dx, dy)
+        return tees[variant]
 
-    elif shape == "cross":
-        for dx, dy in [(-2, -1), (2, -1), (2, 1), (-2, 1)]:
-            arm(dx, dy)
+    if shape == "cross":
+        return [(-2, -1), (2, -1), (2, 1), (-2, 1)]
+
+    return []
+
+
+def draw_floor_arm(draw, cx, cy, steps, thickness, color, dx, dy):
+    x, y = cx, cy
+    for _ in range(steps):
+        nx, ny = x + dx, y + dy
+        draw_line(draw, (x, y), (nx, ny), color, thickness)
+        x, y = nx, ny
+
+
+def draw_floor_shape(draw, cx, cy, steps, thickness, color, shape, variant):
+    for dx, dy in floor_arms(shape, variant):
+        draw_floor_arm(draw, cx, cy, steps, thickness, color, dx, dy)
 
 
 # ============================================================
@@ -157,16 +311,92 @@ def draw_wall_shape(draw, cx, cy, thickness, color, shape, variant, wall):
             draw_wall_shape(draw, cx, cy, thickness, color, "end", d, wall)
 
 
+def wall_arms(shape, variant):
+    """
+    "end" arms that make up a wall shape; None for straights, which are
+    drawn as one continuous line.
+    """
+    if shape == "end":
+        return [variant]
+    if shape in ("elbow", "tee"):
+        return list(variant)
+    if shape == "cross":
+        return list("NESW")
+    return None
+
+
+# ============================================================
+# Tile renderer
+# ============================================================
+
+def render_arm_layer(pipe_set, surface, arm):
+    """
+    A single arm on an otherwise empty tile.
+    """
+    tile = Image.new("RGBA", (CELL_W, CELL_H), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(tile)
+    thickness = pipe_set.thickness
+    color = pipe_set.colors.body[:3]
+
+    if surface == "floor":
+        draw_floor_arm(draw, FLOOR_CX, FLOOR_CY, 20, thickness, color, *arm)
+    else:
+        draw_wall_shape(draw, FLOOR_CX, FLOOR_CY, thickness, color, "end", arm, surface)
+
+    return tile
+
+
+def cropped_arm_layer(pipe_set, surface, arm, layers: dict):
+    """
+    A single arm cropped to its bounding box, as (image, (x, y)) with
+    (x, y) its position in the tile, or None if it is empty. Cached in
+    layers by (surface, arm).
+    """
+    key = (surface, arm)
+    if key not in layers:
+        tile = render_arm_layer(pipe_set, surface, arm)
+        bbox = tile.getbbox()
+        layers[key] = None if bbox is None else (tile.crop(bbox), bbox[:2])
+    return layers[key]
+
+
+def composite_arms(dest: Image.Image, origin, pipe_set, surface, shape, variant, layers: dict) -> bool:
+    """
+    Composite a multi-arm shape from cached arm layers straight into
+    dest with its tile at origin. Returns False for shapes that are not
+    built from arms (wall straights), which must be drawn whole.
+    """
+    arms = floor_arms(shape, variant) if surface == "floor" else wall_arms(shape, variant)
+    if not arms:
+        return False
+    for arm in arms:
+        layer = cropped_arm_layer(pipe_set, surface, arm, layers)
+        if layer is not None:
+            crop, (x, y) = layer
+            dest.alpha_composite(crop, (origin[0] + x, origin[1] + y))
+    return True
+
+
 # ============================================================
 # Sheet renderer
 # ============================================================
 
+@lru_cache(maxsize=1)
+def sheet_font():
+    return ImageFont.load_default()
+
+
 def render_pipe_sheet(pipe_set):
+    """
+    Labelled sheet of every face x shape. Arm-built shapes are
+    composited from their cropped arm layers directly into the sheet
+    cells and wall straights are drawn in place, so no per-cell tile
+    is allocated.
+    """
     sheet = Image.new("RGBA", (CELL_W * SHEET_COLS, CELL_H * SHEET_ROWS), (0, 0, 0, 0))
-    thickness = pipe_set["thickness"]
-    color = tuple(pipe_set["colors"]["body"][:3])
-    steps = 20
-    font = ImageFont.load_default()
+    draw = ImageDraw.Draw(sheet)
+    font = sheet_font()
+    layers = {}
 
     for face_index, surface in enumerate(FACES):
         base_row = face_index * 2
@@ -177,16 +407,15 @@ def render_pipe_sheet(pipe_set):
             if row >= base_row + 2:
                 continue
 
-            tile = Image.new("RGBA", (CELL_W, CELL_H), (0, 0, 0, 0))
-            draw = ImageDraw.Draw(tile)
-            cx, cy = FLOOR_CX, FLOOR_CY
-
-            if surface == "floor":
-                draw_floor_shape(draw, cx, cy, steps, thickness, color, shape, variant)
-            else:
-                draw_wall_shape(draw, cx, cy, thickness, color, shape, variant, surface)
-
-            draw.text((4, 4), f"{surface}:{shape}:{variant}", fill=(255, 0, 0, 255), font=font)
-            sheet.paste(tile, (col * CELL_W, row * CELL_H))
+            origin = (col * CELL_W, row * CELL_H)
+            if not composite_arms(sheet, origin, pipe_set, surface, shape, variant, layers):
+                # Opaque lines on empty cells: drawing in place matches tile + paste
+                cx, cy = origin[0] + FLOOR_CX, origin[1] + FLOOR_CY
+                thickness, color = pipe_set.thickness, pipe_set.colors.body[:3]
+                if surface == "floor":
+                    draw_floor_shape(draw, cx, cy, 20, thickness, color, shape, variant)
+                else:
+                    draw_wall_shape(draw, cx, cy, thickness, color, shape, variant, surface)
+            draw.text((origin[0] + 4, origin[1] + 4), f"{surface}:{shape}:{variant}", fill=(255, 0, 0, 255), font=font)
 
     return sheet
@@ -7,33 +7,32 @@ Goal:
 - Produce usable pipe sprites for Project Zomboid
 - Avoid pixel-topology inference
 - Define pipes as geometric primitives in isometric space
-- Shade using real normals and a fixed light vector
+- Shade using real normals and a light vector (see engine.lighting)
 """
 
 from dataclasses import dataclass
 from enum import Enum, auto
-from typing import Tuple, Iterable
+from typing import Iterable, Tuple
 import math
+import threading
 
+import numpy as np
 from PIL import Image
 
+from engine.iso import TILE_H, TILE_W, iso_project, iso_project_np
+from engine.material import MaterialPattern, material_ids, material_rows
+from engine.trace import span
+
 
 # ============================================================
 # Basic configuration
 # ============================================================
 
-TILE_W = 128
-TILE_H = 256
-
-# Floor anchor (matches Zomboid-ish placement)
-FLOOR_CX = 63
-FLOOR_CY = TILE_H - 33
-
 PIPE_RADIUS = 2.0  # pixels in screen space
 AMBIENT = 0.55
 DIFFUSE = 0.45
 
-# Light coming from upper-left, slightly above
+# Default light: coming from upper-left, slightly above
 LIGHT_DIR = (-0.6, -0.6, 0.4)
 
 # Stylized band tuning (alpha overlays)
@@ -50,6 +49,11 @@ GLOW_OUT2_A   = 0.10
 
 ENDCAP_T      = 0.15  # fraction of segment length treated as endcap
 
+# The projection maps iso (1, 1, 1) to a single screen point, so that is
+# the view axis: depth towards the viewer is x + y + z, counted here in
+# screen pixels (iso units across the screen are sqrt(2) pixels wide).
+DEPTH_PER_ISO = math.sqrt(2.0 / 3.0)
+
 
 # ============================================================
 # Iso math
@@ -62,16 +66,9 @@ def normalize(v):
 
 LIGHT_DIR = normalize(LIGHT_DIR)
 
-
-def iso_project(p: Tuple[float, float, float]) -> Tuple[int, int]:
-    """
-    Simple iso projection.
-    p = (x, y, z) in iso space
-    """
-    x, y, z = p
-    sx = FLOOR_CX + (x - y)
-    sy = FLOOR_CY + (x + y) * 0.5 - z
-    return int(sx), int(sy)
+# Screen-space (x right, y down) direction towards the light; strip
+# normals facing it get the lit bands. Only its direction matters.
+DEFAULT_LIGHT = (LIGHT_DIR[0], LIGHT_DIR[1])
 
 
 # ============================================================
@@ -130,6 +127,15 @@ def overlay_white(px, x, y, a: float) -> None:
 # Rendering
 # ============================================================
 
+def fragment_depth(x: float, y: float, z: float, o: int, radius: float) -> float:
+    """
+    Depth towards the viewer (1x pixels) of the strip pixel at offset o
+    from the centerline point (x, y, z): the centerline depth plus how
+    far the round pipe surface bulges towards the viewer there.
+    """
+    return (x + y + z) * DEPTH_PER_ISO + math.sqrt(max(0.0, radius * radius - o * o))
+
+
 def draw_strip_at(px, cx, cy, tx, ty, radius):
     """
     Draw a constant-width strip perpendicular to (tx, ty).
@@ -143,18 +149,82 @@ def draw_strip_at(px, cx, cy, tx, ty, radius):
         px_x = int(cx + nx * o)
         px_y = int(cy + ny * o)
         if 0 <= px_x < TILE_W and 0 <= px_y < TILE_H:
-            yield px_x, px_y, abs(o)
+            yield px_x, px_y, o
+
+
+def shade_body(px, seg: PipeSegment, px_x, px_y, t, tx, ty, oabs, base_color) -> None:
+    """
+    Fill one strip pixel with the base color and its shading band.
+    """
+    # Base fill
+    px[px_x, px_y] = (*base_color, 255)
+
+    # Distance inward from edge
+    edge_dist = PIPE_RADIUS - oabs
+
+    # Endcap check
+    is_endcap = (t < ENDCAP_T) or (t > (1.0 - ENDCAP_T))
+
+    # Perp normal (screen space)
+    if is_endcap:
+        exs, eys = iso_project(seg.start if t < 0.5 else seg.end)
+        rx, ry = (px_x - exs), (px_y - eys)
+        rl = math.sqrt(rx*rx + ry*ry) or 1.0
+        nx2, ny2 = (rx / rl), (ry / rl)
+    else:
+        nx2, ny2 = (-ty, tx)
+
+    lx, ly = LIGHT_DIR[0], LIGHT_DIR[1]
+    side = nx2 * lx + ny2 * ly
+    light_side = side > 0.0
+
+    # Stylized bands
+    if light_side:
+        if edge_dist < 0.5:
+            overlay_white(px, px_x, px_y, HILITE_EDGE_A)
+        elif edge_dist < 1.5:
+            overlay_white(px, px_x, px_y, HILITE_IN1_A)
+    else:
+        if edge_dist < 0.5:
+            overlay_black(px, px_x, px_y, SHADOW_EDGE_A)
+        elif edge_dist < 1.5:
+            overlay_black(px, px_x, px_y, SHADOW_IN1_A)
+        elif edge_dist < 2.5:
+            overlay_black(px, px_x, px_y, SHADOW_IN2_A)
+        elif edge_dist < 3.5:
+            overlay_black(px, px_x, px_y, SHADOW_IN3_A)
 
 
 def render_pipe(
     segments: Iterable[PipeSegment],
     base_color: Tuple[int, int, int],
+    vectorized: bool = True,
 ) -> Image.Image:
     """
     Render pipe segments into a sprite using simple normal-based shading.
+
+    Uses the NumPy rasterizer unless vectorized=False, which selects the
+    per-pixel reference renderer; both paths produce identical pixels.
+    """
+    with span("render_pipe", vectorized=vectorized):
+        if vectorized:
+            return render_pipe_np(segments, base_color)
+        return render_pipe_pixels(segments, base_color)
+
+
+def render_pipe_pixels(
+    segments: Iterable[PipeSegment],
+    base_color: Tuple[int, int, int],
+) -> Image.Image:
+    """
+    Reference per-pixel renderer.
+
+    Body pixels are depth tested: a strip pixel is only drawn if it is at
+    least as close to the viewer as what the pixel already shows.
     """
     img = Image.new("RGBA", (TILE_W, TILE_H), (0, 0, 0, 0))
     px = img.load()
+    zbuf = {}
 
     for seg in segments:
         sx, sy, sz = seg.start
@@ -191,44 +261,12 @@ def render_pipe(
             tx, ty = (tx / tl), (ty / tl)
 
             # Draw constant-width strip
-            for px_x, px_y, oabs in draw_strip_at(px, cx, cy, tx, ty, PIPE_RADIUS):
-                # Base fill
-                px[px_x, px_y] = (*base_color, 255)
-
-                # Distance inward from edge
-                edge_dist = PIPE_RADIUS - oabs
-
-                # Endcap check
-                is_endcap = (t < ENDCAP_T) or (t > (1.0 - ENDCAP_T))
-
-                # Perp normal (screen space)
-                if is_endcap:
-                    exs, eys = iso_project(seg.start if t < 0.5 else seg.end)
-                    rx, ry = (px_x - exs), (px_y - eys)
-                    rl = math.sqrt(rx*rx + ry*ry) or 1.0
-                    nx2, ny2 = (rx / rl), (ry / rl)
-                else:
-                    nx2, ny2 = (-ty, tx)
-
-                lx, ly = LIGHT_DIR[0], LIGHT_DIR[1]
-                side = nx2 * lx + ny2 * ly
-                light_side = side > 0.0
-
-                # Stylized bands
-                if light_side:
-                    if edge_dist < 0.5:
-                        overlay_white(px, px_x, px_y, HILITE_EDGE_A)
-                    elif edge_dist < 1.5:
-                        overlay_white(px, px_x, px_y, HILITE_IN1_A)
-                else:
-                    if edge_dist < 0.5:
-                        overlay_black(px, px_x, px_y, SHADOW_EDGE_A)
-                    elif edge_dist < 1.5:
-                        overlay_black(px, px_x, px_y, SHADOW_IN1_A)
-                    elif edge_dist < 2.5:
-                        overlay_black(px, px_x, px_y, SHADOW_IN2_A)
-                    elif edge_dist < 3.5:
-                        overlay_black(px, px_x, px_y, SHADOW_IN3_A)
+            for px_x, px_y, o in draw_strip_at(px, cx, cy, tx, ty, PIPE_RADIUS):
+                oabs = abs(o)
+                depth = fragment_depth(x, y, z, o, PIPE_RADIUS)
+                if depth >= zbuf.get((px_x, px_y), -math.inf):
+                    zbuf[px_x, px_y] = depth
+                    shade_body(px, seg, px_x, px_y, t, tx, ty, oabs, base_color)
 
                 # Contact glow just outside strip
                 if oabs == int(PIPE_RADIUS):
@@ -241,28 +279,682 @@ def render_pipe(
     return img
 
 
+# ============================================================
+# Vectorized rendering (NumPy)
+# ============================================================
+#
+# Mirrors render_pipe_pixels exactly. In the pixel path every strip
+# visit that passes the depth test resets the pixel to the base color
+# and then applies at most one overlay, so a body pixel ends up with the
+# shade of its NEAREST visit (the last one among equally near visits).
+# Glow is only written onto pixels that no strip ever covers. That lets
+# us compute every visit as arrays and resolve overlaps with a single
+# vectorized depth test.
+
+SHADE_BASE = 0
+SHADE_HILITE_EDGE = 1
+SHADE_HILITE_IN1 = 2
+SHADE_SHADOW_EDGE = 3
+SHADE_SHADOW_IN1 = 4
+SHADE_SHADOW_IN2 = 5
+SHADE_SHADOW_IN3 = 6
+SHADE_HILITE_IN2 = 7
+SHADE_HILITE_IN3 = 8
+
+# Band shades from the edge inward, per side
+HILITE_SHADES = (SHADE_HILITE_EDGE, SHADE_HILITE_IN1, SHADE_HILITE_IN2, SHADE_HILITE_IN3)
+SHADOW_SHADES = (SHADE_SHADOW_EDGE, SHADE_SHADOW_IN1, SHADE_SHADOW_IN2, SHADE_SHADOW_IN3)
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+# Per shade index: (overlay color, alpha) blended over the body color.
+# engine.lighting builds these per surface from lighting.yaml.
+ShadeLUT = Tuple[Tuple[Tuple[int, int, int], float], ...]
+
+DEFAULT_SHADE_LUT: ShadeLUT = (
+    (BLACK, 0.0),
+    (WHITE, HILITE_EDGE_A),
+    (WHITE, HILITE_IN1_A),
+    (BLACK, SHADOW_EDGE_A),
+    (BLACK, SHADOW_IN1_A),
+    (BLACK, SHADOW_IN2_A),
+    (BLACK, SHADOW_IN3_A),
+    # The pixel path only highlights the two outer lit bands
+    (WHITE, 0.0),
+    (WHITE, 0.0),
+)
+
+
+def shade_palette(
+    base_color: Tuple[int, int, int],
+    lut: ShadeLUT = DEFAULT_SHADE_LUT,
+) -> "np.ndarray":
+    """
+    RGBA color for every shade index, using the same blend math as the
+    pixel path. The default LUT reproduces the pixel path exactly.
+    """
+    rows = [alpha_blend_rgb(base_color, rgb, a) for rgb, a in lut]
+    return np.array([(*rgb, 255) for rgb in rows], dtype=np.uint8)
+
+
+def glow_rgba() -> Tuple[int, int, int, int]:
+    """
+    Contact glow as overlay_black leaves it on a transparent pixel.
+    """
+    r, g, b = alpha_blend_rgb((0, 0, 0), (0, 0, 0), GLOW_OUT1_A)
+    return (r, g, b, int(255 * GLOW_OUT1_A))
+
+
+def _unit(vx, vy):
+    l = np.sqrt(vx * vx + vy * vy)
+    l = np.where(l == 0, 1.0, l)
+    return vx / l, vy / l
+
+
+def band_shades(edge_dist, light_side):
+    """
+    Shade index for each fragment from its edge distance and light side.
+    Each side has four 1px bands; the shade LUT decides how many show.
+    """
+    bands = [edge_dist < 0.5, edge_dist < 1.5, edge_dist < 2.5, edge_dist < 3.5]
+    lit = np.select(bands, HILITE_SHADES, SHADE_BASE)
+    dark = np.select(bands, SHADOW_SHADES, SHADE_BASE)
+    return np.where(light_side, lit, dark)
+
+
+@dataclass(frozen=True, eq=False)
+class ProjectedSegment:
+    """
+    A segment sampled and projected to screen space.
+
+    Per sample: parameter t, integer centerline (cx, cy), unit tangent
+    (tx, ty), unit strip normal (nx, ny) and centerline depth (see
+    DEPTH_PER_ISO). start/end are the projected endpoints used for
+    endcap normals. Independent of pipe set and
+    lighting, so it can be computed once per shape and surface.
+    scale is the raster resolution multiple it was projected for.
+    """
+    t: "np.ndarray"
+    cx: "np.ndarray"
+    cy: "np.ndarray"
+    tx: "np.ndarray"
+    ty: "np.ndarray"
+    nx: "np.ndarray"
+    ny: "np.ndarray"
+    depth: "np.ndarray"
+    start: Tuple[int, int]
+    end: Tuple[int, int]
+    scale: int = 1
+
+
+def project_segment(seg: PipeSegment, scale: int = 1) -> ProjectedSegment:
+    """
+    Sample an iso-space segment exactly as render_pipe_pixels does
+    (at scale 1); higher scales sample proportionally denser.
+    """
+    sx, sy, sz = seg.start
+    ex, ey, ez = seg.end
+
+    steps = int(max(abs(ex - sx), abs(ey - sy), abs(ez - sz)) * 8 * scale)
+    denom = max(1, steps)
+
+    i = np.arange(steps + 1, dtype=np.float64)
+    t = i / denom
+    x, y, z = sx + (ex - sx) * t, sy + (ey - sy) * t, sz + (ez - sz) * t
+    cx, cy = iso_project_np(x, y, z, scale)
+
+    # Centerline tangent: forward difference, backward on the last sample
+    forward = i < steps
+    tn = np.where(forward, i + 1, i - 1) / denom
+    nxp, nyp = iso_project_np(sx + (ex - sx) * tn, sy + (ey - sy) * tn, sz + (ez - sz) * tn, scale)
+    tx, ty = _unit(
+        np.where(forward, nxp - cx, cx - nxp).astype(np.float64),
+        np.where(forward, nyp - cy, cy - nyp).astype(np.float64),
+    )
+
+    # Constant-width strip runs perpendicular to the tangent
+    nx, ny = _unit(-ty, tx)
+
+    return ProjectedSegment(
+        t=t,
+        cx=cx.astype(np.int32),
+        cy=cy.astype(np.int32),
+        tx=tx,
+        ty=ty,
+        nx=nx,
+        ny=ny,
+        depth=(x + y + z) * DEPTH_PER_ISO,
+        start=iso_project(seg.start, scale),
+        end=iso_project(seg.end, scale),
+        scale=scale,
+    )
+
+
+def segment_fragments(
+    ps: ProjectedSegment,
+    radius: float = PIPE_RADIUS,
+    light: Tuple[float, float] = DEFAULT_LIGHT,
+):
+    """
+    All strip visits of one projected segment, in pixel-path order.
+    radius is the pipe half-thickness in 1x pixels and light the
+    screen-space direction towards the light (see DEFAULT_LIGHT).
+
+    Returns (x, y, shade, arc, depth, glow_x, glow_y) as flat arrays,
+    where arc is the fragment's arc length from the segment start and
+    depth its depth towards the viewer (see fragment_depth), both in 1x
+    pixels; fragments outside the tile are already dropped.
+    """
+    t, tx, ty = ps.t, ps.tx, ps.ty
+    cx = ps.cx.astype(np.int64)
+    cy = ps.cy.astype(np.int64)
+    scale = ps.scale
+    radius = radius * scale
+    tile_w, tile_h = TILE_W * scale, TILE_H * scale
+
+    offsets = np.arange(-int(radius), int(radius) + 1)
+    oabs = np.broadcast_to(np.abs(offsets), (len(t), len(offsets)))
+    px_x = np.trunc(cx[:, None] + ps.nx[:, None] * offsets).astype(np.int64)
+    px_y = np.trunc(cy[:, None] + ps.ny[:, None] * offsets).astype(np.int64)
+
+    # Screen-space normal: radial at endcaps, perpendicular elsewhere
+    is_endcap = ((t < ENDCAP_T) | (t > (1.0 - ENDCAP_T)))[:, None]
+    near_start = (t < 0.5)[:, None]
+    rx, ry = _unit(
+        (px_x - np.where(near_start, ps.start[0], ps.end[0])).astype(np.float64),
+        (px_y - np.where(near_start, ps.start[1], ps.end[1])).astype(np.float64),
+    )
+    nx2 = np.where(is_endcap, rx, -ty[:, None])
+    ny2 = np.where(is_endcap, ry, tx[:, None])
+
+    side = nx2 * light[0] + ny2 * light[1]
+    # Bands are tuned in 1x pixels
+    shade = band_shades((radius - oabs) / scale, side > 0.0)
+
+    inside = (px_x >= 0) & (px_x < tile_w) & (px_y >= 0) & (px_y < tile_h)
+
+    length = math.hypot(ps.end[0] - ps.start[0], ps.end[1] - ps.start[1]) / scale
+    arc = np.broadcast_to((t * length)[:, None], px_x.shape)
+    bulge = np.sqrt(np.maximum(0.0, radius * radius - offsets * offsets)) / scale
+    depth = ps.depth[:, None] + bulge[None, :]
+
+    # Contact glow one (1x) pixel outward from the outermost strip pixels
+    rim = inside & (oabs == int(radius))
+    gx = np.concatenate([
+        np.trunc(px_x + (-ty)[:, None] * k).astype(np.int64)[rim] for k in range(1, scale + 1)
+    ])
+    gy = np.concatenate([
+        np.trunc(px_y + tx[:, None] * k).astype(np.int64)[rim] for k in range(1, scale + 1)
+    ])
+    g_inside = (gx >= 0) & (gx < tile_w) & (gy >= 0) & (gy < tile_h)
+
+    return px_x[inside], px_y[inside], shade[inside], arc[inside], depth[inside], gx[g_inside], gy[g_inside]
+
+
+def render_pipe_np(
+    segments: Iterable[PipeSegment],
+    base_color: Tuple[int, int, int],
+) -> Image.Image:
+    """
+    Whole-array version of render_pipe_pixels.
+    """
+    return render_projected([project_segment(seg) for seg in segments], base_color)
+
+
+def render_projected(
+    projected: Iterable[ProjectedSegment],
+    base_color: Tuple[int, int, int],
+) -> Image.Image:
+    """
+    Rasterize pre-projected segments (see engine.geometry).
+    """
+    projected = list(projected)
+    scale = projected[0].scale if projected else 1
+    return compose_layers([rasterize_layer(ps) for ps in projected], base_color, scale)
+
+
+# ============================================================
+# Arm layers
+# ============================================================
+#
+# Every multi-arm variant is a list of arms radiating from the hub.
+# An arm rasterizes to a color-independent layer: the winning shade
+# index and depth per pixel plus its glow candidates (and the arc length
+# used for material detail). Depth testing layers in segment order
+# reproduces the single-pass result exactly (nearer fragments win, ties
+# go to later segments, glow only lands where no arm has body), so an
+# arm is rasterized once and reused by every variant and pipe set that
+# contains it.
+#
+# Pipes cover a small part of the tile, so layers and indexed sprites
+# only hold their screen-space bounding box; everything outside it is
+# transparent. Work per sprite scales with the pipe, not the tile.
+
+# (x0, y0, x1, y1) in tile pixels at some raster scale, end-exclusive
+Box = Tuple[int, int, int, int]
+EMPTY_BOX: Box = (0, 0, 0, 0)
+
+
+def fragment_box(xs: "np.ndarray", ys: "np.ndarray") -> Box:
+    """
+    Bounding box of pixel coordinates (EMPTY_BOX if there are none).
+    """
+    if len(xs) == 0:
+        return EMPTY_BOX
+    return int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1
+
+
+def union_box(boxes: Iterable[Box]) -> Box:
+    boxes = [b for b in boxes if b[2] > b[0] and b[3] > b[1]]
+    if not boxes:
+        return EMPTY_BOX
+    return (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+
+
+def align_box(box: Box, step: int, width: int, height: int) -> Box:
+    """
+    Grow a box outward to multiples of step and clip it to the tile, so
+    every integer downsample of it covers whole output pixels.
+    """
+    x0, y0, x1, y1 = box
+    if x1 <= x0 or y1 <= y0:
+        return EMPTY_BOX
+    return (
+        max(0, x0 // step * step),
+        max(0, y0 // step * step),
+        min(width, -(-x1 // step) * step),
+        min(height, -(-y1 // step) * step),
+    )
+
+
+@dataclass(frozen=True, eq=False)
+class ArmLayer:
+    shade: "np.ndarray"  # (h, w) int8 over box, -1 where no body
+    glow: "np.ndarray"   # (h, w) bool glow candidates
+    arc: "np.ndarray"    # (h, w) float32 arc length (1x px) of body pixels
+    depth: "np.ndarray"  # (h, w) float64 depth of body pixels, -inf elsewhere
+    scale: int = 1
+    box: Box = EMPTY_BOX  # where shade/glow/arc/depth sit in the tile
+
+
+def rasterize_layer(
+    ps: ProjectedSegment,
+    radius: float = PIPE_RADIUS,
+    light: Tuple[float, float] = DEFAULT_LIGHT,
+) -> ArmLayer:
+    xs, ys, shades, arcs, depths, gxs, gys = segment_fragments(ps, radius, light)
+    box = union_box([fragment_box(xs, ys), fragment_box(gxs, gys)])
+    x0, y0, x1, y1 = box
+    shape = (y1 - y0, x1 - x0)
+
+    shade = np.full(shape, -1, dtype=np.int8)
+    arc = np.zeros(shape, dtype=np.float32)
+    depth = np.full(shape, -np.inf)
+    # Depth test: per pixel the nearest visit, the last one on ties
+    lin = (ys - y0) * shape[1] + (xs - x0)
+    order = np.lexsort((np.arange(len(lin)), depths, lin))
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = lin[order[1:]] != lin[order[:-1]]
+    win = order[last]
+    shade.reshape(-1)[lin[win]] = shades[win]
+    arc.reshape(-1)[lin[win]] = arcs[win]
+    depth.reshape(-1)[lin[win]] = depths[win]
+
+    glow = np.zeros(shape, dtype=bool)
+    glow[gys - y0, gxs - x0] = True
+
+    return ArmLayer(shade=shade, glow=glow, arc=arc, depth=depth, scale=ps.scale, box=box)
+
+
+# ============================================================
+# Indexed sprites
+# ============================================================
+#
+# Composited layers become a color-independent indexed sprite: per
+# pixel a palette code (material x shade, 0 = black) and a final alpha
+# that already includes glow and the drop shadow. Glow and shadow are
+# black, so a pipe set's sprite is palette[code] with that alpha, one
+# array index per sprite; shapes are rasterized once per thickness and
+# material pattern, not once per color family.
+
+N_SHADES = len(DEFAULT_SHADE_LUT)
+CODE_BLACK = 0
+
+
+@dataclass(frozen=True, eq=False)
+class IndexedSprite:
+    code: "np.ndarray"   # (h, w) uint8 palette code over box, CODE_BLACK off the body
+    alpha: "np.ndarray"  # (h, w) uint8
+    scale: int = 1
+    box: Box = EMPTY_BOX  # aligned to scale; the tile is transparent outside it
+
+
+def _tile_view(a: "np.ndarray", src: Box, dst: Box) -> "np.ndarray":
+    """
+    The part of a (src-box-sized) array covered by a dst box inside it.
+    """
+    return a[dst[1] - src[1]:dst[3] - src[1], dst[0] - src[0]:dst[2] - src[0]]
+
+
+def index_layers(
+    layers: Iterable[ArmLayer],
+    scale: int = 1,
+    pattern: MaterialPattern | None = None,
+    shadow: DropShadow | None = None,
+) -> IndexedSprite:
+    """
+    Depth test arm layers in order into an indexed sprite covering
+    their combined bounding box.
+    """
+    layers = list(layers)
+    with_detail = pattern is not None and pattern.enabled
+    tile = (TILE_H * scale, TILE_W * scale)
+    box = align_box(union_box(layer.box for layer in layers), scale, tile[1], tile[0])
+    shape = (box[3] - box[1], box[2] - box[0])
+
+    shade = np.full(shape, -1, dtype=np.int8)
+    depth = np.full(shape, -np.inf)
+    glow = np.zeros(shape, dtype=bool)
+    arc = np.zeros(shape, dtype=np.float32) if with_detail else None
+    for layer in layers:
+        if layer.box == EMPTY_BOX:
+            continue
+        zview = _tile_view(depth, box, layer.box)
+        hit = (layer.shade >= 0) & (layer.depth >= zview)
+        zview[hit] = layer.depth[hit]
+        _tile_view(shade, box, layer.box)[hit] = layer.shade[hit]
+        _tile_view(glow, box, layer.box)[...] |= layer.glow
+        if with_detail:
+            _tile_view(arc, box, layer.box)[hit] = layer.arc[hit]
+
+    shade = shade.reshape(-1)
+    body = shade >= 0
+    code = np.zeros(shade.size, dtype=np.uint8)
+    if with_detail:
+        mat = material_ids(body, arc.reshape(-1), pattern, tile, scale, box)
+        code[body] = 1 + mat[body] * N_SHADES + shade[body]
+    else:
+        code[body] = 1 + shade[body]
+
+    alpha = np.zeros(shade.size, dtype=np.uint8)
+    alpha[body] = 255
+    alpha[glow.reshape(-1) & ~body] = glow_rgba()[3]
+
+    indexed = IndexedSprite(code=code.reshape(shape), alpha=alpha.reshape(shape), scale=scale, box=box)
+    if shadow is not None:
+        indexed = shadow_indexed(indexed, shadow)
+    return indexed
+
+
+def shadow_indexed(indexed: IndexedSprite, shadow: DropShadow) -> IndexedSprite:
+    """
+    An indexed sprite with its drop shadow cast, its box grown to hold
+    the shifted and blurred shadow.
+    """
+    if indexed.box == EMPTY_BOX:
+        return indexed
+    scale = indexed.scale
+    dx, dy = shadow.offset[0] * scale, shadow.offset[1] * scale
+    spread = shadow.blur * scale
+    x0, y0, x1, y1 = indexed.box
+    box = align_box(
+        (
+            min(x0, x0 + dx) - spread,
+            min(y0, y0 + dy) - spread,
+            max(x1, x1 + dx) + spread,
+            max(y1, y1 + dy) + spread,
+        ),
+        scale,
+        TILE_W * scale,
+        TILE_H * scale,
+    )
+    shape = (box[3] - box[1], box[2] - box[0])
+    code = np.zeros(shape, dtype=np.uint8)
+    alpha = np.zeros(shape, dtype=np.uint8)
+    _tile_view(code, box, indexed.box)[...] = indexed.code
+    _tile_view(alpha, box, indexed.box)[...] = indexed.alpha
+    return IndexedSprite(code=code, alpha=cast_shadow(alpha, shadow, scale), scale=scale, box=box)
+
+
+def material_palette(
+    base_color: Tuple[int, int, int],
+    lut: ShadeLUT = DEFAULT_SHADE_LUT,
+    seam_color: Tuple[int, int, int] = BLACK,
+    rust_color: Tuple[int, int, int] = BLACK,
+) -> "np.ndarray":
+    """
+    RGB of every palette code for one pipe set on one surface.
+    """
+    shades = shade_palette(base_color, lut)[:, :3]
+    rows = material_rows(shades, seam_color, rust_color)
+    return np.concatenate([np.array([glow_rgba()[:3]], dtype=np.uint8), rows])
+
+
+def paint(indexed: IndexedSprite, palette: "np.ndarray", out: "np.ndarray | None" = None) -> "np.ndarray":
+    """
+    Color an indexed sprite's box. Returns an (h, w, 4) uint8 array,
+    written into out if given.
+    """
+    if out is None:
+        out = np.empty((*indexed.code.shape, 4), dtype=np.uint8)
+    np.take(palette, indexed.code, axis=0, out=out[..., :3])
+    out[..., 3] = indexed.alpha
+    return out
+
+
+def to_tile(rgba: "np.ndarray", box: Box, scale: int = 1) -> "np.ndarray":
+    """
+    Place a box-sized (h, w, 4) sprite into a transparent tile at scale.
+    """
+    tile = np.zeros((TILE_H * scale, TILE_W * scale, 4), dtype=np.uint8)
+    _tile_view(tile, (0, 0, TILE_W * scale, TILE_H * scale), box)[...] = rgba
+    return tile
+
+
+# Per-thread scratch memory for painting at the internal scale
+_scratch = threading.local()
+
+
+def scratch_buffer(shape: Tuple[int, ...]) -> "np.ndarray":
+    """
+    A uint8 array of the given shape backed by a reused per-thread
+    buffer. Its contents are undefined and only valid until the next call.
+    """
+    size = math.prod(shape)
+    buf = getattr(_scratch, "buf", None)
+    if buf is None or buf.size < size:
+        buf = np.empty(size, dtype=np.uint8)
+        _scratch.buf = buf
+    return buf[:size].reshape(shape)
+
+
+def compose_layers_array(
+    layers: Iterable[ArmLayer],
+    base_color: Tuple[int, int, int],
+    scale: int = 1,
+    lut: ShadeLUT = DEFAULT_SHADE_LUT,
+) -> "np.ndarray":
+    """
+    Composite arm layers in order and apply the pipe-set palette, lit
+    by the shade LUT. Returns an (H, W, 4) uint8 array at the layers' scale.
+    """
+    indexed = index_layers(layers, scale)
+    return to_tile(paint(indexed, material_palette(base_color, lut)), indexed.box, scale)
+
+
+def compose_layers(
+    layers: Iterable[ArmLayer],
+    base_color: Tuple[int, int, int],
+    scale: int = 1,
+    lut: ShadeLUT = DEFAULT_SHADE_LUT,
+) -> Image.Image:
+    return Image.fromarray(compose_layers_array(layers, base_color, scale, lut))
+
+
+# ============================================================
+# Drop shadow
+# ============================================================
+
+@dataclass(frozen=True)
+class DropShadow:
+    offset: Tuple[int, int]  # (dx, dy) in 1x screen pixels
+    alpha: int               # shadow opacity under full coverage, 0-255
+    blur: int = 0            # box blur radius in 1x pixels
+
+
+def _shift(a: "np.ndarray", dx: int, dy: int) -> "np.ndarray":
+    """
+    Translate a 2D array by (dx, dy), filling with zeros.
+    """
+    h, w = a.shape
+    out = np.zeros_like(a)
+    if abs(dx) >= w or abs(dy) >= h:
+        return out
+    out[max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)] = \
+        a[max(-dy, 0):h - max(dy, 0), max(-dx, 0):w - max(dx, 0)]
+    return out
+
+
+def _box_blur(a: "np.ndarray", radius: int) -> "np.ndarray":
+    """
+    Separable box blur of a 2D float array (zero outside), via prefix sums.
+    """
+    k = 2 * radius + 1
+    for axis in (0, 1):
+        pad = [(0, 0), (0, 0)]
+        pad[axis] = (radius + 1, radius)
+        c = np.cumsum(np.pad(a, pad), axis=axis)
+        n = a.shape[axis]
+        a = (np.take(c, np.arange(k, k + n), axis=axis) - np.take(c, np.arange(n), axis=axis)) / k
+    return a
+
+
+def cast_shadow(alpha: "np.ndarray", shadow: DropShadow, scale: int = 1) -> "np.ndarray":
+    """
+    Alpha of a sprite with its cast shadow composited under it.
+
+    The shadow is the sprite's own alpha mask, shifted by the offset,
+    optionally box-blurred and tinted black, so the whole stage is a
+    handful of array operations regardless of sprite content. The
+    shadow is black, so the sprite's colors keep their values and only
+    the alpha changes (see index_layers).
+    """
+    dx, dy = shadow.offset
+    body_a = alpha.astype(np.float64) / 255.0
+
+    cast = _shift(body_a, dx * scale, dy * scale)
+    if shadow.blur > 0:
+        cast = _box_blur(cast, shadow.blur * scale)
+    cast_a = cast * (shadow.alpha / 255.0)
+
+    # Body over shadow
+    out_a = body_a + cast_a * (1.0 - body_a)
+    return np.clip(np.rint(out_a * 255.0), 0, 255).astype(np.uint8)
+
+
+# ============================================================
+# Multi-resolution output
+# ============================================================
+
+def downsample(rgba: "np.ndarray", factor: int) -> "np.ndarray":
+    """
+    Box-filter an (H, W, 4) uint8 sprite (or an (N, H, W, 4) stack of
+    them) down by an integer factor.
+
+    Color is averaged premultiplied by alpha so transparent pixels do
+    not darken edges.
+    """
+    if factor == 1:
+        return rgba
+
+    px = rgba.astype(np.int32)
+    alpha = px[..., 3:4]
+    premul = px[..., :3] * alpha
+
+    # Integer box sums over strided views, then the mean in float
+    taps = [(i, j) for i in range(factor) for j in range(factor)]
+    n = factor * factor
+    box_rgb = sum(premul[..., i::factor, j::factor, :] for i, j in taps) / n
+    a = sum(alpha[..., i::factor, j::factor, :] for i, j in taps) / n
+
+    rgb = np.divide(box_rgb, a, out=np.zeros_like(box_rgb), where=a > 0)
+    out = np.concatenate([rgb, a], axis=-1)
+    return np.clip(np.rint(out), 0, 255).astype(np.uint8)
+
+
+def paint_scales(indexed: IndexedSprite, palette: "np.ndarray", scales: Iterable[int]) -> dict:
+    """
+    Color an indexed sprite once at its (internal) scale and derive
+    every requested output scale by downsampling. Each scale must
+    divide the sprite's scale. Only the sprite's box is painted (into
+    scratch memory) and downsampled; it is then placed into the tile.
+    Returns {scale: Image}.
+    """
+    internal = indexed.scale
+    painted = paint(indexed, palette, scratch_buffer((*indexed.code.shape, 4)))
+
+    out = {}
+    for scale in scales:
+        factor = _scale_factor(internal, scale)
+        box = tuple(v // factor for v in indexed.box)
+        out[scale] = Image.fromarray(to_tile(downsample(painted, factor), box, scale))
+    return out
+
+
+def tile_stacks(count: int, scales: Iterable[int]) -> dict:
+    """
+    {scale: (count, H, W, 4) transparent tiles} for paint_into.
+    """
+    return {
+        scale: np.zeros((count, TILE_H * scale, TILE_W * scale, 4), dtype=np.uint8)
+        for scale in scales
+    }
+
+
+def paint_into(out: dict, i: int, indexed: IndexedSprite, palette: "np.ndarray") -> None:
+    """
+    Paint one indexed sprite into slot i of every tile stack in out
+    (see tile_stacks), downsampling from its scale.
+    """
+    if indexed.box == EMPTY_BOX:
+        return
+    painted = paint(indexed, palette, scratch_buffer((*indexed.code.shape, 4)))
+    for scale, stack in out.items():
+        factor = _scale_factor(indexed.scale, scale)
+        box = tuple(v // factor for v in indexed.box)
+        _tile_view(stack[i], (0, 0, TILE_W * scale, TILE_H * scale), box)[...] = downsample(painted, factor)
+
+
+def _scale_factor(internal: int, scale: int) -> int:
+    if internal % scale:
+        raise ValueError(f"Output scale {scale} does not divide internal scale {internal}")
+    return internal // scale
+
+
 # ============================================================
 # Convenience builders
 # ============================================================
 
 def floor_straight(rd: RunDir, length: float) -> Iterable[PipeSegment]:
     """
-    Build a straight floor pipe centered at origin.
+    Build a straight pipe centered at origin; ISO_Z is a vertical run.
     """
     half = length * 0.5
-    if rd == RunDir.ISO_X:
-        return [PipeSegment((-half, 0, 0), (half, 0, 0))]
-    if rd == RunDir.ISO_Y:
-        return [PipeSegment((0, -half, 0), (0, half, 0))]
-    return []
+    v = run_vector(rd)
+    return [PipeSegment(tuple(-c * half for c in v), tuple(c * half for c in v))]
 
 
 def floor_end(rd: RunDir, length: float) -> Iterable[PipeSegment]:
-    if rd == RunDir.ISO_X:
-        return [PipeSegment((0, 0, 0), (length, 0, 0))]
-    if rd == RunDir.ISO_Y:
-        return [PipeSegment((0, 0, 0), (0, length, 0))]
-    return []
+    """
+    Build a pipe running from the origin; ISO_Z rises off the floor.
+    """
+    return [PipeSegment((0, 0, 0), tuple(c * length for c in run_vector(rd)))]
 
 
 # ============================================================
@@ -270,7 +962,7 @@ def floor_end(rd: RunDir, length: float) -> Iterable[PipeSegment]:
 # ============================================================
 
 if __name__ == "__main__":
-    # Quick sanity render
+    # Quick sanity render (run from pipes/: python -m engine.renderer2)
     img = render_pipe(
         floor_straight(RunDir.ISO_Y, 12),
         base_color=(230, 230, 230),
@@ -4,13 +4,44 @@ Surface definitions and projection rules for:
 - north wall
 - west wall
 
-At this phase, this module defines the canonical set of supported surfaces.
-Projection math will be added later.
+Geometry in geometry.yaml is authored in logical surface units:
+- x: along the surface, to the right when facing it
+- y: along the surface, "N" is -y
+- z: out of the surface, towards the room
+
+to_iso maps a logical point onto a surface in iso space. The floor is
+the identity; each wall is a proper rotation (determinant +1) plus a
+lift:
+- wall_n: (x, y, z) -> (x, z, WALL_LIFT - y), 90 degrees about iso x
+- wall_w: (x, y, z) -> (z, -x, WALL_LIFT - y), wall_n followed by 90
+  degrees about iso z (120 degrees about the (1, -1, 1) diagonal)
+Handedness is preserved, so no geometry is mirrored.
 """
 
+from typing import Tuple
+
 # Canonical surface identifiers used throughout the pipeline
 SURFACES = [
     "floor",
     "wall_n",
     "wall_w",
-]
\ No newline at end of file
+]
+
+# Iso height of the wall-mounted pipe centerline above the floor anchor
+WALL_LIFT = 64
+
+
+def to_iso(surface: str, p: Tuple[float, float, float]) -> Tuple[float, float, float]:
+    """
+    Map a logical point on a surface to iso (x, y, z).
+    """
+    x, y, z = p
+    if surface == "floor":
+        return (x, y, z)
+    if surface == "wall_n":
+        # Wall runs along iso x; "N" climbs the wall; out of wall is +y
+        return (x, z, WALL_LIFT - y)
+    if surface == "wall_w":
+        # Wall runs along iso y (right = north = -y); out of wall is +x
+        return (z, -x, WALL_LIFT - y)
+    raise ValueError(f"Unknown surface '{surface}'")
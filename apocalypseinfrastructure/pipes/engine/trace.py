@@ -0,0 +1,137 @@
+"""
+Stage-level tracing in Chrome trace event format.
+
+Pipeline stages are wrapped in span(name, **args). Tracing is off
+unless enable() was called, in which case each span records a complete
+("X") event with its process and thread, so parallel workers and PNG
+writer threads show up as separate tracks in Perfetto or about:tracing.
+
+Worker processes trace into their own buffer and hand their events back
+with drain(); the parent merges them and writes one file.
+"""
+
+from contextlib import nullcontext
+from pathlib import Path
+import json
+import os
+import threading
+import time
+
+
+# Recorded events while enabled, else None
+_events: list | None = None
+# Threads whose names were already emitted as metadata
+_named: set = set()
+
+_DISABLED = nullcontext()
+
+
+class _Span:
+    __slots__ = ("name", "args", "t0")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = time.perf_counter_ns()
+        events = _events
+        if events is not None:
+            events.append({
+                "name": self.name,
+                "cat": "pipes",
+                "ph": "X",
+                "ts": self.t0 / 1000,
+                "dur": (t1 - self.t0) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": self.args,
+            })
+
+
+def span(name: str, **args):
+    """
+    Context manager timing one stage; free when tracing is off.
+    """
+    if _events is None:
+        return _DISABLED
+    return _Span(name, args)
+
+
+def enabled() -> bool:
+    return _events is not None
+
+
+def enable(process_name: str | None = None) -> None:
+    global _events
+    _events = []
+    _named.clear()
+    if process_name:
+        _events.append({
+            "name": "process_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "args": {"name": process_name},
+        })
+
+
+def disable() -> None:
+    global _events
+    _events = None
+
+
+def merge(events: list) -> None:
+    """
+    Add events recorded by another process (see drain).
+    """
+    if _events is not None:
+        _events.extend(events)
+
+
+def drain() -> list:
+    """
+    Take the events recorded so far (tracing stays enabled).
+    Names of newly seen threads are attached as metadata events.
+    """
+    global _events
+    if _events is None:
+        return []
+    events, _events = _events, []
+
+    pid = os.getpid()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    for tid in {e["tid"] for e in events if e["ph"] == "X"} - _named:
+        _named.add(tid)
+        if tid in names:
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": names[tid]}})
+    return events
+
+
+def write_trace(events: list, out_file: Path) -> None:
+    out_file = Path(out_file)
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    out_file.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+
+
+def summarize(events: list, top: int = 15) -> str:
+    """
+    Text table of the spans with the largest total time.
+    """
+    totals: dict = {}
+    for e in events:
+        if e["ph"] != "X":
+            continue
+        count, total, peak = totals.get(e["name"], (0, 0.0, 0.0))
+        totals[e["name"]] = (count + 1, total + e["dur"], max(peak, e["dur"]))
+
+    lines = [f"{'span':<24} {'count':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+    ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (count, total, peak) in ranked[:top]:
+        lines.append(
+            f"{name:<24} {count:>7} {total / 1000:>10.2f} {total / count / 1000:>9.2f} {peak / 1000:>9.2f}"
+        )
+    return "\n".join(lines)
@@ -3,59 +3,74 @@ Authoritative generator entrypoint.
 Produces all pipe sprites deterministically from YAML definitions.
 
 This phase:
-- Loads YAML configs
+- Loads YAML configs into typed objects (cached in binary form)
 - Validates canonical state
 - Enumerates all required variants
-- Prepares render jobs
+- Renders one sprite per render job, in batches of jobs sharing a pipe
+  set and surface (optionally across a process pool), reusing cached
+  sprites whose inputs are unchanged; every output scale is derived
+  from a single rasterization
+- Encodes PNGs on writer threads while the next jobs render; files whose
+  bytes are unchanged are left untouched
+- Packs all sprites into a trimmed texture atlas per scale, with a manifest
+- Optionally writes the labelled debug sheet
+- With --watch, stays resident and re-renders only the jobs whose
+  inputs change when a config file is saved
+- With --profile, writes a Chrome trace of every stage (per worker
+  process and writer thread) and prints the hottest spans
 
-No drawing is performed yet.
+Usage:
+    python generate.py [--jobs N] [--no-cache] [--scales 1,2]
+                       [--writers N] [--png-level N] [--png-optimize]
+                       [--atlas-size N] [--sheet] [--watch]
+                       [--profile FILE] [--out DIR]
 """
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import yaml
+import argparse
+import os
+import sys
+import time
+from PIL import Image
 
 from engine.surfaces import SURFACES
 from engine.renderer import RenderJob
-from engine.exporter import export_sprite
+from engine.exporter import (
+    DEFAULT_PNG_LEVEL,
+    PngWriter,
+    export_atlas,
+    export_sheet,
+    export_sprite,
+    export_sprites,
+    sprite_path,
+)
+from engine.cache import RenderCache, job_cache_key
+from engine.config import load_configs as load_config_files
+from engine import trace
+from engine.trace import span
 
 
 BASE_DIR = Path(__file__).parent
 CONFIG_DIR = BASE_DIR / "config"
 OUT_DIR = BASE_DIR / "generated"
+CACHE_DIRNAME = ".cache"
+CONFIG_CACHE_FILENAME = "config.pickle"
 
 
-def load_yaml(path: Path):
-    with open(path, "r") as f:
-        return yaml.safe_load(f)
-
-
-def validate_pipe_sets(pipe_sets, surfaces):
-    for name, ps in pipe_sets.items():
-        if "offsets" not in ps:
-            raise ValueError(f"Pipe set '{name}' missing offsets")
-        for surface in surfaces:
-            if surface not in ps["offsets"]:
-                raise ValueError(
-                    f"Pipe set '{name}' missing offset for surface '{surface}'"
-                )
-
-
-def validate_geometry(geometry):
-    if "pipes" not in geometry:
-        raise ValueError("geometry.yaml missing 'pipes' section")
-
-    for shape, data in geometry["pipes"].items():
-        if "segments" not in data or not data["segments"]:
-            raise ValueError(f"Shape '{shape}' has no segments defined")
+def enumerate_render_jobs(pipe_sets, geometry):
+    with span("enumerate_jobs"):
+        return _enumerate_render_jobs(pipe_sets, geometry)
 
 
-def enumerate_render_jobs(pipe_sets, geometry):
+def _enumerate_render_jobs(pipe_sets, geometry):
     jobs = []
 
     for pipe_set_name in pipe_sets.keys():
         for surface in SURFACES:
-            for shape, data in geometry["pipes"].items():
-                for variant_key in data["segments"].keys():
+            for shape, variants in geometry.pipes.items():
+                for variant_key in variants.keys():
                     jobs.append(
                         RenderJob(
                             pipe_set=pipe_set_name,
@@ -68,20 +83,553 @@ def enumerate_render_jobs(pipe_sets, geometry):
     return jobs
 
 
-def main():
-    pipe_sets = load_yaml(CONFIG_DIR / "pipe_sets.yaml")
-    lighting = load_yaml(CONFIG_DIR / "lighting.yaml")
-    geometry = load_yaml(CONFIG_DIR / "geometry.yaml")
+def load_configs(cache_dir: Path | None = None):
+    """
+    Load and validate all YAML configs (see engine.config).
+    With a cache_dir, unchanged configs are unpickled instead of parsed.
+    Returns (pipe_sets, lighting, geometry).
+    """
+    cache_file = None if cache_dir is None else cache_dir / CONFIG_CACHE_FILENAME
+    with span("load_configs"):
+        return load_config_files(CONFIG_DIR, cache_file)
+
+
+# ============================================================
+# Job execution
+# ============================================================
+
+# Per-process configs and PNG writer, set once by the pool initializer
+_worker_configs = None
+_worker_writer = None
+
+
+def _init_worker(configs, writer_threads: int, png_level: int, png_optimize: bool, profile: bool = False):
+    global _worker_configs, _worker_writer
+    _worker_configs = configs
+    _worker_writer = PngWriter(writer_threads, png_level, png_optimize)
+    if profile:
+        trace.enable(f"worker {os.getpid()}")
+
+
+def batch_jobs(jobs, size: int):
+    """
+    Split jobs into batches of consecutive jobs sharing a pipe set and
+    surface (what renderer.render_many takes), at most size jobs each.
+    Returns lists of job indices.
+    """
+    batches = []
+    for index, job in enumerate(jobs):
+        if batches:
+            last = jobs[batches[-1][-1]]
+            same = (last.pipe_set, last.surface) == (job.pipe_set, job.surface)
+            if same and len(batches[-1]) < size:
+                batches[-1].append(index)
+                continue
+        batches.append([index])
+    return batches
+
+
+def submit_jobs(
+    jobs,
+    configs,
+    out_dir: Path,
+    cache: RenderCache | None,
+    writer: PngWriter,
+    scales=(1,),
+):
+    """
+    Render a batch of jobs and queue their PNG writes, placing cached
+    sprites where keys match. Cache misses are rendered together (see
+    exporter.export_sprites).
+
+    Returns, per job, ({scale: output_path}, cache_key, from_cache,
+    {scale: Image}) or the exception the job raised. The first three
+    go to finish_job once the writes are needed; the images are the
+    rendered sprites, None for cache hits.
+    """
+    pipe_sets, lighting, geometry = configs
+
+    submitted = [None] * len(jobs)
+    keys = [None] * len(jobs)
+    misses = []
+    for index, job in enumerate(jobs):
+        try:
+            if cache is not None:
+                keys[index] = job_cache_key(job, geometry, pipe_sets, lighting, scales, writer.encoding)
+                out_files = {scale: sprite_path(out_dir, job, scale) for scale in scales}
+                with span("cache_fetch"):
+                    hit = cache.fetch(keys[index], out_files)
+                if hit:
+                    submitted[index] = (out_files, keys[index], True, None)
+                    continue
+            misses.append(index)
+        except Exception as e:
+            submitted[index] = e
+
+    try:
+        exported = export_sprites([jobs[i] for i in misses], geometry, pipe_sets, lighting, out_dir, scales, writer)
+    except Exception:
+        # Nothing is written before the whole batch renders; retry the
+        # jobs one by one so the error stays with the job that raised it
+        exported = []
+        for index in misses:
+            try:
+                exported.append(export_sprite(jobs[index], geometry, pipe_sets, lighting, out_dir, scales, writer))
+            except Exception as e:
+                exported.append(e)
+
+    for index, entry in zip(misses, exported):
+        if isinstance(entry, Exception):
+            submitted[index] = entry
+        else:
+            out_files, images = entry
+            submitted[index] = (out_files, keys[index], False, images)
+    return submitted
+
+
+def finish_job(out_files: dict, key, cached: bool, cache: RenderCache | None, writer: PngWriter):
+    """
+    Wait for a submitted job's writes and record fresh sprites in the cache.
+    Returns {scale: status} with status "cached", "wrote" or "unchanged".
+    """
+    if cached:
+        return {scale: "cached" for scale in out_files}
+
+    with span("wait_writes"):
+        written = writer.wait(out_files.values())
+    if cache is not None:
+        with span("cache_store"):
+            cache.store(key, out_files)
+    return {scale: "wrote" if written[path] else "unchanged" for scale, path in out_files.items()}
+
+
+def export_jobs(
+    jobs,
+    configs,
+    out_dir: Path,
+    cache: RenderCache | None,
+    writer: PngWriter,
+    scales=(1,),
+):
+    """
+    Export a batch of jobs, reusing the cached sprites where keys match.
+    Returns, per job, ({scale: output_path}, {scale: status},
+    {scale: Image} or None) or the exception the job raised.
+    """
+    results = []
+    for submitted in submit_jobs(jobs, configs, out_dir, cache, writer, scales):
+        if isinstance(submitted, Exception):
+            results.append(submitted)
+            continue
+        out_files, key, cached, images = submitted
+        try:
+            results.append((out_files, finish_job(out_files, key, cached, cache, writer), images))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _run_batch(jobs, out_dir: Path, cache: RenderCache | None, scales):
+    # Trace events recorded for this batch travel back with its results
+    try:
+        return export_jobs(jobs, _worker_configs, out_dir, cache, _worker_writer, scales), trace.drain()
+    except Exception as e:
+        e.trace_events = trace.drain()
+        raise
+
+
+# Most jobs rendered by one renderer.render_many call
+BATCH_SIZE = 16
+
+
+def run_jobs(
+    jobs,
+    configs,
+    out_dir: Path,
+    workers: int = 1,
+    cache: RenderCache | None = None,
+    scales=(1,),
+    writer_threads: int = 4,
+    png_level: int = DEFAULT_PNG_LEVEL,
+    png_optimize: bool = False,
+):
+    """
+    Export every job, serially or across a process pool, in batches of
+    jobs sharing a pipe set and surface (see batch_jobs).
+
+    Serially, up to 2 * writer_threads jobs have PNG writes in flight
+    while the next batch renders. Each worker process has its own
+    writer, and batches are sized so every worker gets a few of them.
+
+    Results are reported in job order regardless of completion order.
+    A failing job does not stop the others; its error is returned.
+    When tracing, worker events are merged into this process's trace.
+
+    Returns a list of (job, {scale: output_path}, {scale: status},
+    {scale: Image}, error) in job order. The images are the rendered
+    sprites (pickled back from workers), None for cache hits.
+    """
+    results = [None] * len(jobs)
+
+    if workers <= 1:
+        pending = deque()
+
+        def finish_oldest():
+            index, (out_files, key, cached, images) = pending.popleft()
+            try:
+                status = finish_job(out_files, key, cached, cache, writer)
+                results[index] = (jobs[index], out_files, status, images, None)
+            except Exception as e:
+                results[index] = (jobs[index], None, None, None, e)
+
+        with PngWriter(writer_threads, png_level, png_optimize) as writer:
+            for batch in batch_jobs(jobs, BATCH_SIZE):
+                submitted = submit_jobs([jobs[i] for i in batch], configs, out_dir, cache, writer, scales)
+                for index, entry in zip(batch, submitted):
+                    if isinstance(entry, Exception):
+                        results[index] = (jobs[index], None, None, None, entry)
+                    else:
+                        pending.append((index, entry))
+                while len(pending) > 2 * writer_threads:
+                    finish_oldest()
+            while pending:
+                finish_oldest()
+        return results
+
+    size = max(1, min(BATCH_SIZE, -(-len(jobs) // (2 * workers))))
+    batches = batch_jobs(jobs, size)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(configs, writer_threads, png_level, png_optimize, trace.enabled()),
+    ) as pool:
+        futures = [pool.submit(_run_batch, [jobs[i] for i in batch], out_dir, cache, scales) for batch in batches]
+        for batch, future in zip(batches, futures):
+            try:
+                exported, events = future.result()
+            except Exception as e:
+                trace.merge(getattr(e, "trace_events", []))
+                exported = [e] * len(batch)
+            else:
+                trace.merge(events)
+            for index, entry in zip(batch, exported):
+                if isinstance(entry, Exception):
+                    results[index] = (jobs[index], None, None, None, entry)
+                else:
+                    results[index] = (jobs[index], *entry, None)
+
+    return results
+
 
-    validate_pipe_sets(pipe_sets, SURFACES)
-    validate_geometry(geometry)
+def parse_scales(text: str):
+    """
+    "1,2" -> (1, 2)
+    """
+    try:
+        scales = sorted({int(part) for part in text.split(",") if part.strip()})
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid scale list '{text}'")
+    if not scales or scales[0] < 1:
+        raise argparse.ArgumentTypeError(f"scales must be positive integers, got '{text}'")
+    return tuple(scales)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate pipe sprites")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="render in N worker processes (0 = one per CPU, default 1)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="re-render every sprite instead of reusing cached ones",
+    )
+    parser.add_argument(
+        "--scales",
+        type=parse_scales,
+        default=(1, 2),
+        metavar="LIST",
+        help="comma-separated output scales, e.g. 1,2 (default 1,2)",
+    )
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=4,
+        metavar="N",
+        help="PNG encoder threads per process (default 4)",
+    )
+    parser.add_argument(
+        "--png-level",
+        type=int,
+        choices=range(10),
+        default=DEFAULT_PNG_LEVEL,
+        metavar="N",
+        help=f"zlib compression level 0-9 (default {DEFAULT_PNG_LEVEL})",
+    )
+    parser.add_argument(
+        "--png-optimize",
+        action="store_true",
+        help="let Pillow search for the smallest encoding (slower)",
+    )
+    parser.add_argument(
+        "--atlas-size",
+        type=int,
+        default=1024,
+        metavar="N",
+        help="maximum atlas page width/height in pixels (default 1024)",
+    )
+    parser.add_argument(
+        "--sheet",
+        action="store_true",
+        help="also write the labelled 8x8 debug sheet",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and re-render jobs whose configs change",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="FILE",
+        help="write a Chrome trace (Perfetto, about:tracing) of the run to FILE",
+    )
+    parser.add_argument(
+        "--out",
+        type=Path,
+        default=OUT_DIR,
+        metavar="DIR",
+        help=f"output directory (default {OUT_DIR})",
+    )
+    return parser.parse_args(argv)
+
+
+STATUS_LABELS = {"cached": "· cached", "wrote": "✓ wrote", "unchanged": "= unchanged"}
+
+
+def collect_results(results, sprites: dict):
+    """
+    Print per-file results and put the sprites into sprites[scale][job]:
+    the rendered images, or for cache hits the placed files, decoded.
+    Returns (failures, cache_hits).
+    """
+    failures = 0
+    hits = 0
+    for job, out_files, status, images, error in results:
+        if error is not None:
+            failures += 1
+            print(
+                f"✗ {job.pipe_set}/{job.surface}/{job.shape}_{job.variant}: "
+                f"{type(error).__name__}: {error}",
+                file=sys.stderr,
+            )
+            continue
+
+        hits += all(s == "cached" for s in status.values())
+        for scale, out_file in out_files.items():
+            print(f"{STATUS_LABELS[status[scale]]} {out_file}")
+            if images is not None:
+                sprites[scale][job] = images[scale]
+                continue
+            with Image.open(out_file) as img:
+                sprites[scale][job] = img.convert("RGBA")
+    return failures, hits
+
+
+def failed_jobs(results) -> set:
+    """
+    Jobs whose render or export raised.
+    """
+    return {job for job, *_, error in results if error is not None}
+
+
+def export_packed(sprites: dict, configs, out_dir: Path, args, sheet: bool):
+    """
+    Write the per-scale atlases (and optionally the debug sheet).
+    """
+    pipe_sets, lighting, geometry = configs
+    with PngWriter(args.writers, args.png_level, args.png_optimize) as writer:
+        for scale, scale_sprites in sprites.items():
+            manifest_file = export_atlas(
+                list(scale_sprites.items()),
+                out_dir,
+                max_size=args.atlas_size,
+                scale=scale,
+                writer=writer,
+            )
+            print(f"✓ wrote atlas {manifest_file}")
+
+        if sheet:
+            sheet_file = export_sheet(next(iter(pipe_sets)), geometry, pipe_sets, out_dir, writer)
+            print(f"✓ wrote sheet {sheet_file}")
+
+
+# ============================================================
+# Watch mode
+# ============================================================
+
+WATCH_INTERVAL = 0.05  # seconds between mtime polls
+
+
+def watched_files():
+    return sorted(CONFIG_DIR.glob("*.yaml")) + sorted((BASE_DIR / "engine").glob("*.py"))
+
+
+def _mtimes(paths):
+    stamps = {}
+    for path in paths:
+        try:
+            stamps[path] = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            pass
+    return stamps
+
+
+def job_keys(jobs, configs, scales, encoding: dict) -> dict:
+    """
+    {job: cache key}; a job needs re-rendering when its key changes.
+    """
+    pipe_sets, lighting, geometry = configs
+    return {job: job_cache_key(job, geometry, pipe_sets, lighting, scales, encoding) for job in jobs}
+
+
+def watch(args, configs, cache_dir: Path | None, sprites: dict, failed=frozenset()):
+    """
+    Re-render the jobs whose inputs change whenever a config file is
+    saved, keeping configs, compiled geometry and fonts warm in this
+    process. Engine code changes restart the process. Jobs in failed
+    (those the initial run could not render) are retried on every save
+    until they render.
+    """
+    out_dir = args.out
+    cache = None if cache_dir is None else RenderCache(cache_dir)
+    encoding = {"compress_level": args.png_level, "optimize": args.png_optimize}
+
+    jobs = enumerate_render_jobs(configs[0], configs[2])
+    keys = {
+        job: key
+        for job, key in job_keys(jobs, configs, args.scales, encoding).items()
+        if job not in failed
+    }
+    stamps = _mtimes(watched_files())
+    print(f"Watching {CONFIG_DIR}/*.yaml and engine/*.py (Ctrl+C to stop)")
+
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        now = _mtimes(watched_files())
+        if now == stamps:
+            continue
+        changed = {p for p in now.keys() | stamps.keys() if now.get(p) != stamps.get(p)}
+        stamps = now
+
+        if any(p.suffix == ".py" for p in changed):
+            print("engine changed, restarting", flush=True)
+            os.execv(sys.executable, sys.orig_argv)
+
+        t0 = time.perf_counter()
+        try:
+            new_configs = load_configs(cache_dir)
+        except Exception as e:
+            print(f"✗ config: {type(e).__name__}: {e}", file=sys.stderr)
+            continue
+
+        # Keep the old geometry object when unchanged so its compiled
+        # layers and indexed sprites stay warm
+        if new_configs[2] == configs[2]:
+            new_configs = (new_configs[0], new_configs[1], configs[2])
+        sheet = args.sheet and new_configs[0] != configs[0]
+        configs = new_configs
+
+        jobs = enumerate_render_jobs(configs[0], configs[2])
+        new_keys = job_keys(jobs, configs, args.scales, encoding)
+        dirty = [job for job in jobs if keys.get(job) != new_keys[job]]
+        for scale_sprites in sprites.values():
+            for job in scale_sprites.keys() - new_keys.keys():
+                del scale_sprites[job]
+
+        results = run_jobs(
+            dirty,
+            configs,
+            out_dir,
+            1,
+            cache,
+            args.scales,
+            args.writers,
+            args.png_level,
+            args.png_optimize,
+        )
+        failures, _ = collect_results(results, sprites)
+        # Failed jobs stay dirty until they render
+        failed = failed_jobs(results)
+        keys = {job: key for job, key in new_keys.items() if job not in failed}
+
+        if dirty or sheet:
+            export_packed(sprites, configs, out_dir, args, sheet)
+        elapsed = (time.perf_counter() - t0) * 1000
+        print(f"{len(dirty) - failures} of {len(jobs)} jobs re-rendered in {elapsed:.0f} ms", flush=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workers = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if args.profile is not None:
+        trace.enable("main")
+
+    out_dir = args.out
+    cache_dir = None if args.no_cache else out_dir / CACHE_DIRNAME
+    cache = None if cache_dir is None else RenderCache(cache_dir)
+
+    configs = load_configs(cache_dir)
+    pipe_sets, lighting, geometry = configs
 
     jobs = enumerate_render_jobs(pipe_sets, geometry)
 
     print(f"Prepared {len(jobs)} render jobs")
 
-    for job in jobs:
-        export_sprite(job, geometry, pipe_sets, lighting, OUT_DIR)
+    sprites = {scale: {} for scale in args.scales}
+    with span("run_jobs", workers=workers):
+        results = run_jobs(
+            jobs,
+            configs,
+            out_dir,
+            workers,
+            cache,
+            args.scales,
+            args.writers,
+            args.png_level,
+            args.png_optimize,
+        )
+    with span("collect_results"):
+        failures, hits = collect_results(results, sprites)
+
+    if cache is not None:
+        print(f"{hits} of {len(jobs)} sprites reused from cache")
+
+    with span("export_packed"):
+        export_packed(sprites, configs, out_dir, args, args.sheet)
+
+    if args.profile is not None:
+        # Only the initial run is traced; --watch rebuilds are not
+        events = trace.drain()
+        trace.disable()
+        trace.write_trace(events, args.profile)
+        print(f"✓ wrote trace {args.profile}")
+        print(trace.summarize(events))
+
+    if args.watch:
+        try:
+            watch(args, configs, cache_dir, sprites, failed_jobs(results))
+        except KeyboardInterrupt:
+            return
+
+    if failures:
+        print(f"{failures} of {len(jobs)} render jobs failed", file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+"""
+Golden-image regression harness for the pipes engine.
+
+Renders every RenderJob from enumerate_render_jobs at each output scale
+and compares it against the stored golden PNG with NumPy:
+- per-channel (R, G, B, A) maximum absolute delta
+- number of changed pixels
+- a heatmap image of the per-pixel delta for every mismatch
+
+Per-job render time is reported alongside. A job passes when its max
+delta and changed-pixel count are within the tolerances (exact by
+default). Any failure, including a missing golden, exits non-zero.
+
+After an intended rendering change, re-record with --update.
+
+Usage:
+    python golden.py [--update] [--filter TEXT] [--scales 1,2]
+                     [--max-delta N] [--max-changed N]
+                     [--golden DIR] [--diff-dir DIR]
+"""
+
+from pathlib import Path
+import argparse
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+import generate
+from engine.exporter import sprite_key, sprite_path, scale_suffix, write_png
+from engine.renderer import render_scales
+
+
+GOLDEN_DIR = generate.BASE_DIR / "golden"
+DIFF_DIR = generate.OUT_DIR / "golden-diff"
+
+
+def image_diff(actual: np.ndarray, expected: np.ndarray) -> dict:
+    """
+    Compare two (H, W, 4) uint8 sprites.
+
+    Returns {"max_delta": (r, g, b, a), "changed": n, "delta": (H, W) uint8}
+    where delta is the per-pixel max channel delta.
+    """
+    d = np.abs(actual.astype(np.int16) - expected.astype(np.int16)).astype(np.uint8)
+    delta = d.max(axis=-1)
+    return {
+        "max_delta": tuple(int(c) for c in d.reshape(-1, 4).max(axis=0)),
+        "changed": int(np.count_nonzero(delta)),
+        "delta": delta,
+    }
+
+
+def heatmap(delta: np.ndarray, expected: np.ndarray) -> Image.Image:
+    """
+    Changed pixels in red (brighter = larger delta) over a faded
+    grayscale of the expected sprite.
+    """
+    gray = expected[..., :3].mean(axis=-1) * (expected[..., 3] / 255.0) * 0.25
+    out = np.zeros((*delta.shape, 3), dtype=np.uint8)
+    out[...] = gray[..., None].astype(np.uint8)
+    hot = delta > 0
+    out[hot] = 0
+    out[hot, 0] = np.maximum(delta[hot], 64)
+    return Image.fromarray(out, "RGB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare rendered sprites against golden images")
+    parser.add_argument("--update", action="store_true", help="re-record the golden images")
+    parser.add_argument("--filter", default="", metavar="TEXT", help="only check jobs whose key contains TEXT")
+    parser.add_argument(
+        "--scales",
+        type=generate.parse_scales,
+        default=(1, 2),
+        metavar="LIST",
+        help="comma-separated output scales (default 1,2)",
+    )
+    parser.add_argument("--max-delta", type=int, default=0, metavar="N", help="allowed per-channel delta (default 0)")
+    parser.add_argument("--max-changed", type=int, default=0, metavar="N", help="allowed changed pixels (default 0)")
+    parser.add_argument("--golden", type=Path, default=GOLDEN_DIR, metavar="DIR", help=f"golden images (default {GOLDEN_DIR})")
+    parser.add_argument("--diff-dir", type=Path, default=DIFF_DIR, metavar="DIR", help=f"heatmaps (default {DIFF_DIR})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    pipe_sets, lighting, geometry = generate.load_configs()
+    jobs = [
+        job
+        for job in generate.enumerate_render_jobs(pipe_sets, geometry)
+        if args.filter in sprite_key(job)
+    ]
+
+    failures = 0
+    total_ms = 0.0
+    for job in jobs:
+        t0 = time.perf_counter()
+        images = render_scales(job, geometry, pipe_sets, args.scales, lighting)
+        ms = (time.perf_counter() - t0) * 1000
+        total_ms += ms
+
+        for scale, img in images.items():
+            key = f"{sprite_key(job)}{scale_suffix(scale)}"
+            golden_file = sprite_path(args.golden, job, scale)
+
+            if args.update:
+                written = write_png(img, golden_file)
+                print(f"{'✓ wrote' if written else '= unchanged'} {golden_file}")
+                continue
+
+            if not golden_file.exists():
+                failures += 1
+                print(f"✗ {key}: missing golden (run with --update)", file=sys.stderr)
+                continue
+
+            actual = np.asarray(img.convert("RGBA"))
+            with Image.open(golden_file) as golden:
+                expected = np.asarray(golden.convert("RGBA"))
+            if actual.shape != expected.shape:
+                failures += 1
+                print(f"✗ {key}: size {actual.shape[1::-1]} != golden {expected.shape[1::-1]}", file=sys.stderr)
+                continue
+
+            diff = image_diff(actual, expected)
+            if max(diff["max_delta"]) <= args.max_delta and diff["changed"] <= args.max_changed:
+                print(f"✓ {key:<48} {ms:8.2f} ms")
+                continue
+
+            failures += 1
+            heat_file = sprite_path(args.diff_dir, job, scale)
+            heat_file.parent.mkdir(parents=True, exist_ok=True)
+            heatmap(diff["delta"], expected).save(heat_file)
+            print(
+                f"✗ {key:<48} {ms:8.2f} ms  max Δ rgba {diff['max_delta']}  "
+                f"{diff['changed']} px changed  -> {heat_file}",
+                file=sys.stderr,
+            )
+
+    print(f"{len(jobs)} jobs rendered in {total_ms:.0f} ms")
+    if failures:
+        print(f"{failures} sprites differ from golden", file=sys.stderr)
+        sys.exit(1)
+    if not args.update:
+        print("✓ all sprites match golden")
+
+
+if __name__ == "__main__":
+    main()
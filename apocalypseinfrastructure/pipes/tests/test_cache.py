@@ -0,0 +1,85 @@
+import os
+
+from engine.cache import RenderCache, _place, job_cache_key
+from engine.exporter import write_bytes
+from engine.renderer import RenderJob
+
+
+JOB = RenderJob("steel_basic", "floor", "cross", "NESW")
+
+
+def rendered(tmp_path, scales=(1, 2)):
+    """
+    {scale: path} of freshly "rendered" sprites in an output directory.
+    """
+    files = {}
+    for scale in scales:
+        path = tmp_path / "out" / f"sprite@{scale}x.png"
+        write_bytes(f"pixels {scale}".encode(), path)
+        files[scale] = path
+    return files
+
+
+def test_store_then_fetch_is_a_hit(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    cache.store("ab12", rendered(tmp_path))
+
+    dests = {scale: tmp_path / "other" / f"hit@{scale}x.png" for scale in (1, 2)}
+    assert cache.fetch("ab12", dests)
+    for scale, dest in dests.items():
+        assert dest.read_bytes() == f"pixels {scale}".encode()
+        assert os.path.samefile(dest, cache.artifact_path("ab12", scale))
+
+
+def test_fetch_misses_unless_every_scale_is_cached(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    cache.store("ab12", rendered(tmp_path, scales=(1,)))
+
+    dests = {scale: tmp_path / "other" / f"miss@{scale}x.png" for scale in (1, 2)}
+    assert not cache.fetch("ab12", dests)
+    assert not any(dest.exists() for dest in dests.values())
+    assert not cache.fetch("cd34", {1: dests[1]})
+
+
+def test_store_hardlinks_outputs(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    files = rendered(tmp_path)
+    cache.store("ab12", files)
+    for scale, src in files.items():
+        assert os.path.samefile(src, cache.artifact_path("ab12", scale))
+    # Placing an already linked file again is a no-op
+    _place(files[1], cache.artifact_path("ab12", 1))
+    assert os.path.samefile(files[1], cache.artifact_path("ab12", 1))
+    assert not list((tmp_path / "cache").rglob("*.tmp"))
+
+
+def test_rewriting_an_output_leaves_the_cached_artifact_alone(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    files = rendered(tmp_path)
+    cache.store("ab12", files)
+
+    # write_bytes replaces the file instead of writing through the link
+    assert write_bytes(b"edited", files[1])
+    assert files[1].read_bytes() == b"edited"
+    artifact = cache.artifact_path("ab12", 1)
+    assert artifact.read_bytes() == b"pixels 1"
+    assert not os.path.samefile(files[1], artifact)
+
+
+def test_place_replaces_a_different_file(tmp_path):
+    src = tmp_path / "src.png"
+    dest = tmp_path / "deep" / "dest.png"
+    src.write_bytes(b"new")
+    dest.parent.mkdir()
+    dest.write_bytes(b"old")
+    _place(src, dest)
+    assert dest.read_bytes() == b"new"
+    assert os.path.samefile(src, dest)
+
+
+def test_cache_key_covers_scales_and_encoding(configs):
+    pipe_sets, lighting, geometry = configs
+    key = job_cache_key(JOB, geometry, pipe_sets, lighting, (1, 2), {"compress_level": 6})
+    assert key == job_cache_key(JOB, geometry, pipe_sets, lighting, (2, 1), {"compress_level": 6})
+    assert key != job_cache_key(JOB, geometry, pipe_sets, lighting, (1,), {"compress_level": 6})
+    assert key != job_cache_key(JOB, geometry, pipe_sets, lighting, (1, 2), {"compress_level": 9})
@@ -0,0 +1,64 @@
+import pickle
+
+import pytest
+import yaml
+
+from engine.config import FrozenDict, parse_geometry, parse_lighting, parse_pipe_sets
+from generate import CONFIG_DIR
+
+
+def raw(name):
+    return yaml.safe_load((CONFIG_DIR / name).read_text(encoding="utf-8"))
+
+
+@pytest.fixture
+def raw_pipe_set():
+    return raw("pipe_sets.yaml")["steel_basic"]
+
+
+@pytest.mark.parametrize("block", ["colors", "seams", "rust", "offsets"])
+def test_pipe_set_blocks_must_be_mappings(raw_pipe_set, block):
+    raw_pipe_set[block] = True
+    with pytest.raises(ValueError, match=rf"steel_basic\.{block} must be a mapping"):
+        parse_pipe_sets({"steel_basic": raw_pipe_set})
+
+
+@pytest.mark.parametrize("thickness", [0, -4])
+def test_thickness_must_be_positive(raw_pipe_set, thickness):
+    raw_pipe_set["thickness"] = thickness
+    with pytest.raises(ValueError, match="steel_basic.thickness must be at least 1"):
+        parse_pipe_sets({"steel_basic": raw_pipe_set})
+
+
+@pytest.mark.parametrize("key", ["spacing", "width"])
+def test_seams_must_not_be_negative(raw_pipe_set, key):
+    raw_pipe_set["seams"][key] = -1
+    with pytest.raises(ValueError, match=rf"steel_basic\.seams\.{key} must not be negative"):
+        parse_pipe_sets({"steel_basic": raw_pipe_set})
+
+
+@pytest.mark.parametrize("block", ["global", "highlights", "surfaces"])
+def test_lighting_blocks_must_be_mappings(block):
+    lighting = raw("lighting.yaml")
+    lighting[block] = True
+    with pytest.raises(ValueError, match=rf"lighting.yaml: {block} must be a mapping"):
+        parse_lighting(lighting)
+
+
+@pytest.mark.parametrize("block", ["tile", "anchor", "pipes"])
+def test_geometry_blocks_must_be_mappings(block):
+    geometry = raw("geometry.yaml")
+    geometry[block] = 5
+    with pytest.raises(ValueError, match=rf"geometry.yaml: {block} must be a mapping"):
+        parse_geometry(geometry)
+
+
+def test_parsed_configs_are_read_only(configs):
+    pipe_sets, lighting, geometry = configs
+    with pytest.raises(TypeError, match="read-only"):
+        lighting.surfaces["floor"] = None
+    with pytest.raises(TypeError, match="read-only"):
+        geometry.pipes.clear()
+    offsets = pipe_sets["steel_basic"].offsets
+    assert isinstance(offsets, FrozenDict)
+    assert pickle.loads(pickle.dumps(offsets)) == offsets
@@ -0,0 +1,85 @@
+import os
+import threading
+
+import pytest
+from PIL import Image
+
+from engine import exporter
+from engine.exporter import PngWriter, write_bytes
+
+
+def solid(color) -> Image.Image:
+    return Image.new("RGBA", (4, 4), color)
+
+
+def test_identical_bytes_are_not_rewritten(tmp_path):
+    out_file = tmp_path / "a" / "sprite.png"
+    assert write_bytes(b"pixels", out_file)
+    stamp = 1_000_000_000_000_000_000
+    os.utime(out_file, ns=(stamp, stamp))
+
+    assert not write_bytes(b"pixels", out_file)
+    assert out_file.stat().st_mtime_ns == stamp
+
+    assert write_bytes(b"other", out_file)
+    assert out_file.read_bytes() == b"other"
+    assert out_file.stat().st_mtime_ns != stamp
+
+
+def test_failed_write_removes_temp_file(tmp_path, monkeypatch):
+    out_file = tmp_path / "sprite.png"
+    out_file.write_bytes(b"old")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(exporter.os, "replace", fail)
+    with pytest.raises(OSError, match="disk full"):
+        write_bytes(b"new", out_file)
+    assert out_file.read_bytes() == b"old"
+    assert list(tmp_path.iterdir()) == [out_file]
+
+
+def test_resubmitted_path_waits_for_pending_write(tmp_path, monkeypatch):
+    release = threading.Event()
+    order = []
+    real_write_png = exporter.write_png
+
+    def slow_first(img, out_file, *args):
+        if not order:
+            order.append("first started")
+            release.wait(5)
+        result = real_write_png(img, out_file, *args)
+        order.append(img.getpixel((0, 0)))
+        return result
+
+    monkeypatch.setattr(exporter, "write_png", slow_first)
+    out_file = tmp_path / "sprite.png"
+    with PngWriter(threads=2) as writer:
+        writer.submit(solid((255, 0, 0, 255)), out_file)
+        threading.Timer(0.05, release.set).start()
+        writer.submit(solid((0, 0, 255, 255)), out_file)
+        writer.wait([out_file])
+
+    assert order == ["first started", (255, 0, 0, 255), (0, 0, 255, 255)]
+    with Image.open(out_file) as img:
+        assert img.getpixel((0, 0)) == (0, 0, 255, 255)
+
+
+def test_resubmitted_path_reports_pending_failure(tmp_path, monkeypatch):
+    calls = []
+
+    def fail_first(img, out_file, *args):
+        calls.append(out_file)
+        if len(calls) == 1:
+            raise OSError("first write failed")
+        return True
+
+    monkeypatch.setattr(exporter, "write_png", fail_first)
+    out_file = tmp_path / "sprite.png"
+    with PngWriter(threads=1) as writer:
+        writer.submit(solid((255, 0, 0, 255)), out_file)
+        with pytest.raises(OSError, match="first write failed"):
+            writer.submit(solid((0, 0, 255, 255)), out_file)
+    # The second write was never queued
+    assert calls == [out_file]
@@ -0,0 +1,34 @@
+import numpy as np
+
+import generate
+from engine.cache import RenderCache
+from engine.renderer import RenderJob
+
+
+JOBS = [RenderJob("steel_basic", "floor", "cross", "NESW"), RenderJob("steel_basic", "wall_n", "straight", "NS")]
+SCALES = (1, 2)
+
+
+def test_collect_results_decodes_only_cache_hits(configs, tmp_path, monkeypatch):
+    out_dir = tmp_path / "out"
+    cache = RenderCache(tmp_path / "cache")
+    fresh = generate.run_jobs(JOBS, configs, out_dir, cache=cache, scales=SCALES)
+    cached = generate.run_jobs(JOBS, configs, out_dir, cache=cache, scales=SCALES)
+    assert all(images is not None for *_, images, _ in fresh)
+    assert all(images is None for *_, images, _ in cached)
+
+    opened = []
+    real_open = generate.Image.open
+    monkeypatch.setattr(generate.Image, "open", lambda path: opened.append(path) or real_open(path))
+
+    rendered = {scale: {} for scale in SCALES}
+    assert generate.collect_results(fresh, rendered) == (0, 0)
+    assert opened == []
+
+    decoded = {scale: {} for scale in SCALES}
+    assert generate.collect_results(cached, decoded) == (0, len(JOBS))
+    assert len(opened) == len(JOBS) * len(SCALES)
+
+    for scale in SCALES:
+        for job in JOBS:
+            np.testing.assert_array_equal(np.asarray(rendered[scale][job]), np.asarray(decoded[scale][job]))
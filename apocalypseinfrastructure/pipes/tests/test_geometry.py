@@ -0,0 +1,40 @@
+from dataclasses import replace
+
+from engine import geometry as geometry_module
+from engine.config import FrozenDict, load_configs
+from engine.geometry import compile_geometry, compiled_geometry
+from generate import CONFIG_DIR
+
+
+def test_reloaded_geometry_reuses_compilation(configs):
+    _, _, geometry = configs
+    compiled = compiled_geometry(geometry)
+    _, _, reloaded = load_configs(CONFIG_DIR)
+    assert reloaded is not geometry
+    assert compiled_geometry(reloaded) is compiled
+
+
+def test_changed_geometry_replaces_compilation(configs):
+    _, _, geometry = configs
+    compiled = compiled_geometry(geometry, 5)
+    straight = FrozenDict(straight=geometry.pipes["straight"])
+    changed = compiled_geometry(replace(geometry, pipes=straight), 5)
+    assert changed is not compiled
+    assert set(shape for _, shape, _ in changed.shapes) == {"straight"}
+    # Only the current geometry is kept per scale
+    assert geometry_module._compiled_cache[5][1] is changed
+    assert compiled_geometry(geometry, 5) is not compiled
+
+
+def test_compiled_caches_are_bounded(configs, monkeypatch):
+    _, _, geometry = configs
+    monkeypatch.setattr(geometry_module, "LAYER_CACHE_SIZE", 4)
+    monkeypatch.setattr(geometry_module, "INDEXED_CACHE_SIZE", 3)
+    compiled = compile_geometry(geometry)
+    for key in compiled.shapes:
+        for thickness in (2, 4, 6):
+            compiled.indexed(key, thickness)
+    assert len(compiled._layers) == 4
+    assert len(compiled._indexed) == 3
+    # The most recent entry is still served from the cache
+    assert compiled.indexed(key, 6) is compiled.indexed(key, 6)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import generate
+from engine.exporter import sprite_key, sprite_path
+from engine.renderer import render_scales
+from golden import GOLDEN_DIR, image_diff
+
+
+SCALES = (1, 2)
+PIPE_SETS, LIGHTING, GEOMETRY = generate.load_configs()
+JOBS = generate.enumerate_render_jobs(PIPE_SETS, GEOMETRY)
+
+
+@pytest.mark.parametrize("job", JOBS, ids=sprite_key)
+def test_sprites_match_golden(job):
+    images = render_scales(job, GEOMETRY, PIPE_SETS, SCALES, LIGHTING)
+    for scale in SCALES:
+        golden_file = sprite_path(GOLDEN_DIR, job, scale)
+        assert golden_file.exists(), f"missing golden {golden_file} (run golden.py --update)"
+        with Image.open(golden_file) as golden:
+            expected = np.asarray(golden.convert("RGBA"))
+        actual = np.asarray(images[scale].convert("RGBA"))
+        assert actual.shape == expected.shape
+
+        diff = image_diff(actual, expected)
+        assert diff["changed"] == 0, f"{scale}x: max delta rgba {diff['max_delta']}, {diff['changed']} px changed"
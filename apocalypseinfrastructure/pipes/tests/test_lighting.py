@@ -0,0 +1,131 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from engine.cache import job_cache_key
+from engine.config import Rust, Seams, parse_lighting
+from engine.lighting import surface_lut, surface_shadow
+from engine.renderer import RenderJob, render_scales
+from engine.renderer2 import (
+    HILITE_SHADES,
+    WHITE,
+    PipeSegment,
+    project_segment,
+    rasterize_layer,
+)
+
+
+# A wall pipe running straight down the screen: its strip normal faces -x
+VERTICAL = RenderJob("steel_basic", "wall_n", "straight", "NS")
+
+
+@pytest.fixture
+def plain(configs):
+    """
+    Shipped pipe sets without seams or rust, so every body pixel is the
+    body color modulated by its shade only.
+    """
+    pipe_sets, _, geometry = configs
+    pipe_sets = {
+        name: replace(ps, seams=Seams(enabled=False, spacing=0, width=0), rust=Rust(enabled=False))
+        for name, ps in pipe_sets.items()
+    }
+    return pipe_sets, geometry
+
+
+def lighting_with(raw, **changes):
+    for section, values in changes.items():
+        raw.setdefault(section, {}).update(values)
+    return parse_lighting(raw)
+
+
+def strip_row(plain, lighting):
+    """
+    Body pixels across the VERTICAL sprite, a quarter of the way down
+    (clear of the endcaps and the hub joint), as brightness relative to
+    the unshaded body color (> 0 highlighted, < 0 shaded). The center
+    pixel is left out: samples that round to the same pixel have no
+    tangent, and their collapsed strips land there.
+    """
+    pipe_sets, geometry = plain
+    img = render_scales(VERTICAL, geometry, pipe_sets, (1,), lighting)[1]
+    rgba = np.asarray(img).astype(int)
+    ys, xs = np.nonzero(rgba[..., 3] == 255)
+    row = rgba[(3 * ys.min() + ys.max()) // 4]
+    body = row[row[:, 3] == 255]
+    assert len(body) == 5  # thickness 4
+    return np.delete(body[:, 0], 2) - pipe_sets[VERTICAL.pipe_set].colors.body[0]
+
+
+def test_light_direction_selects_lit_side(plain, raw_lighting):
+    towards = lighting_with(raw_lighting, **{"global": {"light_direction": [-1, 0]}})
+    away = lighting_with(raw_lighting, **{"global": {"light_direction": [1, 0]}})
+
+    lit = strip_row(plain, towards)
+    shaded = strip_row(plain, away)
+    assert (lit[[0, -1]] > 0).all()
+    assert (shaded < 0).all()
+
+
+def test_flipped_light_swaps_lit_and_shaded_pixels():
+    # A floor cross: arms on opposite sides of the hub face opposite ways
+    projected = [
+        project_segment(PipeSegment((0, 0, 0), end))
+        for end in ((4, 0, 0), (-4, 0, 0), (0, 4, 0), (0, -4, 0))
+    ]
+    hilite = list(HILITE_SHADES)
+    for ps in projected:
+        a = rasterize_layer(ps, light=(1.0, -1.0))
+        b = rasterize_layer(ps, light=(-1.0, 1.0))
+        assert a.box == b.box
+        np.testing.assert_array_equal(a.shade >= 0, b.shade >= 0)
+        lit_a = np.isin(a.shade, hilite)
+        lit_b = np.isin(b.shade, hilite)
+        assert not (lit_a & lit_b).any()
+    # Across the whole cross both directions light something
+    assert any(np.isin(rasterize_layer(ps, light=(1.0, -1.0)).shade, hilite).any() for ps in projected)
+    assert any(np.isin(rasterize_layer(ps, light=(-1.0, 1.0)).shade, hilite).any() for ps in projected)
+
+
+@pytest.mark.parametrize("thickness, lit", [(0, 0), (1, 2), (2, 4)])
+def test_highlight_thickness_sets_band_width(plain, raw_lighting, thickness, lit):
+    lighting = lighting_with(
+        raw_lighting,
+        **{"global": {"light_direction": [-1, 0]}, "highlights": {"thickness": thickness}},
+    )
+    # Rim pixels are the edge band, the next ones in the first inner band
+    row = strip_row(plain, lighting)
+    assert (row > 0).sum() == lit
+    assert (row >= 0).all()
+
+
+@pytest.mark.parametrize("thickness", range(6))
+def test_highlight_thickness_sets_lit_lut_bands(raw_lighting, thickness):
+    lighting = lighting_with(raw_lighting, highlights={"thickness": thickness})
+    lut = surface_lut(lighting.surfaces["floor"], lighting.highlights)
+    lit = [lut[shade] for shade in HILITE_SHADES]
+    assert [color == WHITE and alpha > 0 for color, alpha in lit] == [
+        band < thickness for band in range(len(HILITE_SHADES))
+    ]
+
+
+def test_shadow_direction_sets_drop_shadow_offset(raw_lighting):
+    lighting = lighting_with(raw_lighting, **{"global": {"shadow_direction": [1, -1]}})
+    floor = lighting.surfaces["floor"]
+    assert floor.shadow_offset == (-4, 4)
+    assert surface_shadow(floor, lighting.shadow_direction).offset == (4, -4)
+    assert surface_shadow(floor, (0, 1)).offset == (0, 6)
+
+
+def test_directions_are_part_of_cache_key(configs, raw_lighting):
+    pipe_sets, lighting, geometry = configs
+    key = job_cache_key(VERTICAL, geometry, pipe_sets, lighting)
+    for name in ("light_direction", "shadow_direction"):
+        flipped = lighting_with(raw_lighting, **{"global": {name: [-1, -1]}})
+        assert job_cache_key(VERTICAL, geometry, pipe_sets, flipped) != key
+
+
+def test_zero_direction_is_rejected(raw_lighting):
+    with pytest.raises(ValueError, match="light_direction must not be zero"):
+        lighting_with(raw_lighting, **{"global": {"light_direction": [0, 0]}})
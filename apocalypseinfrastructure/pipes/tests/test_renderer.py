@@ -0,0 +1,136 @@
+from dataclasses import replace
+import random
+
+import numpy as np
+import pytest
+
+from engine import trace
+from engine.config import load_configs
+from engine.geometry import compiled_geometry, surface_segments
+from engine.renderer import RenderJob, job_label, render_many_scales, render_scales
+from engine.renderer2 import PIPE_RADIUS, PipeSegment, RunDir, floor_end, floor_straight, render_pipe
+from engine.surfaces import SURFACES
+from generate import CONFIG_DIR
+
+
+VERTICAL = RenderJob("steel_basic", "wall_n", "straight", "NS")
+SHAPES = [("straight", "EW"), ("elbow", "NE"), ("tee", "NEW"), ("cross", "NESW")]
+
+GEOMETRY = load_configs(CONFIG_DIR)[2]
+# (surface, shape, variant) of every geometry.yaml shape on every surface
+SHAPE_KEYS = [
+    (surface, shape, variant)
+    for surface in SURFACES
+    for shape, variants in GEOMETRY.pipes.items()
+    for variant in variants
+]
+
+
+def random_segments(seed: int):
+    """
+    Up to four segments with integer, fractional and axis-aligned ends.
+    """
+    rng = random.Random(seed)
+    segments = []
+    for _ in range(rng.randint(1, 4)):
+        a = tuple(rng.choice([rng.randint(-40, 40), rng.uniform(-40, 40)]) for _ in range(3))
+        b = tuple(rng.choice([rng.randint(-40, 40), rng.uniform(-40, 40), a[k]]) for k in range(3))
+        segments.append(PipeSegment(a, b))
+    return segments
+
+
+def assert_paths_match(segments, base_color=(160, 160, 160)):
+    expected = np.asarray(render_pipe(segments, base_color, vectorized=False))
+    actual = np.asarray(render_pipe(segments, base_color, vectorized=True))
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("key", SHAPE_KEYS, ids="/".join)
+def test_vectorized_matches_pixel_path_for_shapes(key):
+    assert_paths_match(surface_segments(GEOMETRY, *key))
+
+
+@pytest.mark.parametrize("factor", [0.5, 1.5, 2, 3])
+@pytest.mark.parametrize("key", SHAPE_KEYS, ids="/".join)
+def test_vectorized_matches_pixel_path_for_scaled_shapes(key, factor):
+    # The pixel path is 1x only; scaled coordinates change the sample density
+    assert_paths_match(
+        [
+            PipeSegment(tuple(c * factor for c in seg.start), tuple(c * factor for c in seg.end))
+            for seg in surface_segments(GEOMETRY, *key)
+        ]
+    )
+
+
+@pytest.mark.parametrize("length", [1, 2.5, 7, 12, 30])
+@pytest.mark.parametrize("build", [floor_straight, floor_end])
+@pytest.mark.parametrize("run", list(RunDir), ids=lambda rd: rd.name)
+def test_vectorized_matches_pixel_path_for_runs(run, build, length):
+    assert_paths_match(build(run, length), base_color=(100, 150, 200))
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_vectorized_matches_pixel_path_for_random_segments(seed):
+    assert_paths_match(random_segments(seed), base_color=(200, 90, 40))
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+@pytest.mark.parametrize("key", SHAPE_KEYS, ids="/".join)
+def test_segment_order_does_not_change_hub(key, vectorized):
+    segments = surface_segments(GEOMETRY, *key)
+    forward = np.asarray(render_pipe(segments, (160, 160, 160), vectorized))
+    reverse = np.asarray(render_pipe(segments[::-1], (160, 160, 160), vectorized))
+    np.testing.assert_array_equal(forward, reverse)
+
+
+def body_width(img) -> int:
+    """
+    Opaque pixels across a vertical pipe, a quarter of the way down.
+    """
+    alpha = np.asarray(img)[..., 3]
+    ys = np.nonzero((alpha == 255).any(axis=1))[0]
+    return int((alpha[(3 * ys.min() + ys.max()) // 4] == 255).sum())
+
+
+@pytest.mark.parametrize("thickness", [2, 4, 5, 6, 8])
+@pytest.mark.parametrize("scale", [1, 2])
+def test_thickness_sets_pipe_width(configs, thickness, scale):
+    pipe_sets, lighting, geometry = configs
+    pipe_set = replace(pipe_sets[VERTICAL.pipe_set], thickness=thickness)
+    sprite = render_scales(VERTICAL, geometry, {VERTICAL.pipe_set: pipe_set}, (scale,), lighting)[scale]
+    # Arm radius is thickness / 2 (1x pixels): a strip of 2 * int(radius) + 1
+    assert body_width(sprite) == 2 * int(thickness / 2 * scale) + 1
+
+
+def test_default_radius_is_thickness_4(configs):
+    _, _, geometry = configs
+    compiled = compiled_geometry(geometry)
+    key = ("floor", "cross", "NESW")
+    assert PIPE_RADIUS == 4 / 2
+    for a, b in zip(compiled.layers(key), compiled.layers(key, 4 / 2)):
+        assert a is b
+
+
+def test_render_many_traces_every_job(configs):
+    pipe_sets, lighting, geometry = configs
+    jobs = [RenderJob("steel_basic", "floor", shape, variant) for shape, variant in SHAPES]
+    trace.enable()
+    try:
+        stacks = render_many_scales(jobs, geometry, pipe_sets, (1, 2), lighting)
+        events = [e for e in trace.drain() if e["ph"] == "X"]
+    finally:
+        trace.disable()
+
+    (batch,) = [e for e in events if e["name"] == "render_many"]
+    assert batch["args"]["jobs"] == len(jobs)
+    renders = [e for e in events if e["name"] == "render"]
+    assert [e["args"]["job"] for e in renders] == [job_label(job) for job in jobs]
+    for e in renders:
+        assert batch["ts"] <= e["ts"] and e["ts"] + e["dur"] <= batch["ts"] + batch["dur"]
+    assert [e["name"] for e in events].count("paint") == len(jobs)
+
+    # Same pixels as rendering the jobs one by one
+    for i, job in enumerate(jobs):
+        single = render_scales(job, geometry, pipe_sets, (1, 2), lighting)
+        for scale, stack in stacks.items():
+            np.testing.assert_array_equal(stack[i], np.asarray(single[scale]))
@@ -0,0 +1,317 @@
+"""
+Scaling benchmark for gen-items.py generate and verify.
+
+Builds synthetic food workbooks matching the definitions, evolved and
+containerized sheet schemas (default 1k, 10k and 100k rows per sheet)
+and runs every scenario in a fresh subprocess:
+- generate-cold: no sheet cache, no manifest, no previous outputs
+- generate-warm: sheet cache hit, manifest bypassed (--force)
+- generate-noop: manifest current, nothing to do
+- verify: against the outputs of the runs above
+
+For each run it reports wall time, time per phase (exclusive, so
+nested phases are not double counted) and the subprocess's peak RSS.
+
+Usage:
+    python bench-items.py [--sizes 1000,10000,100000] [--work DIR]
+                          [--rebuild] [--json FILE]
+"""
+
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+import argparse
+import importlib.util
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows; RSS is reported as n/a
+    resource = None
+
+
+GEN_ITEMS = Path(__file__).with_name("gen-items.py")
+WORK_DIR = Path(__file__).with_name("bench")
+
+SIZES_DEFAULT = (1000, 10000, 100000)
+SEED = 20240101
+
+SCENARIOS = ("generate-cold", "generate-warm", "generate-noop", "verify")
+
+# phase -> gen-items.py functions whose (exclusive) time it collects
+PHASES = {
+    "hash": ("file_sha256", "generate_input_hash"),
+    "sheets": ("load_xlsx_sheets",),
+    "rows": ("load_definitions_sheet", "load_evolved_matrix", "load_containerized_sheet"),
+    "emit+write": ("write_lines",),
+    "tables": ("read_domain_table",),
+}
+
+DEFINITION_COLUMNS = [
+    "module", "piece_name", "icon", "display_category", "base_hunger", "hunger_change",
+    "thirst_change", "calories", "proteins", "lipids", "carbohydrates", "weight",
+    "weight_full", "weight_empty", "days_fresh", "days_totally_rotten", "boredom_change",
+    "unhappy_change", "food_type", "is_cookable", "dangerous_uncooked", "tags",
+    "chop_input_item_types", "chop_required_tools",
+]
+
+EVOLVED_RECIPES = [
+    "Soup", "Stew", "Salad", "Stir fry", "Stir fry Griddle Pan", "Roasted Vegetables",
+    "Sandwich", "Sandwich Baguette", "Burger", "Pie", "RicePot", "RicePan", "PastaPot",
+    "PastaPan", "Taco", "Burrito", "Omelette", "Pizza",
+]
+
+ICONS = ["MincedMeat", "Cabbage", "Carrots", "Potato", "FishFillet", "Apple"]
+FOOD_TYPES = ["Meat", "Fish", "Vegetable", "Fruits"]
+MODULE = "KitchenConsolidation"
+
+
+# --- Synthetic workbooks ---
+
+def synthetic_piece(i: int) -> str:
+    return f"Synth{i:06d}Pieces"
+
+
+def definition_row(rng: random.Random, i: int) -> list:
+    food_type = rng.choice(FOOD_TYPES)
+    hunger = rng.choice([-5, -10, -15, -20, -25])
+
+    if rng.random() < 0.7:
+        nutrition = [rng.randint(20, 400), rng.randint(0, 30), rng.randint(0, 20), rng.randint(0, 60)]
+    else:
+        nutrition = ["-"] * 4
+
+    if rng.random() < 0.9:
+        fresh = rng.randint(1, 7)
+        freshness = [fresh, fresh + rng.randint(1, 5)]
+    else:
+        freshness = ["-", "-"]
+
+    if rng.random() < 0.5:
+        mood = [rng.randint(-10, 10), rng.randint(-10, 10)]
+    else:
+        mood = ["-", "-"]
+
+    weight = round(rng.uniform(0.05, 0.5), 2)
+    chop = f"Base.Synth{i:06d}" if rng.random() < 0.8 else "-"
+
+    return [
+        MODULE, synthetic_piece(i), rng.choice(ICONS), "Food",
+        hunger, hunger, rng.choice([0, -5, -15]),
+        *nutrition,
+        weight, weight, 0,
+        *freshness,
+        *mood,
+        food_type, True, True if food_type in ("Meat", "Fish") else "-",
+        f"{food_type};Prepared;Ingredient",
+        chop, "[Recipe.GetItemTypes.SharpKnife]|Base.MeatCleaver",
+    ]
+
+
+def evolved_row(rng: random.Random, i: int) -> list:
+    values = [rng.randint(5, 15) if rng.random() < 0.6 else None for _ in EVOLVED_RECIPES]
+    return [MODULE, synthetic_piece(i), *values]
+
+
+def containerized_row(rng: random.Random, i: int) -> list:
+    # Every fourth entry containerizes one of the synthetic pieces
+    if i % 4 == 0:
+        return [f"{MODULE}.{synthetic_piece(rng.randrange(i + 1))}", None]
+    return [f"Base.SynthCan{i:06d}Open", "Base.TinCanEmpty"]
+
+
+def build_workbook(path: Path, rows: int, seed: int = SEED):
+    """
+    Write a synthetic food workbook with `rows` rows in every sheet.
+    """
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet("definitions")
+    ws.append(DEFINITION_COLUMNS)
+    for i in range(rows):
+        ws.append(definition_row(rng, i))
+
+    ws = wb.create_sheet("evolved")
+    ws.append(["module", "piece_name", *EVOLVED_RECIPES])
+    for i in range(rows):
+        ws.append(evolved_row(rng, i))
+
+    ws = wb.create_sheet("containerized")
+    ws.append(["item_id", "byproducts"])
+    for i in range(rows):
+        ws.append(containerized_row(rng, i))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(path)
+
+
+# --- Child process: one scenario ---
+
+def load_gen_items():
+    spec = importlib.util.spec_from_file_location("gen_items", GEN_ITEMS)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class PhaseTimer:
+    """
+    Wraps module functions to collect exclusive time per phase: time
+    spent in a wrapped callee is charged to the callee's phase only.
+    """
+
+    def __init__(self):
+        self.totals: dict[str, float] = {}
+        self._stack: list[float] = []
+
+    def wrap(self, module, name: str, phase: str):
+        fn = getattr(module, name)
+
+        def timed(*args, **kwargs):
+            self._stack.append(0.0)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                dt = time.perf_counter() - t0
+                inner = self._stack.pop()
+                self.totals[phase] = self.totals.get(phase, 0.0) + dt - inner
+                if self._stack:
+                    self._stack[-1] += dt
+
+        setattr(module, name, timed)
+
+
+def peak_rss_mib() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(scenario: str, xlsx: Path, mod_root: Path) -> dict:
+    gen = load_gen_items()
+    timer = PhaseTimer()
+    for phase, names in PHASES.items():
+        for name in names:
+            timer.wrap(gen, name, phase)
+
+    if scenario == "generate-cold":
+        gen.sheet_cache_path(xlsx).unlink(missing_ok=True)
+        gen.manifest_path(xlsx).unlink(missing_ok=True)
+        shutil.rmtree(mod_root / "media", ignore_errors=True)
+        (mod_root / "media").mkdir(parents=True)
+
+    exit_code = 0
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        t0 = time.perf_counter()
+        try:
+            if scenario == "verify":
+                # verify reads ./media relative to the working directory
+                os.chdir(mod_root)
+                gen.cmd_verify(xlsx)
+            else:
+                gen.cmd_generate(xlsx, mod_root, force=scenario == "generate-warm")
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        total = time.perf_counter() - t0
+
+    phases = dict(timer.totals)
+    phases["other"] = max(0.0, total - sum(phases.values()))
+    return {"total": total, "phases": phases, "peak_rss_mib": peak_rss_mib(), "exit_code": exit_code}
+
+
+# --- Parent process ---
+
+def parse_sizes(text: str) -> tuple[int, ...]:
+    try:
+        sizes = tuple(int(s) for s in text.split(",") if s.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid sizes: {text!r}")
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError(f"invalid sizes: {text!r}")
+    return sizes
+
+
+def format_table(results: list[dict]) -> str:
+    phases = [*PHASES, "other"]
+    lines = [
+        f"{'rows':>7} {'scenario':<14} {'total s':>8} {'peak MiB':>9} "
+        + " ".join(f"{p:>10}" for p in phases)
+    ]
+    for r in results:
+        rss = "n/a" if r["peak_rss_mib"] is None else f"{r['peak_rss_mib']:.1f}"
+        lines.append(
+            f"{r['rows']:>7} {r['scenario']:<14} {r['total']:>8.3f} {rss:>9} "
+            + " ".join(f"{r['phases'].get(p, 0.0):>10.3f}" for p in phases)
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark gen-items.py on synthetic catalogs")
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=SIZES_DEFAULT,
+        metavar="LIST",
+        help="comma-separated rows per sheet (default 1000,10000,100000)",
+    )
+    parser.add_argument("--work", type=Path, default=WORK_DIR, metavar="DIR", help=f"scratch directory (default {WORK_DIR})")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild synthetic workbooks even if present")
+    parser.add_argument("--json", type=Path, metavar="FILE", help="also write the results as JSON")
+    # Internal: run one scenario in this process and print its result
+    parser.add_argument("--run", nargs=3, metavar=("SCENARIO", "XLSX", "MOD_ROOT"), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.run:
+        scenario, xlsx, mod_root = args.run
+        print(json.dumps(run_scenario(scenario, Path(xlsx).resolve(), Path(mod_root).resolve())))
+        return
+
+    results = []
+    for rows in args.sizes:
+        size_dir = args.work / f"n{rows}"
+        xlsx = size_dir / f"food-{rows}.xlsx"
+        if args.rebuild or not xlsx.exists():
+            t0 = time.perf_counter()
+            build_workbook(xlsx, rows)
+            print(f"built {xlsx} in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+
+        mod_root = size_dir / "mod"
+        for scenario in SCENARIOS:
+            proc = subprocess.run(
+                [sys.executable, __file__, "--run", scenario, str(xlsx), str(mod_root)],
+                capture_output=True,
+                text=True,
+            )
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                sys.exit(f"{scenario} at {rows} rows failed")
+            result = json.loads(proc.stdout.splitlines()[-1])
+            if result["exit_code"]:
+                print(f"warning: {scenario} at {rows} rows exited with {result['exit_code']}", file=sys.stderr)
+            results.append({"rows": rows, "scenario": scenario, **result})
+            print(f"{rows:>7} {scenario:<14} {result['total']:.3f} s", file=sys.stderr)
+
+    print(format_table(results))
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
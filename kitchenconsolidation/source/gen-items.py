@@ -1,9 +1,10 @@
-from openpyxl import load_workbook
-
 import argparse
+import hashlib
 import json
+import math
+import os
 import time
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 import re
 import sys
 from pathlib import Path
@@ -124,78 +125,161 @@ def call_openai_translate(client, model: str, prompt: str) -> Dict[str, str]:
     return {str(k): str(v) for k, v in data.items()}
 
 # Excel loader for all sheets
-def load_xlsx_rows(path: Path, sheet_name: str) -> list[dict]:
-    if not path.exists():
-        die(f"Excel file not found: {path}")
 
-    wb = load_workbook(path, data_only=True)
-    if sheet_name not in wb.sheetnames:
-        die(f"Sheet '{sheet_name}' not found in {path}")
+# Sheets read by generate/verify, loaded together in one pass
+XLSX_SHEETS = ("definitions", "evolved", "containerized")
 
-    ws = wb[sheet_name]
-    rows = list(ws.iter_rows(values_only=True))
+# Bump when the cached row format changes
+SHEET_CACHE_VERSION = 3
 
-    if not rows:
+# Parsed sheets per workbook for this process
+_sheets_by_path: dict[Path, dict[str, list[dict]]] = {}
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_atomic(path: Path, data: bytes):
+    # Readers never see a partial file: write a sibling, then rename over
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def sheet_cache_path(path: Path) -> Path:
+    # food.xlsx -> .food.xlsx.sheets.json
+    return path.with_name(f".{path.name}.sheets.json")
+
+
+def read_sheet_rows(ws) -> list[dict]:
+    # Read-only sheets stop at the declared <dimension>, which other
+    # writers often leave stale; scan the actual cells instead
+    ws.reset_dimensions()
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
         return []
 
-    headers = [str(h).strip() for h in rows[0]]
+    headers = [str(h).strip() for h in header]
     data = []
 
-    for r in rows[1:]:
+    for r in rows:
         if all(c is None for c in r):
             continue
         row = {}
         for i, h in enumerate(headers):
             val = r[i] if i < len(r) else None
-            row[h] = "" if val is None else str(val).strip()
+            if val is None:
+                row[h] = ""
+            elif type(val) in (int, float):
+                # Numeric cells stay typed so read_number can tell them from text
+                row[h] = val
+            else:
+                row[h] = str(val).strip()
         data.append(row)
 
     return data
 
+
+def load_xlsx_sheets(path: Path, digest: str | None = None) -> dict[str, list[dict]]:
+    """
+    Rows of every sheet in XLSX_SHEETS that exists in the workbook.
+
+    The workbook is streamed once in read-only mode. Parsed rows are
+    cached next to it, keyed by the workbook's sha256, so runs on an
+    unchanged workbook do not load openpyxl at all. Pass digest when
+    the caller has already hashed the workbook.
+    """
+    if not path.exists():
+        die(f"Excel file not found: {path}")
+
+    key = path.resolve()
+    if key in _sheets_by_path:
+        return _sheets_by_path[key]
+
+    if digest is None:
+        digest = file_sha256(path)
+    cache_file = sheet_cache_path(path)
+    sheets = None
+    try:
+        cached = json.loads(cache_file.read_text(encoding="utf-8"))
+        if cached.get("version") == SHEET_CACHE_VERSION and cached.get("sha256") == digest:
+            sheets = cached["sheets"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+
+    if sheets is None:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            sheets = {
+                name: read_sheet_rows(wb[name])
+                for name in XLSX_SHEETS
+                if name in wb.sheetnames
+            }
+        finally:
+            wb.close()
+
+        # Best effort: a missing cache only costs the next run a parse
+        try:
+            write_atomic(
+                cache_file,
+                json.dumps({"version": SHEET_CACHE_VERSION, "sha256": digest, "sheets": sheets}).encode("utf-8"),
+            )
+        except OSError:
+            pass
+
+    _sheets_by_path[key] = sheets
+    return sheets
+
+
+def load_xlsx_rows(path: Path, sheet_name: str) -> list[dict]:
+    sheets = load_xlsx_sheets(path)
+    if sheet_name not in sheets:
+        die(f"Sheet '{sheet_name}' not found in {path}")
+    return sheets[sheet_name]
+
 # Containerized loader from Excel
-def load_containerized_sheet(xlsx: Path):
-    rows = []
-    for r in load_xlsx_rows(xlsx, "containerized"):
-        item_id = r["item_id"].strip()
-        byp = (r.get("byproducts") or "").strip()
-        byproducts = [b.strip() for b in byp.split(";") if b.strip()] if byp else []
-        rows.append((item_id, byproducts))
-    return rows
-def emit_containerized_combine_recipe(item_id: str) -> str:
+def load_containerized_sheet(xlsx: Path, errors: list[str] | None = None) -> list["ContainerizedEntry"]:
+    return load_models(xlsx, "containerized", ContainerizedEntry, errors)
+
+def emit_containerized_combine_recipe(item_id: str) -> Iterator[str]:
     # item_id like "Base.CannedCornOpen"
     short = item_id.split(".")[-1]
-    lines = []
-    lines.append(f"    recipe Combine{short}")
-    lines.append("    {")
-    lines.append(f"        {item_id};2,")
-    lines.append(f"        Result : {item_id}=1,")
-    lines.append("        Time : 50,")
-    lines.append("        Category : Cooking,")
-    lines.append("        CanBeDoneFromFloor : true,")
-    lines.append("        StopOnWalk        : false,")
-    lines.append("        NeedToBeLearn     : false,")
-    lines.append("        OnCanPerform : Recipe.OnCanPerform.KitchenConsolidation_Combine_OnCanPerform,")
-    lines.append("        OnCreate : Recipe.OnCreate.KitchenConsolidation_Combine_OnCreate,")
-    lines.append("    }")
-    return "\n".join(lines)
-def emit_containerized_lua(rows: list[tuple[str, list[str]]]) -> str:
-    lines = []
-    lines.append("-- AUTO-GENERATED FILE. DO NOT EDIT.")
-    lines.append("RecipeContainerized = RecipeContainerized or {}")
-    lines.append("")
-    lines.append("local lookup = {")
-    for item_id, byps in rows:
-        if byps:
-            arr = ", ".join([f'\"{b}\"' for b in byps])
-            lines.append(f"    [\"{item_id}\"] = {{ {arr} }},")
+    yield f"    recipe Combine{short}"
+    yield "    {"
+    yield f"        {item_id};2,"
+    yield f"        Result : {item_id}=1,"
+    yield "        Time : 50,"
+    yield "        Category : Cooking,"
+    yield "        CanBeDoneFromFloor : true,"
+    yield "        StopOnWalk        : false,"
+    yield "        NeedToBeLearn     : false,"
+    yield "        OnCanPerform : Recipe.OnCanPerform.KitchenConsolidation_Combine_OnCanPerform,"
+    yield "        OnCreate : Recipe.OnCreate.KitchenConsolidation_Combine_OnCreate,"
+    yield "    }"
+def emit_containerized_lua(rows: list["ContainerizedEntry"]) -> Iterator[str]:
+    yield "-- AUTO-GENERATED FILE. DO NOT EDIT."
+    yield "RecipeContainerized = RecipeContainerized or {}"
+    yield ""
+    yield "local lookup = {"
+    for entry in rows:
+        if entry.byproducts:
+            arr = ", ".join([f'\"{b}\"' for b in entry.byproducts])
+            yield f"    [\"{entry.item_id}\"] = {{ {arr} }},"
         else:
-            lines.append(f"    [\"{item_id}\"] = {{ }},")
-    lines.append("}")
-    lines.append("")
-    lines.append("function RecipeContainerized.byproductLookup(itemId)")
-    lines.append("    return lookup[itemId]")
-    lines.append("end")
-    return "\n".join(lines)
+            yield f"    [\"{entry.item_id}\"] = {{ }},"
+    yield "}"
+    yield ""
+    yield "function RecipeContainerized.byproductLookup(itemId)"
+    yield "    return lookup[itemId]"
+    yield "end"
 #!/usr/bin/env python3
 
 import csv
@@ -204,8 +288,8 @@ import re
 from pathlib import Path
 
 # NOTE:
-# - piece_full_type is derived as "<module>.<piece_name>"
-# - display_name_key is derived as "ItemName_<module>.<piece_name>"
+# - FoodDefinition.full_type is derived as "<module>.<piece_name>"
+# - FoodDefinition.display_key is derived as "ItemName_<module>.<piece_name>"
 
 USAGE = """
 Usage:
@@ -222,6 +306,12 @@ def die(msg: str):
     sys.exit(1)
 
 
+def cell_text(row: dict, field: str, default: str = "") -> str:
+    # Numeric cells read as Python prints them: 10, 0.25, 1e-05
+    val = row.get(field, default)
+    return val if isinstance(val, str) else str(val)
+
+
 def dash_is_none(value: str):
     if value is None:
         return None
@@ -229,14 +319,6 @@ def dash_is_none(value: str):
     return None if value == "-" or value == "" else value
 
 
-def piece_full_type(row: dict) -> str:
-    return f"{row['module']}.{row['piece_name']}"
-
-
-def display_name_key(row: dict) -> str:
-    return f"ItemName_{piece_full_type(row)}"
-
-
 # Helper for evolved item display name key
 def evolved_item_display_key(full_type: str, evolved_name: str) -> str:
     # ItemName_KitchenConsolidation.FishPieces_Stew
@@ -280,8 +362,157 @@ def recipe_display_name(recipe_prefix: str, piece_name: str) -> str:
     return f"{recipe_prefix} {humanize_piece_name(piece_name)}"
 
 
-def load_definitions_sheet(xlsx: Path) -> list[dict]:
-    return load_xlsx_rows(xlsx, "definitions")
+# --- Row models ---
+
+# Numbers typed as text: plain decimals only, with no exponents,
+# separators, signs other than "-" or padding
+NUMBER_RE = re.compile(r"-?\d+(\.\d+)?", re.ASCII)
+
+
+def read_number(row: dict, field: str, required: bool, problems: list[str], minimum: int | None = None) -> str | None:
+    """
+    Check an optional ("-" or empty) numeric cell of a sheet row and
+    return its text. Text cells must be plain decimals and are returned
+    unchanged, so they are emitted exactly as the sheet has them ("1.50"
+    stays "1.50"); numeric cells must be finite and read as Python
+    prints them (see cell_text). Problems are appended to problems and
+    read as None.
+    """
+    value = row.get(field, "-")
+    if isinstance(value, (int, float)):
+        if not math.isfinite(value):
+            problems.append(f"{field} is not a finite number: {value!r}")
+            return None
+        text = str(value)
+    elif value == "-" or value == "":
+        if required:
+            problems.append(f"{field} is required")
+        return None
+    elif NUMBER_RE.fullmatch(value) is None:
+        problems.append(f"{field} is not a number: {value!r}")
+        return None
+    else:
+        text = value
+    if minimum is not None and float(text) < minimum:
+        problems.append(f"{field} must not be below {minimum}: {text}")
+        return None
+    return text
+
+
+def dash(value: str | None) -> str:
+    return "-" if value is None else value
+
+
+class FoodDefinition:
+    """
+    One row of the 'definitions' sheet, parsed and validated once.
+
+    Numeric fields keep the sheet's text once checked (see read_number);
+    optional ones ("-" or empty) are None.
+    Nutrition, freshness and mood come in groups: if the first field of a
+    group is set, the rest of it must be too. Weights must not be negative.
+    """
+
+    __slots__ = (
+        "module", "piece_name", "icon", "display_category",
+        "base_hunger", "hunger_change", "thirst_change",
+        "calories", "proteins", "lipids", "carbohydrates",
+        "weight", "weight_full", "weight_empty",
+        "days_fresh", "days_totally_rotten",
+        "boredom_change", "unhappy_change",
+        "food_type", "tags", "is_cookable", "dangerous_uncooked",
+        "chop_input_item_types", "chop_tools",
+        # Derived
+        "key", "full_type", "display_key", "has_chop",
+    )
+
+    def __init__(self, row: dict):
+        problems: list[str] = []
+
+        self.module = cell_text(row, "module")
+        self.piece_name = cell_text(row, "piece_name")
+        if not self.module or not self.piece_name:
+            problems.append("module and piece_name are required")
+        self.icon = cell_text(row, "icon")
+        self.display_category = cell_text(row, "display_category")
+
+        self.base_hunger = read_number(row, "base_hunger", True, problems)
+        self.hunger_change = read_number(row, "hunger_change", True, problems)
+        self.thirst_change = read_number(row, "thirst_change", False, problems)
+
+        self.calories = read_number(row, "calories", False, problems)
+        has_nutrition = self.calories is not None
+        self.proteins = read_number(row, "proteins", has_nutrition, problems)
+        self.lipids = read_number(row, "lipids", has_nutrition, problems)
+        self.carbohydrates = read_number(row, "carbohydrates", has_nutrition, problems)
+
+        self.weight = read_number(row, "weight", True, problems, minimum=0)
+        self.weight_full = read_number(row, "weight_full", True, problems, minimum=0)
+        self.weight_empty = read_number(row, "weight_empty", True, problems, minimum=0)
+
+        self.days_fresh = read_number(row, "days_fresh", False, problems)
+        self.days_totally_rotten = read_number(row, "days_totally_rotten", self.days_fresh is not None, problems)
+
+        self.boredom_change = read_number(row, "boredom_change", False, problems)
+        self.unhappy_change = read_number(row, "unhappy_change", self.boredom_change is not None, problems)
+
+        self.food_type = cell_text(row, "food_type")
+        self.tags = cell_text(row, "tags")
+        self.is_cookable = (cell_text(row, "is_cookable") or "true").strip().lower()
+        self.dangerous_uncooked = cell_text(row, "dangerous_uncooked").strip().lower() == "true"
+        self.chop_input_item_types = dash_is_none(cell_text(row, "chop_input_item_types", "-"))
+        self.chop_tools = cell_text(row, "chop_required_tools").replace("|", "/")
+
+        if problems:
+            raise ValueError("; ".join(problems))
+
+        self.key = (self.module, self.piece_name)
+        self.full_type = f"{self.module}.{self.piece_name}"
+        self.display_key = f"ItemName_{self.full_type}"
+        self.has_chop = self.chop_input_item_types is not None
+
+
+class ContainerizedEntry:
+    """
+    One row of the 'containerized' sheet: a "Module.Name" item and the
+    byproducts left over when it is combined.
+    """
+
+    __slots__ = ("item_id", "byproducts", "short", "recipe_key")
+
+    def __init__(self, row: dict):
+        self.item_id = cell_text(row, "item_id").strip()
+        module, _, short = self.item_id.rpartition(".")
+        if not module or not short:
+            raise ValueError(f"item_id must look like Module.Name: {self.item_id!r}")
+
+        byp = cell_text(row, "byproducts").strip()
+        self.byproducts = tuple(b.strip() for b in byp.split(";") if b.strip())
+        self.short = short
+        self.recipe_key = f"Recipe_Combine{short}"
+
+
+def load_models(xlsx: Path, sheet_name: str, model, errors: list[str] | None = None) -> list:
+    """
+    Parse every row of a sheet into model. Bad rows are appended to
+    errors and skipped, or, without an errors list, abort the run.
+    """
+    models = []
+    problems: list[str] = []
+    for n, row in enumerate(load_xlsx_rows(xlsx, sheet_name), start=2):
+        try:
+            models.append(model(row))
+        except ValueError as e:
+            problems.append(f"{sheet_name} row {n}: {e}")
+    if problems:
+        if errors is None:
+            die(f"Invalid rows in {xlsx}:\n  " + "\n  ".join(problems))
+        errors.extend(problems)
+    return models
+
+
+def load_definitions_sheet(xlsx: Path, errors: list[str] | None = None) -> list[FoodDefinition]:
+    return load_models(xlsx, "definitions", FoodDefinition, errors)
 
 
 def load_evolved_matrix(xlsx: Path):
@@ -302,14 +533,14 @@ def load_evolved_matrix(xlsx: Path):
     recipe_columns = [c for c in rows[0].keys() if c not in ("module", "piece_name")]
 
     for row in rows:
-        key = (row["module"], row["piece_name"])
+        key = (cell_text(row, "module"), cell_text(row, "piece_name"))
         keys.add(key)
 
-        full_type = f"{row['module']}.{row['piece_name']}"
+        full_type = f"{key[0]}.{key[1]}"
         parts = []
 
         for recipe in recipe_columns:
-            val = (row.get(recipe) or "").strip()
+            val = cell_text(row, recipe).strip()
             if val and val != "-":
                 evolved.setdefault(recipe, []).append(full_type)
                 parts.append(f"{recipe}:{val}")
@@ -320,225 +551,345 @@ def load_evolved_matrix(xlsx: Path):
     return evolved, keys, per_item
 
 
-def emit_item(row: dict, evolved_per_item: dict) -> str:
-    lines: list[str] = []
-
-    lines.append(f"    item {row['piece_name']}")
-    lines.append("    {")
-    lines.append(f"        DisplayName        = {display_name_key(row)},")
-    lines.append(f"        Icon               = {row['icon']},")
-    lines.append(f"        DisplayCategory    = {row['display_category']},")
-    lines.append("        Type               = Food,")
-    lines.append("")
+def emit_item(row: FoodDefinition, evolved_per_item: dict) -> Iterator[str]:
+    yield f"    item {row.piece_name}"
+    yield "    {"
+    yield f"        DisplayName        = {row.display_key},"
+    yield f"        Icon               = {row.icon},"
+    yield f"        DisplayCategory    = {row.display_category},"
+    yield "        Type               = Food,"
+    yield ""
 
     # Core consumption
-    lines.append("        // Core consumption semantics (fungible pile)")
-    lines.append(f"        HungerChange       = {row['hunger_change']},")
-    lines.append(f"        BaseHunger         = {row['base_hunger']},")
-    lines.append(f"        ThirstChange       = {row['thirst_change']},")
-    lines.append("")
+    yield "        // Core consumption semantics (fungible pile)"
+    yield f"        HungerChange       = {row.hunger_change},"
+    yield f"        BaseHunger         = {row.base_hunger},"
+    yield f"        ThirstChange       = {dash(row.thirst_change)},"
+    yield ""
 
     # Nutrition (optional)
-    if dash_is_none(row.get('calories', '-')) is not None:
-        lines.append("        // Nutrition (base-hunger–scaled; conservative)")
-        lines.append(f"        Calories           = {row['calories']},")
-        lines.append(f"        Proteins           = {row['proteins']},")
-        lines.append(f"        Lipids             = {row['lipids']},")
-        lines.append(f"        Carbohydrates      = {row['carbohydrates']},")
-        lines.append("")
+    if row.calories is not None:
+        yield "        // Nutrition (base-hunger–scaled; conservative)"
+        yield f"        Calories           = {row.calories},"
+        yield f"        Proteins           = {row.proteins},"
+        yield f"        Lipids             = {row.lipids},"
+        yield f"        Carbohydrates      = {row.carbohydrates},"
+        yield ""
 
     # Weight
-    lines.append("        // Weight / encumbrance")
-    lines.append(f"        Weight             = {row['weight']},")
-    lines.append(f"        WeightFull         = {row['weight_full']},")
-    lines.append(f"        WeightEmpty        = {row['weight_empty']},")
-    lines.append("")
+    yield "        // Weight / encumbrance"
+    yield f"        Weight             = {row.weight},"
+    yield f"        WeightFull         = {row.weight_full},"
+    yield f"        WeightEmpty        = {row.weight_empty},"
+    yield ""
 
     # Freshness (optional)
-    if dash_is_none(row.get('days_fresh', '-')) is not None:
-        lines.append("        // Freshness / spoilage")
-        lines.append(f"        DaysFresh          = {row['days_fresh']},")
-        lines.append(f"        DaysTotallyRotten  = {row['days_totally_rotten']},")
-        lines.append("")
+    if row.days_fresh is not None:
+        yield "        // Freshness / spoilage"
+        yield f"        DaysFresh          = {row.days_fresh},"
+        yield f"        DaysTotallyRotten  = {row.days_totally_rotten},"
+        yield ""
 
     # Mood (optional)
-    if dash_is_none(row.get('boredom_change', '-')) is not None:
-        lines.append("        // Eating effects")
-        lines.append(f"        BoredomChange      = {row['boredom_change']},")
-        lines.append(f"        UnhappyChange      = {row['unhappy_change']},")
-        lines.append("")
+    if row.boredom_change is not None:
+        yield "        // Eating effects"
+        yield f"        BoredomChange      = {row.boredom_change},"
+        yield f"        UnhappyChange      = {row.unhappy_change},"
+        yield ""
 
     # Metadata
-    lines.append("        // Cooking / ingredient metadata")
-    lines.append(f"        FoodType           = {row['food_type']},")
-    lines.append(f"        Tags               = {row['tags']},")
-    key = (row["module"], row["piece_name"])
-    evolved_spec = evolved_per_item.get(key)
+    yield "        // Cooking / ingredient metadata"
+    yield f"        FoodType           = {row.food_type},"
+    yield f"        Tags               = {row.tags},"
+    evolved_spec = evolved_per_item.get(row.key)
     if evolved_spec:
-        lines.append(f"        EvolvedRecipe      = {evolved_spec},")
-    if (row.get('dangerous_uncooked') or "").strip().lower() == "true":
-        lines.append("        DangerousUncooked  = true,")
-    lines.append("")
-    lines.append("        // General flags")
-    lines.append(f"        IsCookable         = {(row.get('is_cookable') or 'true').strip().lower()},")
-    lines.append("        CanStoreWater      = false,")
-    lines.append("    }")
-    return "\n".join(lines)
-
-
-def emit_chop_recipe(row: dict) -> str:
-    if dash_is_none(row.get('chop_input_item_types', '-')) is None:
-        return ""
-
-    tools = (row.get('chop_required_tools') or "").replace("|", "/")
-
-    lines: list[str] = []
-    lines.append(f"    recipe Chop{row['piece_name']}")
-    lines.append("    {")
-    lines.append(f"        {row['chop_input_item_types']};1,")
-    lines.append(f"        keep {tools},")
-    lines.append(f"        Result      : {piece_full_type(row)}=1,")
-    lines.append("        Time        : 50,")
-    lines.append("        Category    : Cooking,")
-    lines.append("        CanBeDoneFromFloor : true,")
-    lines.append("        StopOnWalk    		: false,")
-    lines.append("        NeedToBeLearn 		: false,")
-    lines.append("        OnGiveXP    : Recipe.OnGiveXP.Cooking10,")
-    lines.append("        OnCreate    : Recipe.OnCreate.KitchenConsolidation_Chop,")
-    lines.append("    }")
-    return "\n".join(lines)
-
-
-def emit_combine_recipe(row: dict) -> str:
-    lines: list[str] = []
-    lines.append(f"    recipe Combine{row['piece_name']}")
-    lines.append("    {")
-    lines.append(f"        {piece_full_type(row)};2,")
-    lines.append(f"        Result : {piece_full_type(row)}=1,")
-    lines.append("        Time : 50,")
-    lines.append("        Category : Cooking,")
-    lines.append("        CanBeDoneFromFloor : true,")
-    lines.append("        StopOnWalk    		: false,")
-    lines.append("        NeedToBeLearn 		: false,")
-    lines.append("        OnCanPerform : Recipe.OnCanPerform.KitchenConsolidation_Combine_OnCanPerform,")
-    lines.append("        OnCreate : Recipe.OnCreate.KitchenConsolidation_Combine_OnCreate,")
-    lines.append("    }")
-    return "\n".join(lines)
-
-
-def emit_evolvedrecipes(evolved: dict) -> str:
-    lines: list[str] = []
-    lines.append("// ------------------------------------------------------------------")
-    lines.append("// Kitchen Consolidation – Evolved Recipe Extensions")
-    lines.append("// AUTO-GENERATED FILE – DO NOT EDIT BY HAND")
-    lines.append("// Source: food-evolved-vanilla.csv")
-    lines.append("// ------------------------------------------------------------------")
-    lines.append("")    
-    lines.append("module Base {")
+        yield f"        EvolvedRecipe      = {evolved_spec},"
+    if row.dangerous_uncooked:
+        yield "        DangerousUncooked  = true,"
+    yield ""
+    yield "        // General flags"
+    yield f"        IsCookable         = {row.is_cookable},"
+    yield "        CanStoreWater      = false,"
+    yield "    }"
+
+
+def emit_chop_recipe(row: FoodDefinition) -> Iterator[str]:
+    if not row.has_chop:
+        return
+
+    yield f"    recipe Chop{row.piece_name}"
+    yield "    {"
+    yield f"        {row.chop_input_item_types};1,"
+    yield f"        keep {row.chop_tools},"
+    yield f"        Result      : {row.full_type}=1,"
+    yield "        Time        : 50,"
+    yield "        Category    : Cooking,"
+    yield "        CanBeDoneFromFloor : true,"
+    yield "        StopOnWalk    		: false,"
+    yield "        NeedToBeLearn 		: false,"
+    yield "        OnGiveXP    : Recipe.OnGiveXP.Cooking10,"
+    yield "        OnCreate    : Recipe.OnCreate.KitchenConsolidation_Chop,"
+    yield "    }"
+
+
+def emit_combine_recipe(row: FoodDefinition) -> Iterator[str]:
+    yield f"    recipe Combine{row.piece_name}"
+    yield "    {"
+    yield f"        {row.full_type};2,"
+    yield f"        Result : {row.full_type}=1,"
+    yield "        Time : 50,"
+    yield "        Category : Cooking,"
+    yield "        CanBeDoneFromFloor : true,"
+    yield "        StopOnWalk    		: false,"
+    yield "        NeedToBeLearn 		: false,"
+    yield "        OnCanPerform : Recipe.OnCanPerform.KitchenConsolidation_Combine_OnCanPerform,"
+    yield "        OnCreate : Recipe.OnCreate.KitchenConsolidation_Combine_OnCreate,"
+    yield "    }"
+
+
+def emit_module_header() -> Iterator[str]:
+    yield "module KitchenConsolidation"
+    yield "{"
+    yield "    imports"
+    yield "    {"
+    yield "        Base,"
+    yield "    }"
+    yield ""
+
+
+def emit_pieces(rows: list[FoodDefinition], evolved_per_item: dict) -> Iterator[str]:
+    yield from emit_module_header()
+    for row in rows:
+        yield from emit_item(row, evolved_per_item)
+        yield ""
+        if row.has_chop:
+            yield from emit_chop_recipe(row)
+            yield ""
+        yield from emit_combine_recipe(row)
+        yield ""
+    yield "}"
+
+
+def emit_containerized(containerized_rows: list[ContainerizedEntry]) -> Iterator[str]:
+    yield from emit_module_header()
+    for entry in sorted(containerized_rows, key=lambda x: x.item_id.lower()):
+        yield from emit_containerized_combine_recipe(entry.item_id)
+        yield ""
+    yield "}"
+
+
+def emit_evolvedrecipes(evolved: dict) -> Iterator[str]:
+    yield "// ------------------------------------------------------------------"
+    yield "// Kitchen Consolidation – Evolved Recipe Extensions"
+    yield "// AUTO-GENERATED FILE – DO NOT EDIT BY HAND"
+    yield "// Source: food-evolved-vanilla.csv"
+    yield "// ------------------------------------------------------------------"
+    yield ""
+    yield "module Base {"
 
     for recipe_name in sorted(evolved.keys()):
-        lines.append("    // =====================")
-        lines.append(f"    // {recipe_name.upper()}")
-        lines.append("    // =====================")
-        lines.append(f"    evolvedrecipe {recipe_name}")
-        lines.append("    {")
+        yield "    // ====================="
+        yield f"    // {recipe_name.upper()}"
+        yield "    // ====================="
+        yield f"    evolvedrecipe {recipe_name}"
+        yield "    {"
         for full_type in sorted(set(evolved[recipe_name])):
-            lines.append(f"        Item {full_type},")
-        lines.append("    }")
-        lines.append("")
-    lines.append("}")
-    return "\n".join(lines)
+            yield f"        Item {full_type},"
+        yield "    }"
+        yield ""
+    yield "}"
 
 
-def emit_item_translations(rows: list[dict], evolved_per_item: dict) -> str:
-    lines = []
-    lines.append("# --------------------------------------------------")
-    lines.append("# Kitchen Consolidation – Item Names (EN)")
-    lines.append("# AUTO-GENERATED FILE – DO NOT EDIT BY HAND")
-    lines.append("# --------------------------------------------------")
-    lines.append("")
-    lines.append("ItemName_EN = {")
+def emit_item_translations(rows: list[FoodDefinition], evolved_per_item: dict) -> Iterator[str]:
+    yield "# --------------------------------------------------"
+    yield "# Kitchen Consolidation – Item Names (EN)"
+    yield "# AUTO-GENERATED FILE – DO NOT EDIT BY HAND"
+    yield "# --------------------------------------------------"
+    yield ""
+    yield "ItemName_EN = {"
 
     for row in rows:
-        base_name = humanize_piece_name(row["piece_name"])
-        key = display_name_key(row)
+        base_name = humanize_piece_name(row.piece_name)
+        key = row.display_key
         # IMPORTANT: emit as string key
-        lines.append(f"    [\"{key}\"] = \"{base_name}\",")
+        yield f"    [\"{key}\"] = \"{base_name}\","
 
-    lines.append("}")
-    return "\n".join(lines)
+    yield "}"
 
 
-def emit_recipe_translations(rows: list[dict], containerized_rows: list[tuple[str, list[str]]]) -> str:
-    lines = []
+def emit_recipe_translations(rows: list[FoodDefinition], containerized_rows: list[ContainerizedEntry]) -> Iterator[str]:
     seen = set()
 
-    lines.append("# --------------------------------------------------")
-    lines.append("# Kitchen Consolidation – Recipe Names (EN)")
-    lines.append("# AUTO-GENERATED FILE – DO NOT EDIT BY HAND")
-    lines.append("# --------------------------------------------------")
-    lines.append("")
-    lines.append("Recipes_EN = {")
+    yield "# --------------------------------------------------"
+    yield "# Kitchen Consolidation – Recipe Names (EN)"
+    yield "# AUTO-GENERATED FILE – DO NOT EDIT BY HAND"
+    yield "# --------------------------------------------------"
+    yield ""
+    yield "Recipes_EN = {"
 
     # Pieces recipes
     for row in rows:
-        piece = row["piece_name"]
+        piece = row.piece_name
 
-        if dash_is_none(row.get("chop_input_item_types", "-")) is not None:
+        if row.has_chop:
             key = f"Recipe_Chop{piece}"
             if key not in seen:
                 display = recipe_display_name('Chop', piece)
                 display = re.sub(r"\s*\d+$", "", display)
-                lines.append(f"    [\"{key}\"] = \"{display}\",")
+                yield f"    [\"{key}\"] = \"{display}\","
                 seen.add(key)
 
         key = f"Recipe_Combine{piece}"
         if key not in seen:
             display = recipe_display_name('Combine', piece)
             display = re.sub(r"\s*\d+$", "", display)
-            lines.append(f"    [\"{key}\"] = \"{display}\",")
+            yield f"    [\"{key}\"] = \"{display}\","
             seen.add(key)
 
     # Containerized combine recipes
-    for item_id, _ in sorted(containerized_rows, key=lambda x: x[0]):
-        short = item_id.split(".")[-1]
-        key = f"Recipe_Combine{short}"
+    for entry in sorted(containerized_rows, key=lambda x: x.item_id):
+        key = entry.recipe_key
         if key not in seen:
-            value = f"Combine {humanize_item_id(item_id)}"
+            value = f"Combine {humanize_item_id(entry.item_id)}"
             # Trim trailing " Open"
             if value.endswith(" Open"):
                 value = value[:-5]
             # Trim trailing digits (e.g. "Crisps2" -> "Crisps")
             value = re.sub(r"\s*\d+$", "", value)
-            lines.append(f"    [\"{key}\"] = \"{value}\",")
+            yield f"    [\"{key}\"] = \"{value}\","
             seen.add(key)
 
-    lines.append("}")
-    return "\n".join(lines)
+    yield "}"
+
+
+
+# --- Incremental generate ---
+
+# Bump when the manifest format changes
+MANIFEST_VERSION = 1
+
+# Generated files are encoded and written this many lines at a time
+WRITE_CHUNK_LINES = 4096
+WRITE_BUFFER_SIZE = 1 << 16
+
+
+def manifest_path(xlsx: Path) -> Path:
+    # food.xlsx -> .food.xlsx.manifest.json
+    return xlsx.with_name(f".{xlsx.name}.manifest.json")
+
+
+def generate_input_hash(xlsx_digest: str) -> str:
+    # Outputs depend on both the workbook (by its sha256) and this generator
+    h = hashlib.sha256()
+    h.update(xlsx_digest.encode("ascii"))
+    h.update(Path(__file__).read_bytes())
+    return h.hexdigest()
+
+
+def read_manifest(path: Path) -> dict:
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
 
 
+def manifest_is_current(manifest: dict, input_hash: str, mod_root: Path) -> bool:
+    """
+    True when the manifest was written for these inputs and this mod root,
+    and every output it lists is still on disk unmodified.
+    """
+    if manifest.get("input") != input_hash or manifest.get("media") != str(mod_root.resolve()):
+        return False
+    outputs = manifest.get("outputs")
+    if not outputs:
+        return False
+    for rel, digest in outputs.items():
+        path = mod_root / rel
+        if not path.is_file() or file_sha256(path) != digest:
+            return False
+    return True
+
+
+def write_lines(path: Path, lines: Iterable[str]) -> tuple[bool, str]:
+    """
+    Stream lines, joined by newlines, into a temp file beside path and
+    move it into place unless path already holds exactly that content.
+    Lines are encoded and hashed in chunks, so memory stays flat however
+    large the output gets.
+
+    Returns (written, sha256 of the content).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    h = hashlib.sha256()
+    try:
+        with open(tmp, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+            sep = b""
+            chunk: list[str] = []
+            for line in lines:
+                chunk.append(line)
+                if len(chunk) == WRITE_CHUNK_LINES:
+                    data = sep + "\n".join(chunk).encode("utf-8")
+                    f.write(data)
+                    h.update(data)
+                    chunk.clear()
+                    sep = b"\n"
+            if chunk:
+                data = sep + "\n".join(chunk).encode("utf-8")
+                f.write(data)
+                h.update(data)
+
+        digest = h.hexdigest()
+        if (
+            path.is_file()
+            and path.stat().st_size == tmp.stat().st_size
+            and file_sha256(path) == digest
+        ):
+            tmp.unlink()
+            return False, digest
+        os.replace(tmp, path)
+        return True, digest
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
 
 # --- Subcommand CLI implementation ---
 
-def cmd_generate(xlsx_path: Path, mod_root_arg: Path):
+def cmd_generate(xlsx_path: Path, mod_root_arg: Path, force: bool = False):
     mod_root = mod_root_arg / "media"
     if not mod_root.exists():
         die(f"Resolved mod media directory does not exist: {mod_root}")
+    if not xlsx_path.exists():
+        die(f"Excel file not found: {xlsx_path}")
+
+    # The workbook is hashed once, for the manifest and the sheet cache
+    xlsx_digest = file_sha256(xlsx_path)
+    input_hash = generate_input_hash(xlsx_digest)
+    manifest_file = manifest_path(xlsx_path)
+    if not force and manifest_is_current(read_manifest(manifest_file), input_hash, mod_root):
+        print("Up to date")
+        return
+    load_xlsx_sheets(xlsx_path, xlsx_digest)
 
     scripts_folder = mod_root / "scripts"
-    scripts_folder.mkdir(parents=True, exist_ok=True)
-
     translate_en = mod_root / "lua" / "shared" / "Translate" / "EN"
-    translate_en.mkdir(parents=True, exist_ok=True)
+    lua_path = mod_root / "lua" / "server" / "RecipeContainerized.lua"
 
     # Deterministic ordering
-    containerized_rows = load_containerized_sheet(xlsx_path)
-    rows = sorted(load_definitions_sheet(xlsx_path), key=lambda r: r["piece_name"])
-    containerized_rows = sorted(containerized_rows, key=lambda x: x[0])
+    row_errors: list[str] = []
+    containerized_rows = load_containerized_sheet(xlsx_path, row_errors)
+    rows = sorted(load_definitions_sheet(xlsx_path, row_errors), key=lambda r: r.piece_name)
+    if row_errors:
+        die(f"Invalid rows in {xlsx_path}:\n  " + "\n  ".join(row_errors))
+    containerized_rows = sorted(containerized_rows, key=lambda x: x.item_id)
     evolved, evolved_keys, evolved_per_item = load_evolved_matrix(xlsx_path)
 
     # Validate 1:1 correspondence
-    item_keys = {(r["module"], r["piece_name"]) for r in rows}
+    item_keys = {r.key for r in rows}
     if item_keys != evolved_keys:
         missing = item_keys - evolved_keys
         extra = evolved_keys - item_keys
@@ -547,57 +898,34 @@ def cmd_generate(xlsx_path: Path, mod_root_arg: Path):
         if extra:
             die(f"Extra items in evolved sheet: {sorted(extra)}")
 
-    # Generate consolidated pieces.txt
-    pieces_lines: list[str] = []
-    pieces_lines.append("module KitchenConsolidation")
-    pieces_lines.append("{")
-    pieces_lines.append("    imports")
-    pieces_lines.append("    {")
-    pieces_lines.append("        Base,")
-    pieces_lines.append("    }")
-    pieces_lines.append("")
-    for row in rows:
-        pieces_lines.append(emit_item(row, evolved_per_item))
-        pieces_lines.append("")
-        chop = emit_chop_recipe(row)
-        if chop:
-            pieces_lines.append(chop)
-            pieces_lines.append("")
-        pieces_lines.append(emit_combine_recipe(row))
-        pieces_lines.append("")
-    pieces_lines.append("}")
-
-    (scripts_folder / "pieces.txt").write_text("\n".join(pieces_lines), encoding="utf-8")
-
-    # Generate containerized.txt
-    cont_lines: list[str] = []
-    cont_lines.append("module KitchenConsolidation")
-    cont_lines.append("{")
-    cont_lines.append("    imports")
-    cont_lines.append("    {")
-    cont_lines.append("        Base,")
-    cont_lines.append("    }")
-    cont_lines.append("")
-    for item_id, _ in sorted(containerized_rows, key=lambda x: x[0].lower()):
-        cont_lines.append(emit_containerized_combine_recipe(item_id))
-        cont_lines.append("")
-    cont_lines.append("}")
-
-    (scripts_folder / "containerized.txt").write_text("\n".join(cont_lines), encoding="utf-8")
-
-    # EN translations
-    (translate_en / "ItemName_EN.txt").write_text(
-        emit_item_translations(rows, evolved_per_item), encoding="utf-8"
-    )
-    (translate_en / "Recipes_EN.txt").write_text(
-        emit_recipe_translations(rows, containerized_rows), encoding="utf-8"
-    )
+    outputs = {
+        scripts_folder / "pieces.txt": emit_pieces(rows, evolved_per_item),
+        scripts_folder / "containerized.txt": emit_containerized(containerized_rows),
+        # EN translations
+        translate_en / "ItemName_EN.txt": emit_item_translations(rows, evolved_per_item),
+        translate_en / "Recipes_EN.txt": emit_recipe_translations(rows, containerized_rows),
+        lua_path: emit_containerized_lua(containerized_rows),
+    }
 
-    # Generate RecipeContainerized.lua
-    lua_path = mod_root / "lua" / "server" / "RecipeContainerized.lua"
-    lua_path.parent.mkdir(parents=True, exist_ok=True)
-    lua_path.write_text(
-        emit_containerized_lua(containerized_rows), encoding="utf-8"
+    # Only touch files whose content changed, so mtimes stay stable
+    output_hashes: dict[str, str] = {}
+    for path, lines in outputs.items():
+        written, digest = write_lines(path, lines)
+        if written:
+            print(f"Wrote: {path}")
+        output_hashes[path.relative_to(mod_root).as_posix()] = digest
+
+    write_atomic(
+        manifest_file,
+        json.dumps(
+            {
+                "version": MANIFEST_VERSION,
+                "input": input_hash,
+                "media": str(mod_root.resolve()),
+                "outputs": output_hashes,
+            },
+            indent=2,
+        ).encode("utf-8"),
     )
 
 
@@ -637,14 +965,16 @@ def cmd_verify(xlsx_path: Path):
     warns: list[str] = []
 
     # --- Load authoritative data ---
-    rows = load_definitions_sheet(xlsx_path)
+    rows = load_definitions_sheet(xlsx_path, errors)
+    # Rejected rows would show up as spurious evolved mismatches
+    definitions_ok = not errors
     evolved, evolved_keys, evolved_per_item = load_evolved_matrix(xlsx_path)
-    containerized_rows = load_containerized_sheet(xlsx_path)
+    containerized_rows = load_containerized_sheet(xlsx_path, errors)
 
     # --- 2A: definitions <-> evolved must match exactly ---
-    item_keys = {(r["module"], r["piece_name"]) for r in rows}
+    item_keys = {r.key for r in rows}
 
-    if item_keys != evolved_keys:
+    if definitions_ok and item_keys != evolved_keys:
         missing = item_keys - evolved_keys
         extra = evolved_keys - item_keys
         if missing:
@@ -653,12 +983,12 @@ def cmd_verify(xlsx_path: Path):
             errors.append(f"Extra items in evolved sheet: {sorted(extra)}")
 
     # --- 2D: containerized references must be valid ---
-    defined_fulltypes = {f"{r['module']}.{r['piece_name']}" for r in rows}
-    for item_id, _ in containerized_rows:
-        if item_id.startswith("Base."):
+    defined_fulltypes = {r.full_type for r in rows}
+    for entry in containerized_rows:
+        if entry.item_id.startswith("Base."):
             continue
-        if item_id not in defined_fulltypes:
-            errors.append(f"Containerized item not defined in definitions: {item_id}")
+        if entry.item_id not in defined_fulltypes:
+            errors.append(f"Containerized item not defined in definitions: {entry.item_id}")
 
     # --- 2C: expected generated files + keys must exist ---
     # We know exactly what should be generated
@@ -702,14 +1032,14 @@ def cmd_verify(xlsx_path: Path):
 
     # Expected item keys
     for r in rows:
-        key = display_name_key(r)
+        key = r.display_key
         if key not in en_item_keys:
             errors.append(f"Missing EN item translation key: {key}")
 
     # Expected recipe keys
     for r in rows:
-        piece = r["piece_name"]
-        if dash_is_none(r.get("chop_input_item_types", "-")) is not None:
+        piece = r.piece_name
+        if r.has_chop:
             k = f"Recipe_Chop{piece}"
             if k not in en_recipe_keys:
                 errors.append(f"Missing EN recipe translation key: {k}")
@@ -717,9 +1047,8 @@ def cmd_verify(xlsx_path: Path):
         if k not in en_recipe_keys:
             errors.append(f"Missing EN recipe translation key: {k}")
 
-    for item_id, _ in containerized_rows:
-        short = item_id.split(".")[-1]
-        k = f"Recipe_Combine{short}"
+    for entry in containerized_rows:
+        k = entry.recipe_key
         if k not in en_recipe_keys:
             errors.append(f"Missing EN recipe translation key: {k}")
 
@@ -769,6 +1098,7 @@ def main():
     p_gen = sub.add_parser("generate", help="Generate scripts and EN translations")
     p_gen.add_argument("xlsx", type=Path)
     p_gen.add_argument("mod_root", type=Path)
+    p_gen.add_argument("--force", action="store_true", help="Regenerate even if the manifest is current")
 
     p_tr = sub.add_parser("translate", help="Generate non-EN translations")
     p_tr.add_argument("mod_root", type=Path)
@@ -779,7 +1109,7 @@ def main():
     args = parser.parse_args()
 
     if args.cmd == "generate":
-        cmd_generate(args.xlsx, args.mod_root)
+        cmd_generate(args.xlsx, args.mod_root, args.force)
     elif args.cmd == "translate":
         cmd_translate(args.mod_root)
     elif args.cmd == "verify":
@@ -0,0 +1,42 @@
+"""
+Shared pytest fixtures. gen-items.py is not importable by name, so it
+is loaded from its path the way bench-items.py does; every test gets a
+fresh module, so its per-process sheet cache starts empty.
+"""
+
+from pathlib import Path
+import importlib.util
+
+import pytest
+
+
+GEN_ITEMS = Path(__file__).parent.parent / "gen-items.py"
+
+
+@pytest.fixture
+def gen():
+    spec = importlib.util.spec_from_file_location("gen_items", GEN_ITEMS)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def write_workbook():
+    """
+    write_workbook(path, {sheet name: [header, *rows]}) saves an .xlsx
+    workbook and returns its path.
+    """
+    from openpyxl import Workbook
+
+    def write(path: Path, sheets: dict) -> Path:
+        wb = Workbook()
+        wb.remove(wb.active)
+        for name, rows in sheets.items():
+            ws = wb.create_sheet(name)
+            for row in rows:
+                ws.append(row)
+        wb.save(path)
+        return path
+
+    return write
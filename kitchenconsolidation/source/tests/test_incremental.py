@@ -0,0 +1,87 @@
+import pytest
+
+
+DEFINITIONS = [
+    [
+        "module", "piece_name", "icon", "display_category", "base_hunger", "hunger_change",
+        "thirst_change", "calories", "proteins", "lipids", "carbohydrates", "weight",
+        "weight_full", "weight_empty", "days_fresh", "days_totally_rotten", "boredom_change",
+        "unhappy_change", "food_type", "is_cookable", "dangerous_uncooked", "tags",
+        "chop_input_item_types", "chop_required_tools",
+    ],
+    [
+        "KitchenConsolidation", "FishPieces", "FishFillet", "Food", -10, -10,
+        0, 120, 20, 5, 0, 0.1,
+        0.1, 0.05, 2, 4, "-",
+        "-", "Fish", "true", "true", "",
+        "Base.FishFillet", "Base.KitchenKnife",
+    ],
+]
+EVOLVED = [["module", "piece_name", "Stew"], ["KitchenConsolidation", "FishPieces", 10]]
+CONTAINERIZED = [["item_id", "byproducts"], ["Base.CannedCornOpen", "Base.TinCanEmpty"]]
+
+
+@pytest.fixture
+def project(write_workbook, tmp_path):
+    """
+    (workbook, mod root) with an empty media folder to generate into.
+    """
+    (tmp_path / "mod" / "media").mkdir(parents=True)
+    xlsx = write_workbook(
+        tmp_path / "food.xlsx",
+        {"definitions": DEFINITIONS, "evolved": EVOLVED, "containerized": CONTAINERIZED},
+    )
+    return xlsx, tmp_path / "mod"
+
+
+def mtimes(mod_root):
+    return {p: p.stat().st_mtime_ns for p in (mod_root / "media").rglob("*") if p.is_file()}
+
+
+def test_second_run_is_up_to_date(gen, project, capsys):
+    xlsx, mod_root = project
+    gen.cmd_generate(xlsx, mod_root)
+    assert capsys.readouterr().out.count("Wrote:") == 5
+
+    before = mtimes(mod_root)
+    gen.cmd_generate(xlsx, mod_root)
+    assert capsys.readouterr().out == "Up to date\n"
+    assert mtimes(mod_root) == before
+
+
+def test_edited_output_is_rewritten(gen, project, capsys):
+    xlsx, mod_root = project
+    gen.cmd_generate(xlsx, mod_root)
+    pieces = mod_root / "media" / "scripts" / "pieces.txt"
+    generated = pieces.read_bytes()
+    capsys.readouterr()
+
+    pieces.write_bytes(generated + b"\n// edited")
+    gen.cmd_generate(xlsx, mod_root)
+    assert capsys.readouterr().out == f"Wrote: {pieces}\n"
+    assert pieces.read_bytes() == generated
+
+
+def test_identical_content_keeps_mtimes(gen, project, capsys):
+    xlsx, mod_root = project
+    gen.cmd_generate(xlsx, mod_root)
+    capsys.readouterr()
+
+    before = mtimes(mod_root)
+    gen.cmd_generate(xlsx, mod_root, force=True)
+    assert "Wrote:" not in capsys.readouterr().out
+    assert mtimes(mod_root) == before
+
+
+def test_workbook_is_hashed_once(gen, project, monkeypatch):
+    xlsx, mod_root = project
+    hashed = []
+    real_sha256 = gen.file_sha256
+    monkeypatch.setattr(gen, "file_sha256", lambda path: hashed.append(path) or real_sha256(path))
+    read = []
+    real_read_bytes = gen.Path.read_bytes
+    monkeypatch.setattr(gen.Path, "read_bytes", lambda path: read.append(path) or real_read_bytes(path))
+
+    gen.cmd_generate(xlsx, mod_root)
+    assert hashed.count(xlsx) == 1
+    assert xlsx not in read
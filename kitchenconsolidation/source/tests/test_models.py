@@ -0,0 +1,112 @@
+import pytest
+
+
+def definition(**changes) -> dict:
+    """
+    A valid 'definitions' row as read from the sheet, with changes.
+    """
+    row = {
+        "module": "KitchenConsolidation", "piece_name": "FishPieces", "icon": "FishFillet",
+        "display_category": "Food", "base_hunger": -10, "hunger_change": -10,
+        "thirst_change": 0, "calories": 120, "proteins": 20, "lipids": 5, "carbohydrates": 0,
+        "weight": 0.1, "weight_full": 0.1, "weight_empty": "0.05",
+        "days_fresh": 2, "days_totally_rotten": 4, "boredom_change": "-", "unhappy_change": "-",
+        "food_type": "Fish", "is_cookable": "True", "dangerous_uncooked": "True", "tags": "",
+        "chop_input_item_types": "Base.FishFillet", "chop_required_tools": "Base.KitchenKnife",
+    }
+    row.update(changes)
+    return row
+
+
+def test_valid_row(gen):
+    row = gen.FoodDefinition(definition())
+    assert (row.base_hunger, row.weight, row.weight_empty) == ("-10", "0.1", "0.05")
+    assert row.full_type == "KitchenConsolidation.FishPieces"
+    assert row.is_cookable == "true" and row.dangerous_uncooked
+
+
+@pytest.mark.parametrize("value, text", [(1e-05, "1e-05"), (1e16, "1e+16"), (3, "3"), (0.25, "0.25")])
+def test_numeric_cells_pass_as_printed(gen, value, text):
+    assert gen.FoodDefinition(definition(calories=value)).calories == text
+
+
+@pytest.mark.parametrize("text", ["1.50", "-3", "12"])
+def test_decimal_text_is_kept_verbatim(gen, text):
+    assert gen.FoodDefinition(definition(calories=text)).calories == text
+
+
+@pytest.mark.parametrize(
+    "value, problem",
+    [
+        ("1_000", "calories is not a number: '1_000'"),
+        ("1e3", "calories is not a number: '1e3'"),
+        ("nan", "calories is not a number: 'nan'"),
+        (" 12", "calories is not a number: ' 12'"),
+        (float("nan"), "calories is not a finite number: nan"),
+        (float("inf"), "calories is not a finite number: inf"),
+    ],
+)
+def test_malformed_numbers_are_rejected(gen, value, problem):
+    with pytest.raises(ValueError, match=f"^{problem}$"):
+        gen.FoodDefinition(definition(calories=value))
+
+
+@pytest.mark.parametrize(
+    "first, rest",
+    [
+        ("calories", ("proteins", "lipids", "carbohydrates")),
+        ("days_fresh", ("days_totally_rotten",)),
+        ("boredom_change", ("unhappy_change",)),
+    ],
+)
+def test_groups_must_be_complete(gen, first, rest):
+    complete = definition(**{first: 5}, **{field: 5 for field in rest})
+    gen.FoodDefinition(complete)
+    gen.FoodDefinition(definition(**{first: "-"}, **{field: "-" for field in rest}))
+
+    with pytest.raises(ValueError) as e:
+        gen.FoodDefinition({**complete, **{field: "-" for field in rest}})
+    assert str(e.value) == "; ".join(f"{field} is required" for field in rest)
+
+
+@pytest.mark.parametrize("field", ["weight", "weight_full", "weight_empty"])
+@pytest.mark.parametrize("value", [-0.1, "-1"])
+def test_weights_must_not_be_negative(gen, field, value):
+    with pytest.raises(ValueError, match=f"^{field} must not be below 0: {value}$"):
+        gen.FoodDefinition(definition(**{field: value}))
+    assert getattr(gen.FoodDefinition(definition(**{field: 0})), field) == "0"
+
+
+def test_problems_are_reported_together(gen):
+    with pytest.raises(ValueError) as e:
+        gen.FoodDefinition(definition(module="", base_hunger="-", weight=-1))
+    assert str(e.value) == (
+        "module and piece_name are required; base_hunger is required; weight must not be below 0: -1"
+    )
+
+
+@pytest.mark.parametrize("item_id", ["Base.CannedCornOpen", "Mod.Sub.Item", " Base.Padded "])
+def test_containerized_item_id(gen, item_id):
+    entry = gen.ContainerizedEntry({"item_id": item_id, "byproducts": "Base.TinCanEmpty; Base.Lid;"})
+    assert entry.item_id == item_id.strip()
+    assert entry.short == item_id.strip().rpartition(".")[2]
+    assert entry.byproducts == ("Base.TinCanEmpty", "Base.Lid")
+    assert entry.recipe_key == f"Recipe_Combine{entry.short}"
+
+
+@pytest.mark.parametrize("item_id", ["", "CannedCorn", ".CannedCorn", "Base.", 12])
+def test_containerized_item_id_needs_module_and_name(gen, item_id):
+    with pytest.raises(ValueError, match="item_id must look like Module.Name"):
+        gen.ContainerizedEntry({"item_id": item_id, "byproducts": ""})
+
+
+def test_typed_cells_survive_the_sheet_cache(gen, write_workbook, tmp_path):
+    header = list(definition())
+    values = definition(calories=1e-05, proteins=1e16, lipids="1.50", is_cookable=False)
+    xlsx = write_workbook(tmp_path / "food.xlsx", {"definitions": [header, list(values.values())]})
+
+    for _ in range(2):  # parsed, then from the sheet cache
+        gen._sheets_by_path.clear()
+        (row,) = gen.load_definitions_sheet(xlsx)
+        assert (row.calories, row.proteins, row.lipids) == ("1e-05", "1e+16", "1.50")
+        assert row.is_cookable == "false"
@@ -0,0 +1,37 @@
+import re
+import zipfile
+
+
+ROWS = [["item_id", "byproducts"]] + [[f"Base.Item{i}", "Base.TinCanEmpty"] for i in range(6)]
+
+
+def set_dimension(path, ref):
+    """
+    Rewrite every sheet's declared <dimension> as another writer might
+    leave it.
+    """
+    with zipfile.ZipFile(path) as zf:
+        parts = {name: zf.read(name) for name in zf.namelist()}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts.items():
+            if name.startswith("xl/worksheets/"):
+                data = re.sub(rb'<dimension ref="[^"]*"', f'<dimension ref="{ref}"'.encode(), data)
+            zf.writestr(name, data)
+
+
+def test_rows_past_a_stale_dimension_are_read(gen, write_workbook, tmp_path):
+    xlsx = write_workbook(tmp_path / "food.xlsx", {"containerized": ROWS})
+    set_dimension(xlsx, "A1:A2")
+
+    rows = gen.load_xlsx_rows(xlsx, "containerized")
+    assert rows == [{"item_id": item, "byproducts": byp} for item, byp in ROWS[1:]]
+
+
+def test_sheet_cache_is_reused_for_an_unchanged_workbook(gen, write_workbook, tmp_path, monkeypatch):
+    xlsx = write_workbook(tmp_path / "food.xlsx", {"containerized": ROWS})
+    rows = gen.load_xlsx_rows(xlsx, "containerized")
+    assert gen.sheet_cache_path(xlsx).exists()
+
+    gen._sheets_by_path.clear()
+    monkeypatch.setattr(gen, "read_sheet_rows", None)
+    assert gen.load_xlsx_rows(xlsx, "containerized") == rows